@@ -1,3 +1,4 @@
+import dask
 import numpy as np
 import matplotlib.pyplot as plt
 import xarray as xr
@@ -6,6 +7,7 @@ import cartopy.feature as cfeature
 from matplotlib import cm
 import re
 
+from tcn.validation.compare import error_profile_graph
 
 plot_rmse_diagnostics = False
 plot_box_diagnostics = False
@@ -45,25 +47,27 @@ if __name__ == "__main__":
 
     levels = difference["lev"].values
 
-    # Calc RMSE of differences
-    rmse_t_per_level = np.sqrt((temperature_diff**2).mean(dim=("lat", "lon", "time")))
-    rmse_u_per_level = np.sqrt((u_diff**2).mean(dim=("lat", "lon", "time")))
-    rmse_v_per_level = np.sqrt((v_diff**2).mean(dim=("lat", "lon", "time")))
-    rmse_omega_per_level = np.sqrt((omega_diff**2).mean(dim=("lat", "lon", "time")))
-    rmse_rh_per_level = np.sqrt((rh_diff**2).mean(dim=("lat", "lon", "time")))
-    rmse_qi_per_level = np.sqrt((qi_diff**2).mean(dim=("lat", "lon", "time")))
-    rmse_ql_per_level = np.sqrt((ql_diff**2).mean(dim=("lat", "lon", "time")))
-    rmse_qv_per_level = np.sqrt((qv_diff**2).mean(dim=("lat", "lon", "time")))
-
-    # Convert to numpy arrays for plotting
-    rmse_t_per_level_values = rmse_t_per_level.values
-    rmse_u_per_level_values = rmse_u_per_level.values
-    rmse_v_per_level_values = rmse_v_per_level.values
-    rmse_omega_per_level_values = rmse_omega_per_level.values
-    rmse_rh_per_level_values = rmse_rh_per_level.values
-    rmse_qi_per_level_values = rmse_qi_per_level.values
-    rmse_ql_per_level_values = rmse_ql_per_level.values
-    rmse_qv_per_level_values = rmse_qv_per_level.values
+    # Per level error profiles of the plotted variables, in a single pass
+    (profiles,) = dask.compute(
+        {
+            name: error_profile_graph(
+                fortran_data[name][:, :, 0:-1] if name == "T" else fortran_data[name],
+                python_data[name][:, :, 0:-1] if name == "T" else python_data[name],
+                "lev",
+            )
+            for name in ["T", "U", "V", "OMEGA", "RH", "QI", "QL", "QV"]
+        }
+    )
+
+    # Extract RMSE values
+    rmse_t_per_level_values = profiles["T"].rmse.values
+    rmse_u_per_level_values = profiles["U"].rmse.values
+    rmse_v_per_level_values = profiles["V"].rmse.values
+    rmse_omega_per_level_values = profiles["OMEGA"].rmse.values
+    rmse_rh_per_level_values = profiles["RH"].rmse.values
+    rmse_qi_per_level_values = profiles["QI"].rmse.values
+    rmse_ql_per_level_values = profiles["QL"].rmse.values
+    rmse_qv_per_level_values = profiles["QV"].rmse.values
 
     # Plot RMSE for Diagnostic Variables
     if plot_rmse_diagnostics:
@@ -0,0 +1,164 @@
+import json
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from tcn.benchmark.benchmark import TIMING_FIELDS, Benchmark
+from tcn.benchmark.columnar import NameTable, TimingColumns
+
+# Schema metadata key of the interned component names shared by all rows
+NAMES_METADATA_KEY = b"tcn.benchmark.names"
+SERIES_FIELDS = ["fv_dyncore_timings", "inner_dycore_timings"]
+SCALAR_FIELDS = ["global_init_time", "global_run_time", "global_finalize_time"]
+
+
+def _list_array(arrays: List[np.ndarray], dtype) -> pa.ListArray:
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int32)
+    np.cumsum([len(a) for a in arrays], out=offsets[1:])
+    values = np.concatenate(arrays) if arrays else np.zeros(0)
+    return pa.ListArray.from_arrays(
+        pa.array(offsets), pa.array(values.astype(dtype, copy=False))
+    )
+
+
+def _list_column(table: pa.Table, name: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Flat values & row offsets (starting at 0) of a list column"""
+    column = table.column(name).combine_chunks()
+    offsets = column.offsets.to_numpy()
+    return column.flatten().to_numpy(zero_copy_only=False), offsets - offsets[0]
+
+
+def _rows(values: list, offsets: np.ndarray) -> List[list]:
+    bounds = offsets.tolist()
+    return [values[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def to_arrow(benchmarks: List[Benchmark]) -> pa.Table:
+    """One row per benchmark, profiler entries as list<code>/list<float64>"""
+    names = NameTable()
+    columns: Dict[str, pa.Array] = {
+        "backend": pa.array([b.backend for b in benchmarks], type=pa.string()),
+        "grid_resolution": _list_array(
+            [np.array(b.grid_resolution) for b in benchmarks], np.int32
+        ),
+        "node_setup": _list_array(
+            [np.array(b.node_setup) for b in benchmarks], np.int32
+        ),
+    }
+    for scalar in SCALAR_FIELDS:
+        columns[scalar] = pa.array(
+            [getattr(b, scalar) for b in benchmarks], type=pa.float64()
+        )
+    for series in SERIES_FIELDS:
+        columns[series] = _list_array(
+            [np.array(getattr(b, series), dtype=np.float64) for b in benchmarks],
+            np.float64,
+        )
+    for timing_field in TIMING_FIELDS:
+        # Re-coded in the names shared by all rows
+        timing_columns = [
+            TimingColumns(table=names).concatenate(getattr(b, timing_field))
+            for b in benchmarks
+        ]
+        columns[f"{timing_field}_name"] = _list_array(
+            [c.names for c in timing_columns], np.int32
+        )
+        columns[f"{timing_field}_parent"] = _list_array(
+            [c.parents for c in timing_columns], np.int32
+        )
+        columns[f"{timing_field}_time"] = _list_array(
+            [c.times for c in timing_columns], np.float64
+        )
+
+    table = pa.table(columns)
+    return table.replace_schema_metadata(
+        {NAMES_METADATA_KEY: json.dumps(names.names).encode("utf8")}
+    )
+
+
+def _names_of(table: pa.Table) -> NameTable:
+    metadata = table.schema.metadata or {}
+    return NameTable(json.loads(metadata.get(NAMES_METADATA_KEY, b"[]")))
+
+
+def from_arrow(table: pa.Table) -> List[Benchmark]:
+    """Inverse of `to_arrow`. Hardware samples (`hws_data`) are not archived."""
+    names = _names_of(table)
+    benchmarks = [
+        Benchmark(backend=backend) for backend in table["backend"].to_pylist()
+    ]
+    for field_name in ["grid_resolution", "node_setup"]:
+        values, offsets = _list_column(table, field_name)
+        for b, row in zip(benchmarks, _rows(values.tolist(), offsets)):
+            setattr(b, field_name, tuple(row))
+    for scalar in SCALAR_FIELDS:
+        for b, value in zip(benchmarks, table[scalar].to_pylist()):
+            setattr(b, scalar, value)
+    for series in SERIES_FIELDS:
+        values, offsets = _list_column(table, series)
+        for b, row in zip(benchmarks, _rows(values.tolist(), offsets)):
+            setattr(b, series, row)
+    for timing_field in TIMING_FIELDS:
+        # Columns are sliced per benchmark, names stay codes in the shared table
+        codes, offsets = _list_column(table, f"{timing_field}_name")
+        parents, _ = _list_column(table, f"{timing_field}_parent")
+        times, _ = _list_column(table, f"{timing_field}_time")
+        bounds = offsets.tolist()
+        for b, start, stop in zip(benchmarks, bounds[:-1], bounds[1:]):
+            setattr(
+                b,
+                timing_field,
+                TimingColumns(
+                    table=names,
+                    names=codes[start:stop].astype(np.int32, copy=False),
+                    parents=parents[start:stop].astype(np.int32, copy=False),
+                    times=times[start:stop].astype(np.float64, copy=False),
+                ),
+            )
+    return benchmarks
+
+
+def write_parquet(benchmarks: List[Benchmark], path: str):
+    pq.write_table(to_arrow(benchmarks), path, compression="zstd")
+
+
+def read_parquet(path: str) -> List[Benchmark]:
+    return from_arrow(pq.read_table(path))
+
+
+def append_parquet(benchmarks: List[Benchmark], path: str):
+    """Add `benchmarks` at the end of the archive at `path` (created if missing)"""
+    archived = read_parquet(path) if os.path.exists(path) else []
+    write_parquet(archived + benchmarks, path)
+
+
+def read_timings(path: str, timing_field: str = "agcm_timings") -> pd.DataFrame:
+    """Long format (benchmark, backend, name, parent, time) table of one
+    timing field, straight from the columns - for trend analysis."""
+    table = pq.read_table(
+        path,
+        columns=[
+            "backend",
+            f"{timing_field}_name",
+            f"{timing_field}_parent",
+            f"{timing_field}_time",
+        ],
+    )
+    names = _names_of(table)
+    codes, offsets = _list_column(table, f"{timing_field}_name")
+    parents, _ = _list_column(table, f"{timing_field}_parent")
+    times, _ = _list_column(table, f"{timing_field}_time")
+    row = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+    return pd.DataFrame(
+        {
+            "benchmark": row,
+            "backend": np.array(table["backend"].to_pylist(), dtype=object)[row],
+            "name": names.lookup(codes),
+            "parent": names.lookup(parents),
+            "time": times,
+        }
+    )
@@ -1,9 +1,22 @@
 import sys
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Tuple, Optional
+import numpy as np
 import plotly.express as px
+from tcn.benchmark.columnar import TimingColumns
 from tcn.benchmark.string_trf import extract_numerics
 
+# Fields of `Benchmark` holding (name, time, parent) profiler entries
+TIMING_FIELDS = [
+    "fv_gridcomp_detailed_profiling",
+    "agcm_timings",
+    "ogcm_timings",
+    "run_timings",
+    "timings",
+]
+# Prefix of every entry under a global profiler phase (see `plot_all`)
+PHASE_PREFIXES = {"SetService": "s", "Initialize": "i", "Run": "r", "Finalize": "f"}
+
 
 @dataclass
 class Benchmark:
@@ -15,18 +28,23 @@ class Benchmark:
     global_finalize_time: float = 0  # seconds fort the global FINALIZE
     fv_dyncore_timings: List[float] = field(default_factory=list)  # seconds
     inner_dycore_timings: List[float] = field(default_factory=list)  # seconds
-    fv_gridcomp_detailed_profiling: List[Tuple[str, float, str]] = field(
-        default_factory=list
-    )
+    fv_gridcomp_detailed_profiling: TimingColumns = field(default_factory=TimingColumns)
     # AGCM only
-    agcm_timings: List[Tuple[str, float, str]] = field(default_factory=list)
+    agcm_timings: TimingColumns = field(default_factory=TimingColumns)
     # OGCM omly
-    ogcm_timings: List[Tuple[str, float, str]] = field(default_factory=list)
+    ogcm_timings: TimingColumns = field(default_factory=TimingColumns)
     # All run items without AGCM or OGCM
-    run_timings: List[Tuple[str, float, str]] = field(default_factory=list)
-    timings: List[Tuple[str, float, str]] = field(default_factory=list)
+    run_timings: TimingColumns = field(default_factory=TimingColumns)
+    timings: TimingColumns = field(default_factory=TimingColumns)
     hws_data: Dict[str, Any] = field(default_factory=dict)
 
+    def __post_init__(self):
+        # (name, time, parent) lists are stored as columns
+        for timing_field in TIMING_FIELDS:
+            timings = getattr(self, timing_field)
+            if not isinstance(timings, TimingColumns):
+                setattr(self, timing_field, TimingColumns.from_tuples(timings))
+
     @property
     def backend_sanitized(self):
         """Generate a filname-safe backend name"""
@@ -53,6 +71,7 @@ class Benchmark:
 
     def parse_geos_log_summary(self, filename: str):
         parents: List[Tuple[str, int]] = []
+        entries: List[Tuple[str, float, str]] = []
         start_patterns = ["Model Throughput", "All"]
         start_pattern: Optional[str] = start_patterns.pop(0)
         end_pattern = "GEOSgcm Run Status: 0"
@@ -84,76 +103,47 @@ class Benchmark:
                             parents.pop()
                         parent = parents[-1][0] if len(parents) else ""
                     parents.append((name, hierarchy_level))
-                    self.timings.append((name, time, parent))
+                    entries.append((name, time, parent))
+        self.timings = self.timings.concatenate(TimingColumns.from_tuples(entries))
+
+    def columns(self, timing_field: str) -> TimingColumns:
+        """One of the `TIMING_FIELDS`"""
+        return getattr(self, timing_field)
 
     def plot_agcm(self, path: str):
-        comps = []
-        parents = []
-        values = []
-        for name, time, parent in self.agcm_timings:
-            comps.append(name)
-            values.append(time)
-            parents.append(parent)
-        data = dict(comps=comps, parents=parents, values=values)
-        self._sunburst_plot(data, path)
+        self._sunburst_plot(self.columns("agcm_timings").plot_data(), path)
 
     def plot_ogcm(self, path: str):
-        comps = []
-        parents = []
-        values = []
-        for name, time, parent in self.ogcm_timings:
-            comps.append(name)
-            values.append(time)
-            parents.append(parent)
-        data = dict(comps=comps, parents=parents, values=values)
-        self._sunburst_plot(data, path)
+        self._sunburst_plot(self.columns("ogcm_timings").plot_data(), path)
 
     def plot_run(self, path: str):
-        comps = []
-        parents = []
-        values = []
-        for name, time, parent in self.run_timings:
-            comps.append(name)
-            values.append(time)
-            parents.append(parent)
-        for name, time, parent in self.agcm_timings:
-            if name == "AGCM":
-                parent = "GCM"
-            comps.append(name)
-            values.append(time)
-            parents.append(parent)
-        for name, time, parent in self.ogcm_timings:
-            if name == "OGCM":
-                parent = "GCM"
-            comps.append(name)
-            values.append(time)
-            parents.append(parent)
-        data = dict(comps=comps, parents=parents, values=values)
+        columns = (
+            self.columns("run_timings")
+            .concatenate(self.columns("agcm_timings"))
+            .concatenate(self.columns("ogcm_timings"))
+        )
+        data = columns.plot_data()
+        gcm_roots = (data["comps"] == "AGCM") | (data["comps"] == "OGCM")
+        data["parents"][gcm_roots] = "GCM"
         self._sunburst_plot(data, path)
 
     def plot_all(self, path: str):
-        comps = []
-        parents = []
-        values = []
-        prefix = ""
-        for name, time, parent in self.timings:
-            # Sunburst doesn't allow for duplicates so
-            # we have to prefix names and parents
-            if name == "SetService":
-                prefix = "s"
-            if name == "Initialize":
-                prefix = "i"
-            if name == "Run":
-                prefix = "r"
-            if name == "Finalize":
-                prefix = "f"
-            comps.append(prefix + name)
-            values.append(time)
-            if parent == "All":
-                parents.append(parent)
-            else:
-                parents.append(prefix + parent)
-        data = dict(comps=comps, parents=parents, values=values)
+        data = self.columns("timings").plot_data()
+        # Sunburst doesn't allow for duplicates so
+        # we have to prefix names and parents with the phase they belong to
+        comps = data["comps"]
+        phase_rows = np.where(np.isin(comps, list(PHASE_PREFIXES.keys())))[0]
+        last_phase = np.full(len(comps), -1)
+        last_phase[phase_rows] = phase_rows
+        last_phase = np.maximum.accumulate(last_phase) if len(comps) else last_phase
+        phase_prefix = np.array(
+            [PHASE_PREFIXES.get(comps[i], "") if i >= 0 else "" for i in last_phase],
+            dtype=object,
+        )
+        data["comps"] = phase_prefix + comps
+        data["parents"] = np.where(
+            data["parents"] == "All", data["parents"], phase_prefix + data["parents"]
+        )
         self._sunburst_plot(data, path)
 
 
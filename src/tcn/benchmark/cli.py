@@ -1,12 +1,46 @@
-from tcn.benchmark.geos_log_parser import parse_geos_log
+from typing import Iterable
+
+import click
+
+from tcn.benchmark.archive import append_parquet
+from tcn.benchmark.geos_log_parser import parse_geos_logs
+from tcn.benchmark.rank_logs import parse_rank_logs, rank_log_files
 from tcn.benchmark.report import report
 
-if __name__ == "__main__":
-    import sys
 
-    raw_data = []
-    for log in sys.argv[1:]:
-        raw_data.append(parse_geos_log(log))
+@click.command()
+@click.argument("geos_logs", nargs=-1)
+@click.option("--jobs", "-j", default=1, help="Number of logs parsed in parallel")
+@click.option(
+    "--rank_logs",
+    type=str,
+    multiple=True,
+    help="Per rank logs pattern (e.g. run.%t.out or run/rank.%t/stdout): "
+    "prints the load imbalance",
+)
+@click.option(
+    "--archive",
+    type=str,
+    default="",
+    help="Parquet archive the parsed benchmarks are appended to, "
+    "for trend analysis (created if missing)",
+)
+def cli(geos_logs: Iterable[str], jobs: int, rank_logs: Iterable[str], archive: str):
+    geos_logs = list(geos_logs)
+    if geos_logs != []:
+        raw_data = parse_geos_logs(geos_logs, jobs=jobs)
+        benchmark_report = report(raw_data)
+        print(benchmark_report)
+        if archive != "":
+            append_parquet(raw_data, archive)
+            print(f"Archived {len(raw_data)} benchmarks in {archive}")
+    for log_pattern in rank_logs:
+        filenames = rank_log_files(log_pattern)
+        if filenames == []:
+            raise RuntimeError(f"No rank log matches {log_pattern}")
+        print(f"Load imbalance of {log_pattern}:")
+        print(parse_rank_logs(filenames, jobs=jobs))
 
-    benchmark_report = report(raw_data)
-    print(benchmark_report)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,110 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Parent code of a root entry (parent == "")
+NO_PARENT = -1
+
+
+@dataclass
+class NameTable:
+    """Interned component names: each name is stored once and referred to by code"""
+
+    names: List[str] = field(default_factory=list)
+    _codes: Dict[str, int] = field(default_factory=dict, repr=False)
+    _lookup: Optional[np.ndarray] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        self._codes = {name: code for code, name in enumerate(self.names)}
+
+    def intern(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = len(self.names)
+            self.names.append(name)
+            self._codes[name] = code
+            self._lookup = None
+        return code
+
+    def lookup(self, codes: np.ndarray) -> np.ndarray:
+        """Vectorized code -> name, with "" for `NO_PARENT`"""
+        if self._lookup is None:
+            self._lookup = np.array(self.names + [""], dtype=object)
+        return self._lookup[np.where(codes == NO_PARENT, len(self.names), codes)]
+
+
+@dataclass(eq=False)
+class TimingColumns:
+    """Columnar version of a `(name, time, parent)` profiler list.
+
+    `names` and `parents` are codes in a (possibly shared) `NameTable`,
+    `parents` is `NO_PARENT` for roots. Compares equal to the same entries,
+    as columns or as a list of tuples."""
+
+    table: NameTable = field(default_factory=NameTable)
+    names: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int32))
+    parents: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int32))
+    times: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.float64))
+
+    @classmethod
+    def from_tuples(
+        cls,
+        entries: Iterable[Tuple[str, float, str]],
+        table: Optional[NameTable] = None,
+    ) -> "TimingColumns":
+        table = table if table is not None else NameTable()
+        names, times, parents = [], [], []
+        for name, time, parent in entries:
+            names.append(table.intern(name))
+            times.append(time)
+            parents.append(table.intern(parent) if parent != "" else NO_PARENT)
+        return cls(
+            table=table,
+            names=np.array(names, dtype=np.int32),
+            parents=np.array(parents, dtype=np.int32),
+            times=np.array(times, dtype=np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[Tuple[str, float, str]]:
+        return iter(self.to_tuples())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, TimingColumns):
+            return self.to_tuples() == other.to_tuples()
+        if isinstance(other, list):
+            return self.to_tuples() == other
+        return NotImplemented
+
+    def to_tuples(self) -> List[Tuple[str, float, str]]:
+        return list(
+            zip(
+                self.table.lookup(self.names).tolist(),
+                self.times.tolist(),
+                self.table.lookup(self.parents).tolist(),
+            )
+        )
+
+    def concatenate(self, other: "TimingColumns") -> "TimingColumns":
+        """Entries of `self` followed by `other`, re-coded in `self.table`"""
+        recode = np.array(
+            [self.table.intern(name) for name in other.table.names] + [NO_PARENT],
+            dtype=np.int32,
+        )
+        return TimingColumns(
+            table=self.table,
+            names=np.concatenate([self.names, recode[other.names]]),
+            parents=np.concatenate([self.parents, recode[other.parents]]),
+            times=np.concatenate([self.times, other.times]),
+        )
+
+    def plot_data(self) -> Dict[str, np.ndarray]:
+        """Data for the plotly sunburst: comps/parents/values"""
+        return dict(
+            comps=self.table.lookup(self.names),
+            parents=self.table.lookup(self.parents),
+            values=self.times,
+        )
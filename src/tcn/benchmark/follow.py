@@ -0,0 +1,149 @@
+import datetime
+import os
+import re
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Iterator, List, Optional, Tuple
+
+from tcn.benchmark.string_trf import decode_line, extract_numerics
+
+# Same markers as `parse_geos_log`
+GTFV3_MARKER = "RUN_GTFV3:1"
+GTFV3_TIMING_PATTERN = " 0 , geos_gtfv3"
+FORTRAN_TIMING_PATTERN = " 0: fv_dynamics"
+END_OF_RUN_MARKER = "GEOSgcm Run Status"
+
+_RE_AGCM_DATE = re.compile(
+    r"AGCM Date: (\d{4})/(\d{2})/(\d{2})\s+Time: (\d{2}):(\d{2}):(\d{2})"
+)
+
+
+@dataclass
+class LiveStatus:
+    fv_dyncore_timings: List[float] = field(default_factory=list)  # seconds
+    simulated_time: Optional[datetime.datetime] = None
+    # Simulated days per wall-clock day over the last few polls
+    sdpd: Optional[float] = None
+    finished: bool = False
+
+    def __str__(self) -> str:
+        sdpd = f"{self.sdpd:.1f}" if self.sdpd is not None else "n/a"
+        median = ""
+        if self.fv_dyncore_timings != []:
+            timings = sorted(self.fv_dyncore_timings)
+            median = f", dycore median {timings[len(timings) // 2]:.3f}s"
+        return (
+            f"{self.simulated_time} - {len(self.fv_dyncore_timings)} dycore "
+            f"timesteps{median}, {sdpd} SDPD{' (finished)' if self.finished else ''}"
+        )
+
+
+class GEOSLogFollower:
+    """Incremental parser of a GEOS log still being written.
+
+    Each `poll` only reads what was appended since the previous one (partial
+    lines are kept until completed) and updates `status`."""
+
+    def __init__(self, filename: str, window: int = 10):
+        self.filename = filename
+        self.window = window
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0
+        self.status = LiveStatus()
+        self.is_gtfv3 = False
+        self._partial = b""
+        # (wall clock, simulated time) of the last `window` reads with a new date
+        self._progress: Deque[Tuple[float, datetime.datetime]] = deque(
+            maxlen=self.window
+        )
+
+    def _process(self, line: str, wall_time: float):
+        if GTFV3_MARKER in line:
+            self.is_gtfv3 = True
+        pattern = GTFV3_TIMING_PATTERN if self.is_gtfv3 else FORTRAN_TIMING_PATTERN
+        if pattern in line:
+            self.status.fv_dyncore_timings.extend(
+                extract_numerics(["".join(line.split(pattern)[1:])])
+            )
+        date = _RE_AGCM_DATE.search(line)
+        if date:
+            year, month, day, hour, minute, second = map(int, date.groups())
+            self.status.simulated_time = datetime.datetime(
+                year, month, day, hour, minute, second
+            )
+            if self._progress and self._progress[-1][0] == wall_time:
+                # Only the latest date of a given read counts
+                self._progress.pop()
+            self._progress.append((wall_time, self.status.simulated_time))
+        if END_OF_RUN_MARKER in line:
+            self.status.finished = True
+
+    def _update_sdpd(self):
+        if len(self._progress) < 2:
+            return
+        wall_start, sim_start = self._progress[0]
+        wall_end, sim_end = self._progress[-1]
+        if wall_end > wall_start:
+            simulated = (sim_end - sim_start).total_seconds()
+            self.status.sdpd = simulated / (wall_end - wall_start)
+
+    def poll(self) -> bool:
+        """Read & parse new content, returns True if any complete line was read"""
+        try:
+            size = os.path.getsize(self.filename)
+        except FileNotFoundError:
+            return False
+        if size < self.offset:
+            # Log was truncated/replaced: start over
+            self._reset()
+        if size == self.offset:
+            return False
+
+        with open(self.filename, "rb") as f:
+            f.seek(self.offset)
+            data = self._partial + f.read(size - self.offset)
+        self.offset = size
+        lines = data.split(b"\n")
+        self._partial = lines.pop()
+        if lines == []:
+            return False
+
+        wall_time = time.monotonic()
+        for raw_line in lines:
+            self._process(decode_line(raw_line + b"\n"), wall_time)
+        self._update_sdpd()
+        return True
+
+    def follow(
+        self,
+        interval: float = 5.0,
+        callback: Optional[Callable[[LiveStatus], None]] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[LiveStatus]:
+        """Poll every `interval` seconds and yield the status on every update,
+        until the end of the run (or `timeout` seconds without new content).
+
+        This is a generator: nothing is polled, and `callback` is never called,
+        unless it is iterated - e.g. `for _ in follower.follow(callback=...): pass`.
+        The status yielded is the same object, updated in place."""
+        last_update = time.monotonic()
+        while True:
+            if self.poll():
+                last_update = time.monotonic()
+                if callback:
+                    callback(self.status)
+                yield self.status
+                if self.status.finished:
+                    return
+            elif timeout is not None and time.monotonic() - last_update > timeout:
+                return
+            time.sleep(interval)
+
+
+if __name__ == "__main__":
+    for status in GEOSLogFollower(sys.argv[1]).follow():
+        print(status)
@@ -1,19 +1,52 @@
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 from tcn.benchmark.benchmark import Benchmark
-from tcn.benchmark.string_trf import extract_numerics, grep
+from tcn.benchmark.columnar import TimingColumns
+from tcn.benchmark.log_index import GEOSLogIndex
+from tcn.benchmark.mapl_profiler import GLOBAL_PROFILE, MAPLProfile, parse_mapl_profile
+from tcn.benchmark.string_trf import extract_numerics
+
+# Measure used in the global profiler (inclusive time)
+GLOBAL_PROFILE_COLUMN = 1
+# Measure used in the "Times for component" profilers
+COMPONENT_PROFILE_COLUMN = 4
+
+# Phases of a component whose own timers are reported
+COMPONENT_RUN_PHASES = ["Run", "Run1", "Run2"]
+# Roots of `Benchmark.agcm_timings` & `ogcm_timings` in the global profiler
+AGCM_ROOT = "AGCM"
+OGCM_ROOT = "OGCM"
+
+
+def _component_timings(
+    profile: MAPLProfile, components: List[str]
+) -> List[Tuple[str, float, str]]:
+    # Timers declared by the components during their run, from their own block
+    timings = []
+    for component in components:
+        timings.extend(
+            profile.user_timers(
+                component, COMPONENT_PROFILE_COLUMN, phases=COMPONENT_RUN_PHASES
+            )
+        )
+    return timings
 
 
 def parse_geos_log(filename: str) -> Benchmark:
     benchmark = Benchmark()
+    # Stream the log once, all queries below are answered from the index
+    log = GEOSLogIndex(filename)
 
     # Get backend
-    is_gtfv3 = grep(filename, "RUN_GTFV3:1", exclude_pattern=True, expected=False) != []
+    is_gtfv3 = log.grep("RUN_GTFV3:1", exclude_pattern=True, expected=False) != []
     if not is_gtfv3:
         benchmark.backend = "fortran"
     else:
         backend_pattern = "backend : "
-        grepped = grep(filename, backend_pattern, exclude_pattern=True, expected=False)
+        grepped = log.grep(backend_pattern, exclude_pattern=True, expected=False)
         if grepped == []:
             benchmark.backend = "gtfv3 (details failed to parse)"
         else:
@@ -22,22 +55,20 @@ def parse_geos_log(filename: str) -> Benchmark:
 
     # Get timings of FV
     if is_gtfv3:
-        interface_timings = grep(filename, " 0 , geos_gtfv3", exclude_pattern=True)
+        interface_timings = log.grep(" 0 , geos_gtfv3", exclude_pattern=True)
         benchmark.fv_dyncore_timings = extract_numerics(interface_timings)
 
         if "dace" in benchmark.backend:
-            dycore_timings = grep(
-                filename, "] Run...", exclude_pattern=True, expected=False
-            )
+            dycore_timings = log.grep("] Run...", exclude_pattern=True, expected=False)
             benchmark.inner_dycore_timings = extract_numerics(dycore_timings)
     else:
-        dycore_timings = grep(
-            filename, " 0: fv_dynamics", exclude_pattern=True, expected=False
+        dycore_timings = log.grep(
+            " 0: fv_dynamics", exclude_pattern=True, expected=False
         )
         benchmark.fv_dyncore_timings = extract_numerics(dycore_timings)
 
     # Get setup (grid, nodes)
-    grid_stats_str = grep(filename, "Resolution of dynamics restart")
+    grid_stats_str = log.grep("Resolution of dynamics restart")
     grid_stats = extract_numerics(grid_stats_str)
     assert len(grid_stats) == 3
     benchmark.grid_resolution = (
@@ -45,230 +76,81 @@ def parse_geos_log(filename: str) -> Benchmark:
         int(grid_stats[1]),
         int(grid_stats[2]),
     )
-    NX_str = extract_numerics(
-        grep(filename, "Resource Parameter: NX:", exclude_pattern=True)
-    )
+    NX_str = extract_numerics(log.grep("Resource Parameter: NX:", exclude_pattern=True))
     assert len(NX_str) == 1
     NX = int(NX_str[0])
-    NY_str = extract_numerics(
-        grep(filename, "Resource Parameter: NY:", exclude_pattern=True)
-    )
+    NY_str = extract_numerics(log.grep("Resource Parameter: NY:", exclude_pattern=True))
     assert len(NY_str) == 1
     NY = int(NY_str[0])
     benchmark.node_setup = (NX, int(NY / 6), int(NX * (NY / 6) * 6))
 
+    # MAPL profilers: global one & one per component, all as timer trees
+    profile = parse_mapl_profile(line for _, line in log.report_lines)
+    if GLOBAL_PROFILE not in profile.blocks:
+        raise RuntimeError("Expecting the global MAPL profiler to be found")
+
     # Model throughput
-    global_profiler_entry = "Model Throughput"
-    global_init_time = grep(
-        filename, "--Initialize", start_patterns=[global_profiler_entry]
+    for phase, attribute in [
+        ("Initialize", "global_init_time"),
+        ("Run", "global_run_time"),
+        ("Finalize", "global_finalize_time"),
+    ]:
+        node = profile.get(f"{GLOBAL_PROFILE}/{phase}")
+        if node is None:
+            raise RuntimeError(f"Expecting --{phase} to be found")
+        setattr(benchmark, attribute, node.measures[GLOBAL_PROFILE_COLUMN])
+
+    # Every component is reported under the part of the run it belongs to:
+    # AGCM, OGCM (for GEOS-FP) or the rest of the run
+    run = profile[f"{GLOBAL_PROFILE}/Run"]
+    subtrees: Dict[str, List[Tuple[str, float, str]]] = {}
+    components: Dict[str, List[str]] = {AGCM_ROOT: [], OGCM_ROOT: [], "": []}
+    for root_name in [AGCM_ROOT, OGCM_ROOT]:
+        root = profile.find(run, root_name)
+        if root is None:
+            subtrees[root_name] = []
+            continue
+        subtrees[root_name] = profile.subtree_timings(root, GLOBAL_PROFILE_COLUMN)
+        components[root_name] = [
+            node.name for node in root.walk() if node.name in profile.blocks
+        ]
+    reported = components[AGCM_ROOT] + components[OGCM_ROOT]
+    components[""] = [name for name in profile.components if name not in reported]
+
+    benchmark.agcm_timings = TimingColumns.from_tuples(
+        _component_timings(profile, components[AGCM_ROOT]) + subtrees[AGCM_ROOT]
     )
-    benchmark.global_init_time = extract_numerics(global_init_time)[1]
-    global_run_time = grep(filename, "--Run", start_patterns=[global_profiler_entry])
-    benchmark.global_run_time = extract_numerics(global_run_time)[1]
-    global_finalize_time = grep(
-        filename, "--Finalize", start_patterns=[global_profiler_entry]
+    benchmark.ogcm_timings = TimingColumns.from_tuples(
+        _component_timings(profile, components[OGCM_ROOT]) + subtrees[OGCM_ROOT]
     )
-    benchmark.global_finalize_time = extract_numerics(global_finalize_time)[1]
-
-    #
-    # WARNING - THIS IS A BESPOKE PARSE. THIS HAS BEEN REPLACED
-    #           BY A GENERIC PARSER IN BENCHMARKDATA
-    #
-
-    # Get details FV Grid Comp timings
-    dyn_profiler_entry = "Times for component <DYN>"
-    superdyn_profiler_entry = "Times for component <SUPERDYNAMICS>"
-    dyn_profiler_patterns = [
-        ("--------DYN_ANA", "DYN_ANA", "DYN"),
-        ("--------DYN_PROLOGUE", "DYN_PROLOGUE", "DYN"),
-        ("--------DYN_CORE", "DYN_CORE", "DYN"),
-        ("----------PROLOGUE", "PROLOGUE", "DYN_CORE"),
-        ("----------PULL_TRACERS", "PULL_TRACERS", "DYN_CORE"),
-        ("----------STATE_TO_FV", "STATE_TO_FV", "DYN_CORE"),
-        ("----------MAKE_NH", "MAKE_NH", "DYN_CORE"),
-        ("----------MASS_FIX", "MASS_FIX", "DYN_CORE"),
-        ("----------FV_DYNAMICS", "FV_DYNAMICS", "DYN_CORE"),
-        ("----------PUSH_TRACERS", "PUSH_TRACERS", "DYN_CORE"),
-        ("----------FV_TO_STATE", "FV_TO_STATE", "DYN_CORE"),
-        ("--------DYN_EPILOGUE", "DYN_EPILOGUE", "DYN"),
-    ]
-    for pattern, shortname, parent in dyn_profiler_patterns:
-        measures = extract_numerics(
-            grep(
-                filename,
-                pattern,
-                start_patterns=[dyn_profiler_entry],
-                end_pattern=superdyn_profiler_entry,
-                expected=False,
-            )
-        )
-        if measures != []:
-            benchmark.agcm_timings.append((shortname, measures[4], parent))
-
-    # Get details for MOIST physics
-    moist_profiler_entry = "Times for component <MOIST>"
-    turbulence_profiler_entry = "Times for component <TURBULENCE>"
-    moist_profiler_patterns = [
-        ("------CONV_TRACERS", "CONV_TRACERS", "MOIST"),
-        ("------AERO_ACTIVATE", "AERO_ACTIVATE", "MOIST"),
-        ("------GF", "GF", "MOIST"),
-        ("------UW", "UW", "MOIST"),
-        ("------BACM_1M", "BACM_1M", "MOIST"),
-    ]
-    for pattern, shortname, parent in moist_profiler_patterns:
-        measures = extract_numerics(
-            grep(
-                filename,
-                pattern,
-                start_patterns=[moist_profiler_entry],
-                end_pattern=turbulence_profiler_entry,
-                expected=False,
-            )
+    run_timings = profile.subtree_timings(
+        run, GLOBAL_PROFILE_COLUMN, exclude=[AGCM_ROOT, OGCM_ROOT]
+    ) + _component_timings(profile, components[""])
+    # Historical naming of the run root
+    benchmark.run_timings = TimingColumns.from_tuples(
+        (
+            "RUN" if name == "Run" else name,
+            time,
+            "RUN" if parent == "Run" else parent,
         )
-        if measures != []:
-            benchmark.agcm_timings.append((shortname, measures[4], parent))
-
-    # Get details for Turbulence physics
-    chemenv_profiler_entry = "Times for component <CHEMENV>"
-    turbulence_profiler_patterns = [
-        ("--------REFRESHKS", "REFRESHKS", "TURBULENCE"),
-        ("----------PRELIMS", "PRELIMS", "REFRESHKS"),
-        ("----------MASSFLUX", "MASSFLUX", "REFRESHKS"),
-        ("----------LOUIS", "LOUIS", "REFRESHKS"),
-        ("----------LOCK", "LOCK", "REFRESHKS"),
-        ("----------POSTLOCK", "POSTLOCK", "REFRESHKS"),
-        ("----------BELJAARS", "BELJAARS", "REFRESHKS"),
-        ("----------DECOMP", "DECOMP", "REFRESHKS"),
-        ("--------DIFFUSE", "DIFFUSE", "TURBULENCE"),
-    ]
-    for pattern, shortname, parent in turbulence_profiler_patterns:
-        measures = extract_numerics(
-            grep(
-                filename,
-                pattern,
-                start_patterns=[turbulence_profiler_entry],
-                end_pattern=chemenv_profiler_entry,
-                expected=False,
-            )
-        )
-        if measures != []:
-            benchmark.agcm_timings.append((shortname, measures[4], parent))
+        for name, time, parent in run_timings
+    )
 
-    # AGCM (for GEOS-FP)
-    global_profiler_entry_then_run = [global_profiler_entry, "--Run"]
-    end_of_log_entry = "GEOSgcm Run Status"
-    agcm_profiler_patterns = [
-        ("------AGCM", "AGCM", ""),
-        ("--------SUPERDYNAMICS", "SUPERDYNAMICS", "AGCM"),
-        ("----------DYN", "DYN", "SUPERDYNAMICS"),
-        ("--------PHYSICS", "PHYSICS", "AGCM"),
-        ("----------GWD", "GWD", "PHYSICS"),
-        ("----------MOIST", "MOIST", "PHYSICS"),
-        ("----------TURBULENCE", "TURBULENCE", "PHYSICS"),
-        ("----------CHEMISTRY", "CHEMISTRY", "PHYSICS"),
-        ("------------CHEMENV", "CHEMENV", "CHEMISTRY"),
-        ("------------HEMCO", "HEMCO", "CHEMISTRY"),
-        ("------------PCHEM", "PCHEM", "CHEMISTRY"),
-        ("------------ACHEM", "ACHEM", "CHEMISTRY"),
-        ("------------GOCART", "GOCART", "CHEMISTRY"),
-        ("------------GOCART2G", "GOCART2G", "CHEMISTRY"),
-        ("------------TR", "TR", "CHEMISTRY"),
-        ("----------SURFACE", "SURFACE", "PHYSICS"),
-        ("------------SALTWATER", "SALTWATER", "SURFACE"),
-        ("--------------SEAICETHERMO", "SEAICETHERMO", "SALTWATER"),
-        ("--------------OPENWATER", "OPENWATER", "SALTWATER"),
-        ("------------LAKE", "LAKE", "SURFACE"),
-        ("------------LANDICE", "LANDICE", "SURFACE"),
-        ("------------LAND", "LAND", "SURFACE"),
-        ("--------------VEGDYN", "VEGDYN", "LAND"),
-        ("--------------CATCH", "CATCH", "LAND"),
-        ("----------RADIATION", "RADIATION", "PHYSICS"),
-        ("------------SOLAR", "SOLAR", "RADIATION"),
-        ("------------IRRAD", "IRRAD", "RADIATION"),
-        ("------------SATSIM", "SATSIM", "RADIATION"),
-        ("--------ORBIT", "ORBIT", "AGCM"),
-    ]
-    for pattern, shortname, parent in agcm_profiler_patterns:
-        measures = extract_numerics(
-            grep(
-                filename,
-                pattern,
-                start_patterns=global_profiler_entry_then_run,
-                end_pattern=end_of_log_entry,
-                expected=False,
-                starts_with=True,
-            )
-        )
-        if measures != []:
-            if shortname == "GOCART2G":
-                # Bug reading the "2" as a measure
-                benchmark.agcm_timings.append((shortname, measures[2], parent))
-            elif shortname == "LAND":
-                # Bug reading LANDICE in LAND
-                benchmark.agcm_timings.append((shortname, measures[6], parent))
-            else:
-                benchmark.agcm_timings.append((shortname, measures[1], parent))
+    return benchmark
 
-    # OGCM minus the AGCM tag (for GEOS-FP)
-    global_profiler_entry = "Model Throughput"
-    global_profiler_entry_then_run = [global_profiler_entry, "--Run"]
-    end_of_log_entry = "GEOSgcm Run Status"
-    ogcm_profiler_patterns = [
-        ("------OGCM", "OGCM", ""),
-        ("--------ORAD", "ORAD", "OGCM"),
-        ("--------SEAICE", "SEAICE", "OGCM"),
-        ("----------DATASEAICE", "DATASEAICE", "SEAICE"),
-        ("--------OCEAN", "OCEAN", "OGCM"),
-        ("----------DATASEA", "DATASEA", "OCEAN"),
-    ]
-    for pattern, shortname, parent in ogcm_profiler_patterns:
-        measures = extract_numerics(
-            grep(
-                filename,
-                pattern,
-                start_patterns=global_profiler_entry_then_run,
-                end_pattern=end_of_log_entry,
-                expected=False,
-                starts_with=True,
-            )
-        )
-        if measures != []:
-            if shortname == "DATASEA":
-                # Bug reading DATASEA in DATASEAICE
-                benchmark.ogcm_timings.append((shortname, measures[6], parent))
-            elif shortname == "SEAICE":
-                # Bug reading SEAICE in SEAICETHERMO
-                benchmark.ogcm_timings.append((shortname, measures[6], parent))
-            else:
-                benchmark.ogcm_timings.append((shortname, measures[1], parent))
 
-    # Full run
-    global_profiler_entry = "Model Throughput"
-    global_profiler_entry_then_run = [global_profiler_entry, "--Run"]
-    end_of_log_entry = "GEOSgcm Run Status"
-    run_profiler_patterns = [
-        ("--Run", "RUN", ""),
-        ("----EXTDATA", "EXTDATA", "RUN"),
-        ("----GCM", "GCM", "RUN"),
-        ("------AIAU", "AIAU", "GCM"),
-        ("------ADFI", "ADFI", "GCM"),
-        ("----HIST", "HIST", "RUN"),
-    ]
-    for pattern, shortname, parent in run_profiler_patterns:
-        measures = extract_numerics(
-            grep(
-                filename,
-                pattern,
-                start_patterns=global_profiler_entry_then_run,
-                end_pattern=end_of_log_entry,
-                expected=False,
-                starts_with=True,
-            )
-        )
-        if measures != []:
-            benchmark.run_timings.append((shortname, measures[1], parent))
+def parse_geos_logs(filenames: List[str], jobs: Optional[int] = 1) -> List[Benchmark]:
+    """Parse multiple GEOS logs, `jobs` at a time (None: one per CPU).
 
-    return benchmark
+    Benchmarks are returned in the order of `filenames` whatever the
+    order in which the parsing processes finish."""
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(filenames))
+    if jobs <= 1:
+        return [parse_geos_log(filename) for filename in filenames]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(parse_geos_log, filenames))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,298 @@
+import datetime
+import math
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from tcn.benchmark.archive import from_arrow, to_arrow
+from tcn.benchmark.benchmark import Benchmark
+from tcn.validation.geos_status import GEOSStatus
+
+# Environment variable pointing to the persistent history database (or the
+# directory holding it)
+BENCHMARK_HISTORY_ENV = "TCN_BENCHMARK_HISTORY"
+BENCHMARK_HISTORY_FILENAME = "benchmark_history.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    experiment TEXT NOT NULL,
+    geos_version TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    layout TEXT NOT NULL,
+    global_run_time REAL NOT NULL,
+    fv_dyncore_timings BLOB NOT NULL,
+    benchmark BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_setup
+    ON runs (experiment, backend, resolution, layout, id);
+CREATE TABLE IF NOT EXISTS repositories (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    name TEXT NOT NULL,
+    hexsha TEXT NOT NULL,
+    tag TEXT
+);
+"""
+
+
+def history_path(path: str = "") -> str:
+    """Persistent history database: `path`, else `TCN_BENCHMARK_HISTORY`.
+
+    Raises when neither is set or the directory does not exist - a history
+    kept in a per run directory never sees a previous run to compare to."""
+    path = path or os.getenv(BENCHMARK_HISTORY_ENV, "")
+    if path == "":
+        raise RuntimeError(
+            f"No benchmark history: set {BENCHMARK_HISTORY_ENV} to a database "
+            "path that persists across CI runs"
+        )
+    if os.path.isdir(path):
+        path = os.path.join(path, BENCHMARK_HISTORY_FILENAME)
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory):
+        raise RuntimeError(f"Benchmark history directory {directory} does not exist")
+    return path
+
+
+def configured_history_path(path: str = "") -> Optional[str]:
+    """`history_path` when a history is configured, None otherwise (the
+    history & the regression check are then skipped, with a warning)"""
+    if (path or os.getenv(BENCHMARK_HISTORY_ENV, "")) == "":
+        print(
+            f"Warning: {BENCHMARK_HISTORY_ENV} is not set, benchmarks are "
+            "reported without history nor regression check"
+        )
+        return None
+    return history_path(path)
+
+
+def resolution_of(benchmark: Benchmark) -> str:
+    return f"C{benchmark.grid_resolution[0]}-L{benchmark.grid_resolution[2]}"
+
+
+def layout_of(benchmark: Benchmark) -> str:
+    return f"{benchmark.node_setup[0]}x{benchmark.node_setup[1]}"
+
+
+@dataclass
+class Regression:
+    run_id: int
+    experiment: str
+    backend: str
+    resolution: str
+    layout: str
+    baseline_median: float  # seconds per dycore timestep
+    median: float  # seconds per dycore timestep
+    p_value: float
+
+    @property
+    def slowdown(self) -> float:
+        return self.median / self.baseline_median
+
+    def __str__(self) -> str:
+        return (
+            f"Regression on {self.experiment} {self.backend} "
+            f"{self.resolution} {self.layout} (run {self.run_id}): dycore median "
+            f"{self.baseline_median:.4f}s -> {self.median:.4f}s "
+            f"({self.slowdown:.2f}x, p={self.p_value:.2g})"
+        )
+
+
+def _rankdata(x: np.ndarray) -> np.ndarray:
+    """Ranks starting at 1, ties get the average rank"""
+    sorter = np.argsort(x, kind="mergesort")
+    inverse = np.empty(len(x), dtype=np.intp)
+    inverse[sorter] = np.arange(len(x))
+    x_sorted = x[sorter]
+    unique = np.r_[True, x_sorted[1:] != x_sorted[:-1]]
+    dense = np.cumsum(unique)[inverse]
+    bounds = np.r_[np.nonzero(unique)[0], len(unique)]
+    return 0.5 * (bounds[dense] + bounds[dense - 1] + 1)
+
+
+def mann_whitney_greater(sample: np.ndarray, baseline: np.ndarray) -> float:
+    """One-sided Mann-Whitney U test p-value for `sample` > `baseline`.
+
+    Normal approximation with tie & continuity corrections, good enough for the
+    tens-to-hundreds of timesteps of a benchmark run."""
+    n1, n2 = len(sample), len(baseline)
+    if n1 == 0 or n2 == 0:
+        return 1.0
+    ranks = _rankdata(np.concatenate([sample, baseline]))
+    u1 = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    _, tie_counts = np.unique(ranks, return_counts=True)
+    tie_term = (tie_counts**3 - tie_counts).sum() / (n * (n - 1)) if n > 1 else 0
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term))
+    if sigma == 0:
+        return 1.0
+    z = (u1 - n1 * n2 / 2 - 0.5) / sigma
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _dyncore_samples(timings: np.ndarray) -> np.ndarray:
+    # First timestep carries the initialization/caching: not representative
+    return timings[1:] if len(timings) > 1 else timings
+
+
+class BenchmarkHistory:
+    """Persistent history of benchmark runs (SQLite).
+
+    Runs are keyed by experiment, backend, resolution, layout and the GEOS
+    repositories hashes (see `tcn.validation.geos_status`)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> "BenchmarkHistory":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def append(
+        self,
+        benchmark: Benchmark,
+        status: GEOSStatus,
+        experiment: str,
+        timestamp: Optional[str] = None,
+    ) -> int:
+        sink = pa.BufferOutputStream()
+        pq.write_table(to_arrow([benchmark]), sink)
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (timestamp, experiment, geos_version, backend, "
+                "resolution, layout, global_run_time, fv_dyncore_timings, benchmark) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    timestamp or str(datetime.datetime.now()),
+                    experiment,
+                    status.digest,
+                    benchmark.backend,
+                    resolution_of(benchmark),
+                    layout_of(benchmark),
+                    benchmark.global_run_time,
+                    np.asarray(
+                        benchmark.fv_dyncore_timings, dtype=np.float64
+                    ).tobytes(),
+                    sink.getvalue().to_pybytes(),
+                ),
+            )
+            run_id = cursor.lastrowid
+            if run_id is None:
+                raise RuntimeError(f"Failed to record the benchmark in {self.path}")
+            self.connection.executemany(
+                "INSERT INTO repositories (run_id, name, hexsha, tag) "
+                "VALUES (?, ?, ?, ?)",
+                [(run_id, r.name, r.hexsha, r.tag) for r in status.repositories],
+            )
+        return run_id
+
+    def benchmark(self, run_id: int) -> Benchmark:
+        (blob,) = self.connection.execute(
+            "SELECT benchmark FROM runs WHERE id = ?", (run_id,)
+        ).fetchone()
+        return from_arrow(pq.read_table(pa.BufferReader(blob)))[0]
+
+    def dyncore_timings(
+        self,
+        experiment: str,
+        backend: str,
+        resolution: str,
+        layout: str,
+        before_run: Optional[int] = None,
+        last: Optional[int] = None,
+    ) -> List[np.ndarray]:
+        """Per-timestep dycore timings of matching runs, oldest first"""
+        query = (
+            "SELECT fv_dyncore_timings FROM runs WHERE experiment = ? "
+            "AND backend = ? AND resolution = ? AND layout = ?"
+        )
+        parameters: list = [experiment, backend, resolution, layout]
+        if before_run is not None:
+            query += " AND id < ?"
+            parameters.append(before_run)
+        query += " ORDER BY id DESC"
+        if last is not None:
+            query += " LIMIT ?"
+            parameters.append(last)
+        rows = self.connection.execute(query, parameters).fetchall()
+        return [np.frombuffer(blob, dtype=np.float64) for (blob,) in reversed(rows)]
+
+    def detect_regression(
+        self,
+        run_id: int,
+        baseline_runs: int = 5,
+        alpha: float = 0.01,
+        min_slowdown: float = 1.05,
+    ) -> Optional[Regression]:
+        """Compare the dycore timesteps of `run_id` to the `baseline_runs` runs
+        before it on the same setup. Flags a regression when the run is
+        significantly (Mann-Whitney, `alpha`) and noticeably (`min_slowdown`)
+        slower."""
+        row = self.connection.execute(
+            "SELECT experiment, backend, resolution, layout, fv_dyncore_timings "
+            "FROM runs WHERE id = ?",
+            (run_id,),
+        ).fetchone()
+        if row is None:
+            raise RuntimeError(f"No benchmark run {run_id} in {self.path}")
+        experiment, backend, resolution, layout, blob = row
+        sample = _dyncore_samples(np.frombuffer(blob, dtype=np.float64))
+        history = self.dyncore_timings(
+            experiment,
+            backend,
+            resolution,
+            layout,
+            before_run=run_id,
+            last=baseline_runs,
+        )
+        if history == [] or len(sample) == 0:
+            return None
+        baseline = np.concatenate([_dyncore_samples(t) for t in history])
+        if len(baseline) == 0:
+            return None
+
+        p_value = mann_whitney_greater(sample, baseline)
+        regression = Regression(
+            run_id=run_id,
+            experiment=experiment,
+            backend=backend,
+            resolution=resolution,
+            layout=layout,
+            baseline_median=float(np.median(baseline)),
+            median=float(np.median(sample)),
+            p_value=p_value,
+        )
+        if p_value < alpha and regression.slowdown >= min_slowdown:
+            return regression
+        return None
+
+
+def record_benchmarks(
+    path: str,
+    benchmarks: List[Benchmark],
+    status: GEOSStatus,
+    experiment: str,
+) -> List[Regression]:
+    """Append `benchmarks` to the history at `path` and return regressions"""
+    regressions = []
+    with BenchmarkHistory(path) as history:
+        for benchmark in benchmarks:
+            run_id = history.append(benchmark, status, experiment)
+            regression = history.detect_regression(run_id)
+            if regression:
+                regressions.append(regression)
+    return regressions
@@ -0,0 +1,139 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from tcn.benchmark.string_trf import decode_line, grep_lines, iter_lines_with
+
+# Markers recorded while streaming the log. Any query pattern has to contain one
+# of those so it can be answered from the recorded lines.
+LOG_MARKER_COMPONENT = "Times for component <"
+LOG_MARKER_THROUGHPUT = "Model Throughput"
+LOG_MARKER_RUN_STATUS = "GEOSgcm Run Status"
+LOG_MARKER_RESOURCE = "Resource Parameter"
+GEOS_LOG_MARKERS = [
+    LOG_MARKER_COMPONENT,
+    LOG_MARKER_THROUGHPUT,
+    LOG_MARKER_RUN_STATUS,
+    LOG_MARKER_RESOURCE,
+    "Resolution of dynamics restart",
+    "RUN_GTFV3",
+    "backend : ",
+    "geos_gtfv3",
+    "] Run...",
+    "fv_dynamics",
+]
+# Markers opening the profiler report printed at the end of the run
+REPORT_MARKERS = [LOG_MARKER_COMPONENT, LOG_MARKER_THROUGHPUT]
+
+_RE_COMPONENT = re.compile(r"Times for component <(.*?)>")
+
+
+class GEOSLogIndex:
+    """Single pass index of a GEOS log.
+
+    The log is scanned once. We keep the byte offset & content of every line
+    carrying one of the `GEOS_LOG_MARKERS` and the full profiler report (from
+    the first "Times for component" or "Model Throughput" to the end of the log).
+    `grep` then answers the same queries as `string_trf.grep` without going
+    back to the file.
+    """
+
+    def __init__(self, filename: str, markers: List[str] = GEOS_LOG_MARKERS):
+        self.filename = filename
+        self.markers = markers
+        # marker -> [(byte offset, line)]
+        self.marker_lines: Dict[str, List[Tuple[int, str]]] = {m: [] for m in markers}
+        # component name -> byte offset of its "Times for component <X>" header
+        self.sections: Dict[str, int] = {}
+        # Offset of the first line of the profiler report
+        self.report_offset: Optional[int] = None
+        self.report_lines: List[Tuple[int, str]] = []
+        self._index()
+
+    def _record(self, offset: int, line: str):
+        for marker in self.markers:
+            if marker in line:
+                self.marker_lines[marker].append((offset, line))
+        if LOG_MARKER_COMPONENT in line:
+            component = _RE_COMPONENT.search(line)
+            if component and component.group(1) not in self.sections:
+                self.sections[component.group(1)] = offset
+
+    def _index(self):
+        # Jump from marker to marker until the profiler report starts...
+        for offset, line in iter_lines_with(self.filename, self.markers):
+            if any(m in line for m in REPORT_MARKERS):
+                self.report_offset = offset
+                break
+            self._record(offset, line)
+        if self.report_offset is None:
+            return
+        # ... then keep every line of the report
+        offset = self.report_offset
+        with open(self.filename, "rb") as f:
+            f.seek(offset)
+            for raw_line in f:
+                line = decode_line(raw_line)
+                self._record(offset, line)
+                self.report_lines.append((offset, line))
+                offset += len(raw_line)
+
+    def _marker_for(self, pattern: str) -> str:
+        for marker in self.markers:
+            if marker in pattern:
+                return marker
+        raise ValueError(
+            f"Pattern '{pattern}' can't be answered by the log index "
+            f"(indexed markers: {self.markers})"
+        )
+
+    def offsets(self, pattern: str) -> List[int]:
+        """Byte offsets of all lines containing `pattern`"""
+        marker = self._marker_for(pattern)
+        return [o for o, line in self.marker_lines[marker] if pattern in line]
+
+    def lines(self, pattern: str) -> List[str]:
+        """All lines containing `pattern`"""
+        marker = self._marker_for(pattern)
+        return [line for _, line in self.marker_lines[marker] if pattern in line]
+
+    def grep(
+        self,
+        pattern: str,
+        exclude_pattern: Optional[bool] = False,
+        start_patterns: Optional[List[str]] = None,
+        end_pattern: Optional[str] = None,
+        expected: Optional[bool] = True,
+        starts_with: bool = False,
+    ) -> List[str]:
+        """Indexed equivalent of `string_trf.grep`.
+
+        Windowed queries (start/end patterns) must start on a report marker
+        and are answered from the profiler report lines."""
+        if not start_patterns:
+            if end_pattern:
+                raise ValueError("Indexed grep needs a start pattern for a window")
+            lines = self.lines(pattern)
+        else:
+            if not any(m in start_patterns[0] for m in REPORT_MARKERS):
+                raise ValueError(
+                    f"Indexed grep windows must start on a report marker "
+                    f"({REPORT_MARKERS}), got '{start_patterns[0]}'"
+                )
+            start_offsets = self.offsets(start_patterns[0])
+            end_offsets = self.offsets(end_pattern) if end_pattern else []
+            if start_offsets == [] or (
+                end_offsets != [] and end_offsets[0] < start_offsets[0]
+            ):
+                # Window never opens before the log (or the end pattern) ends
+                lines = []
+            else:
+                lines = [line for o, line in self.report_lines if o >= start_offsets[0]]
+        return grep_lines(
+            lines,
+            pattern,
+            exclude_pattern=exclude_pattern,
+            start_patterns=start_patterns,
+            end_pattern=end_pattern,
+            expected=expected,
+            starts_with=starts_with,
+        )
@@ -0,0 +1,210 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tcn.benchmark.string_trf import extract_numerics, line_tokens
+
+# Root of the global profiler printed after "Model Throughput"
+GLOBAL_PROFILE = "All"
+# Timers MAPL adds to every component: not user timers (case insensitive)
+MAPL_FRAMEWORK_TIMERS = {
+    name.lower()
+    for name in [
+        "SetService",
+        "Initialize",
+        "Run",
+        "Run1",
+        "Run2",
+        "Finalize",
+        "Record",
+        "Refresh",
+        "GenSetService",
+        "GenInitialize",
+        "GenRun",
+        "GenFinalize",
+        "GenRecord",
+        "GenRefresh",
+        "GenRunMine",
+        "generic",
+    ]
+}
+
+# Measures of a "Times for component" line over all PEs: % inclusive exclusive
+# for the Min, Mean & Max, then the PEs of the max & min and the # of cycles
+COMPONENT_MIN_INCLUSIVE = 1
+COMPONENT_MEAN_INCLUSIVE = 4
+COMPONENT_MAX_INCLUSIVE = 7
+COMPONENT_MAX_PE = 9
+COMPONENT_COLUMNS = 11
+
+_RE_COMPONENT = re.compile(r"Times for component <(.*?)>")
+_THROUGHPUT_MARKER = "Model Throughput"
+_PATH_SEPARATOR = "/"
+
+
+@dataclass
+class TimerNode:
+    name: str
+    path: str
+    level: int  # number of leading dashes in the profiler
+    measures: List[float] = field(default_factory=list)
+    parent: Optional["TimerNode"] = field(default=None, repr=False)
+    children: Dict[str, "TimerNode"] = field(default_factory=dict, repr=False)
+
+    @property
+    def is_framework(self) -> bool:
+        return self.name.lower() in MAPL_FRAMEWORK_TIMERS
+
+    def walk(self) -> Iterator["TimerNode"]:
+        """Pre-order traversal (= order of the profiler)"""
+        yield self
+        for child in self.children.values():
+            yield from child.walk()
+
+
+@dataclass
+class MAPLProfile:
+    """All MAPL timer trees of a log: one per "Times for component <X>" block,
+    plus the global profiler (root `GLOBAL_PROFILE`).
+
+    Every node is reachable in O(1) by its path, e.g. `DYN/Run/DYN_CORE`."""
+
+    blocks: Dict[str, TimerNode] = field(default_factory=dict)
+    nodes: Dict[str, TimerNode] = field(default_factory=dict)
+
+    def __getitem__(self, path: str) -> TimerNode:
+        return self.nodes[path]
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.nodes
+
+    def get(self, path: str) -> Optional[TimerNode]:
+        return self.nodes.get(path)
+
+    @property
+    def components(self) -> List[str]:
+        return [name for name in self.blocks if name != GLOBAL_PROFILE]
+
+    def find(self, root: TimerNode, name: str) -> Optional[TimerNode]:
+        """First node called `name` under `root` (pre-order)"""
+        for node in root.walk():
+            if node.name == name:
+                return node
+        return None
+
+    def user_timers(
+        self, component: str, column: int, phases: Iterable[str] = ()
+    ) -> List[Tuple[str, float, str]]:
+        """(name, measure, parent) of the timers a component declares itself,
+        in the given `phases` only (e.g. `Run`, case insensitive) if any.
+
+        MAPL framework timers & child components are skipped, the parent is
+        the closest ancestor that was kept (or the component)."""
+        timings = []
+        root = self.blocks[component]
+        selected = {phase.lower() for phase in phases}
+        nodes = (
+            (node for node in root.walk())
+            if not selected
+            else (
+                node
+                for phase in root.children.values()
+                if phase.name.lower() in selected
+                for node in phase.walk()
+            )
+        )
+        for node in nodes:
+            if node.parent is None or node.is_framework or node.name in self.blocks:
+                continue
+            parent = node.parent
+            while parent.parent is not None and (
+                parent.is_framework or parent.name in self.blocks
+            ):
+                parent = parent.parent
+            if len(node.measures) > column:
+                timings.append((node.name, node.measures[column], parent.name))
+        return timings
+
+    def subtree_timings(
+        self,
+        root: TimerNode,
+        column: int,
+        exclude: Iterable[str] = (),
+    ) -> List[Tuple[str, float, str]]:
+        """(name, measure, parent) of `root` and all its descendants, skipping
+        the subtrees of nodes named in `exclude`. `root` has no parent."""
+        timings = []
+        excluded = set(exclude)
+
+        def _walk(node: TimerNode, parent: str):
+            if node.name in excluded:
+                return
+            if len(node.measures) > column:
+                timings.append((node.name, node.measures[column], parent))
+            for child in node.children.values():
+                _walk(child, node.name)
+
+        _walk(root, "")
+        return timings
+
+
+def timer_line(line: str) -> Optional[Tuple[str, int, List[float]]]:
+    """(name, level, measures) of a MAPL profiler line such as
+    `profiler: ----FV_INIT | 0.05 0.01 0.01 | ...`, None if it isn't one"""
+    tokens = line_tokens(line)
+    if tokens == []:
+        return None
+    name = tokens[0].lstrip("-")
+    measures = extract_numerics([" ".join(tokens[1:])])
+    if name == "" or measures == []:
+        return None
+    return name, len(tokens[0]) - len(name), measures
+
+
+def parse_mapl_profile(lines: Iterable[str]) -> MAPLProfile:
+    """Build every MAPL timer tree in a single pass over the log lines"""
+    profile = MAPLProfile()
+    expected_root: Optional[str] = None
+    stack: List[TimerNode] = []
+
+    for line in lines:
+        header = _RE_COMPONENT.search(line)
+        if header or _THROUGHPUT_MARKER in line:
+            expected_root = header.group(1) if header else GLOBAL_PROFILE
+            stack = []
+            continue
+        if expected_root is None:
+            continue
+        timer = timer_line(line)
+
+        if stack == []:
+            # Skip table headers until the root line of the block
+            if timer and timer[0] == expected_root and timer[1] == 0:
+                root = TimerNode(name=timer[0], path=timer[0], level=0)
+                root.measures = timer[2]
+                profile.blocks.setdefault(expected_root, root)
+                profile.nodes.setdefault(root.path, root)
+                stack = [root]
+            continue
+        if timer is None or timer[1] == 0:
+            # End of the block
+            expected_root = None
+            stack = []
+            continue
+
+        name, level, measures = timer
+        while len(stack) > 1 and stack[-1].level >= level:
+            stack.pop()
+        parent = stack[-1]
+        node = TimerNode(
+            name=name,
+            path=f"{parent.path}{_PATH_SEPARATOR}{name}",
+            level=level,
+            measures=measures,
+            parent=parent,
+        )
+        parent.children.setdefault(name, node)
+        profile.nodes.setdefault(node.path, node)
+        stack.append(node)
+
+    return profile
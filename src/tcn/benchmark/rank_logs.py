@@ -0,0 +1,224 @@
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tcn.benchmark.log_index import GEOSLogIndex
+from tcn.benchmark.mapl_profiler import (
+    COMPONENT_COLUMNS,
+    COMPONENT_MAX_INCLUSIVE,
+    COMPONENT_MAX_PE,
+    COMPONENT_MEAN_INCLUSIVE,
+    COMPONENT_MIN_INCLUSIVE,
+    GLOBAL_PROFILE,
+    parse_mapl_profile,
+)
+from tcn.benchmark.string_trf import (
+    TIME_TAKEN_PREFIX,
+    TIME_TAKEN_SUFFIX,
+    extract_table,
+)
+
+# Per-timestep timers printed by every rank: name -> log pattern and the
+# prefix & suffix around the measure, e.g. `0: fv_dynamics: time taken = 0.19 s`
+PER_TIMESTEP_PATTERNS = {
+    "fv_dynamics": (": fv_dynamics", TIME_TAKEN_PREFIX, TIME_TAKEN_SUFFIX),
+    "geos_gtfv3": (" , geos_gtfv3", "", ""),
+    "dace_run": ("] Run...", "", "s."),
+}
+# Column of the inclusive time in a MAPL profiler line (after the name)
+MAPL_INCLUSIVE_COLUMN = 1
+
+# SLURM `%t` outputs (`name.3.out`) or per rank directories (`rank.3/stdout`)
+_RE_RANK = re.compile(r"(?:\.(\d+)\.out|rank\.(\d+)[/\\]stdout)$")
+
+
+@dataclass
+class ComponentImbalance:
+    component: str
+    min: float  # seconds, fastest rank
+    max: float  # seconds, slowest rank
+    mean: float  # seconds
+    imbalance: float  # max / mean
+    slowest_ranks: List[int] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.component:<20} min {self.min:10.3f}s  max {self.max:10.3f}s  "
+            f"mean {self.mean:10.3f}s  imbalance {self.imbalance:5.2f}x  "
+            f"slowest ranks {self.slowest_ranks}"
+        )
+
+
+@dataclass
+class RankTimings:
+    """Timings of all ranks of a run.
+
+    `timings` is indexed by rank x component x timestep (seconds, NaN when
+    missing). MAPL components only carry their total in timestep 0."""
+
+    ranks: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    components: List[str] = field(default_factory=list)
+    timings: np.ndarray = field(default_factory=lambda: np.zeros((0, 0, 0)))
+    # Imbalance over the PEs as MAPL reports it in the root rank log
+    pe_imbalance: List[ComponentImbalance] = field(default_factory=list)
+
+    def component_index(self, component: str) -> int:
+        return self.components.index(component)
+
+    def totals(self) -> np.ndarray:
+        """Total time per rank x component (NaN when never measured)"""
+        measured = ~np.isnan(self.timings)
+        totals = np.where(measured, self.timings, 0.0).sum(axis=2)
+        totals[~measured.any(axis=2)] = np.nan
+        return totals
+
+    def per_timestep_imbalance(self, component: str) -> np.ndarray:
+        """Max over mean across ranks, for each timestep of `component`"""
+        series = self.timings[:, self.component_index(component), :]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.nanmax(series, axis=0) / np.nanmean(series, axis=0)
+
+    def imbalance(self, slowest_count: int = 3) -> List[ComponentImbalance]:
+        totals = self.totals()
+        measured = ~np.isnan(totals)
+        counts = measured.sum(axis=0)
+        masked = np.where(measured, totals, 0.0)
+        mean = masked.sum(axis=0) / np.maximum(counts, 1)
+        minimum = np.where(measured, totals, np.inf).min(axis=0)
+        maximum = np.where(measured, totals, -np.inf).max(axis=0)
+        # Slowest first, unmeasured ranks last
+        order = np.argsort(np.where(measured, -totals, np.inf), axis=0, kind="stable")
+
+        results = []
+        for c, component in enumerate(self.components):
+            if counts[c] == 0:
+                continue
+            slowest = order[: min(slowest_count, counts[c]), c]
+            results.append(
+                ComponentImbalance(
+                    component=component,
+                    min=float(minimum[c]),
+                    max=float(maximum[c]),
+                    mean=float(mean[c]),
+                    imbalance=float(maximum[c] / mean[c]) if mean[c] > 0 else 1.0,
+                    slowest_ranks=[int(r) for r in self.ranks[slowest]],
+                )
+            )
+        return results + [
+            c for c in self.pe_imbalance if c.component not in self.components
+        ]
+
+    def __str__(self) -> str:
+        s = (
+            f"{len(self.ranks)} ranks, {len(self.components)} per rank timers, "
+            f"{len(self.pe_imbalance)} MAPL components\n"
+        )
+        for component_imbalance in self.imbalance():
+            s += f"  {component_imbalance}\n"
+        return s
+
+
+def rank_log_files(log_pattern: str) -> List[str]:
+    """All per-rank logs of a SLURM `%t` output pattern, sorted by rank"""
+    logs = glob.glob(log_pattern.replace("%t", "*"))
+    return sorted(
+        logs, key=lambda log: (_rank_of(log) is None, _rank_of(log) or 0, log)
+    )
+
+
+def _rank_of(filename: str) -> Optional[int]:
+    rank = _RE_RANK.search(filename)
+    return int(rank.group(1) or rank.group(2)) if rank else None
+
+
+def _parse_rank_log(
+    filename: str,
+) -> Tuple[Dict[str, List[float]], Dict[str, float], Dict[str, ComponentImbalance]]:
+    log = GEOSLogIndex(filename)
+
+    per_timestep = {}
+    for name, (pattern, prefix, suffix) in PER_TIMESTEP_PATTERNS.items():
+        values = log.grep(pattern, exclude_pattern=True, expected=False)
+        if values != []:
+            measures = extract_table(
+                values, columns=1, skip=0, prefix=prefix, suffix=suffix
+            )[:, 0]
+            per_timestep[name] = measures[~np.isnan(measures)].tolist()
+
+    # Time of the component itself, root of its own MAPL block
+    profile = parse_mapl_profile(line for _, line in log.report_lines)
+    components = {}
+    over_pes = {}
+    for name, root in profile.blocks.items():
+        if name == GLOBAL_PROFILE:
+            continue
+        root_measures = root.measures
+        if len(root_measures) >= COMPONENT_COLUMNS:
+            # Min/Mean/Max over the PEs, printed by the root rank only
+            mean = root_measures[COMPONENT_MEAN_INCLUSIVE]
+            maximum = root_measures[COMPONENT_MAX_INCLUSIVE]
+            over_pes[name] = ComponentImbalance(
+                component=name,
+                min=root_measures[COMPONENT_MIN_INCLUSIVE],
+                max=maximum,
+                mean=mean,
+                imbalance=maximum / mean if mean > 0 else 1.0,
+                slowest_ranks=[int(root_measures[COMPONENT_MAX_PE])],
+            )
+        elif len(root_measures) > MAPL_INCLUSIVE_COLUMN:
+            # Profiler of this rank alone
+            components[name] = root_measures[MAPL_INCLUSIVE_COLUMN]
+    return per_timestep, components, over_pes
+
+
+def parse_rank_logs(filenames: List[str], jobs: Optional[int] = 1) -> RankTimings:
+    """Aggregate the timings of per-rank logs into a `RankTimings` table"""
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(filenames))
+    if jobs <= 1:
+        parsed = [_parse_rank_log(filename) for filename in filenames]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            parsed = list(executor.map(_parse_rank_log, filenames))
+
+    ranks = [_rank_of(f) for f in filenames]
+    if None in ranks:
+        ranks = list(range(len(filenames)))
+
+    series_names = [
+        n for n in PER_TIMESTEP_PATTERNS if any(n in p for p, _, _ in parsed)
+    ]
+    component_names: List[str] = []
+    over_pes: Dict[str, ComponentImbalance] = {}
+    for _, components, log_over_pes in parsed:
+        for name in components:
+            if name not in component_names:
+                component_names.append(name)
+        for name, component_imbalance in log_over_pes.items():
+            over_pes.setdefault(name, component_imbalance)
+    n_timesteps = max(
+        [len(v) for per_timestep, _, _ in parsed for v in per_timestep.values()] + [1]
+    )
+
+    names = series_names + component_names
+    timings = np.full((len(filenames), len(names), n_timesteps), np.nan)
+    for r, (per_timestep, components, _) in enumerate(parsed):
+        for c, name in enumerate(series_names):
+            values = per_timestep.get(name, [])
+            timings[r, c, : len(values)] = values
+        for c, name in enumerate(component_names, start=len(series_names)):
+            if name in components:
+                timings[r, c, 0] = components[name]
+
+    return RankTimings(
+        ranks=np.array(ranks, dtype=np.int64),
+        components=names,
+        timings=timings,
+        pe_imbalance=list(over_pes.values()),
+    )
@@ -6,9 +6,9 @@ import click
 import numpy as np
 import plotly.graph_objects as go
 
-from tcn.benchmark.geos_log_parser import parse_geos_log
+from tcn.benchmark.geos_log_parser import parse_geos_logs
 from tcn.benchmark.benchmark import Benchmark
-from tcn.hws.graph import energy_envelop_calculation
+from tcn.hws.analysis import dataset_energy_calculation
 
 
 @dataclass
@@ -169,10 +169,7 @@ def report(raw_data: List[Benchmark]) -> Optional[BenchmarkReport]:
         if benchA.hws_data != {}:
             energy_report = f"{benchA.backend} vs {benchB.backend}\n\n"
 
-            eReport = energy_envelop_calculation(
-                benchA.hws_data["cpu_psu"],
-                benchA.hws_data["gpu_psu"],
-            )
+            eReport = dataset_energy_calculation(benchA.hws_data)
             if benchA.backend == "fortran":
                 benchA_global_kW_envelop = eReport.CPU_envelop_kWh
             else:
@@ -180,10 +177,7 @@ def report(raw_data: List[Benchmark]) -> Optional[BenchmarkReport]:
                     eReport.GPU_envelop_kWh + eReport.CPU_envelop_kWh
                 )
 
-            eReport = energy_envelop_calculation(
-                benchB.hws_data["cpu_psu"],
-                benchB.hws_data["gpu_psu"],
-            )
+            eReport = dataset_energy_calculation(benchB.hws_data)
             if benchB.backend == "fortran":
                 benchB_global_kW_envelop = eReport.CPU_envelop_kWh
             else:
@@ -206,14 +200,13 @@ def report(raw_data: List[Benchmark]) -> Optional[BenchmarkReport]:
 
 @click.command()
 @click.argument("geos_logs", nargs=-1)
-def cli(geos_logs: Iterable[str]):
-    benchmark_raw_data: List[Benchmark] = []
-    for log in geos_logs:
-        benchmark_raw_data.append(parse_geos_log(log))
+@click.option("--jobs", "-j", default=1, help="Number of logs parsed in parallel")
+def cli(geos_logs: Iterable[str], jobs: int):
+    benchmark_raw_data = parse_geos_logs(list(geos_logs), jobs=jobs)
     r = report(benchmark_raw_data)
     print(r)
     for raw_data in benchmark_raw_data:
-        if raw_data.fv_gridcomp_detailed_profiling != []:
+        if len(raw_data.fv_gridcomp_detailed_profiling) > 0:
             sankey_plot_of_gridcomp(
                 raw_data,
                 f"FVGridComp_breakdown_{raw_data.backend_sanitized}",
@@ -1,5 +1,10 @@
+import mmap
+import os
 import re
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
 
 _numeric_const_pattern = (
     "[-+]? (?: (?: \d* \. \d+ ) | (?: \d+ \.? ) )(?: [Ee] [+-]? \d+ ) ?"  # noqa
@@ -8,12 +13,209 @@ RE_NUMERIC = re.compile(_numeric_const_pattern, re.VERBOSE)
 
 
 def extract_numerics(strings: List[str]) -> List[float]:
-    results = []
-    for s in strings:
-        for r in RE_NUMERIC.findall(s):
-            results.append(r)
+    return extract_numerics_array(strings).tolist()
+
+
+def extract_numerics_array(strings: Iterable[str]) -> np.ndarray:
+    """All numerics of `strings`, in order, as a float64 array.
+
+    One regex scan over the joined block (a numeric never spans a newline)
+    instead of one per string."""
+    found = RE_NUMERIC.findall("\n".join(strings))
+    return np.fromiter(map(float, found), dtype=np.float64, count=len(found))
+
+
+# Decorations of the numeric lines of a GEOS log: MAPL prints its report as
+# `profiler: NAME | ... | ...`, per timestep timers as `: time taken = 0.19 s`
+MAPL_PROFILER_PREFIX = "profiler:"
+MAPL_COLUMN_SEPARATOR = "|"
+TIME_TAKEN_PREFIX = ": time taken ="
+TIME_TAKEN_SUFFIX = "s"
+
+
+def line_tokens(
+    line: str,
+    prefix: str = MAPL_PROFILER_PREFIX,
+    suffix: str = "",
+    separator: str = MAPL_COLUMN_SEPARATOR,
+) -> List[str]:
+    """Whitespace tokens of `line` once the known `prefix` & `suffix` are
+    stripped and the column `separator` removed"""
+    line = line.strip()
+    if prefix and line.startswith(prefix):
+        line = line.replace(prefix, "", 1)
+    if suffix and line.endswith(suffix):
+        line = line[: len(line) - len(suffix)]
+    if separator:
+        line = line.replace(separator, " ")
+    return line.split()
+
+
+def extract_table(
+    lines: List[str],
+    columns: int,
+    skip: int = 1,
+    prefix: str = MAPL_PROFILER_PREFIX,
+    suffix: str = "",
+) -> np.ndarray:
+    """Fixed-width numeric table of whitespace separated `lines`, e.g. MAPL
+    profiler lines `profiler: --NAME | inclusive ...` (see `line_tokens`).
+
+    The first `skip` tokens of each line (the name) are dropped and the next
+    `columns` ones are converted in one go, short rows are NaN padded.
+    Returns a `(len(lines), columns)` array."""
+    padding = ["nan"] * columns
+    flat: List[str] = []
+    rows = [line_tokens(line, prefix, suffix)[skip:] for line in lines]
+    for tokens in rows:
+        flat.extend((tokens[:columns] + padding)[:columns])
+    try:
+        values = np.fromiter(map(float, flat), dtype=np.float64, count=len(flat))
+        return values.reshape(len(lines), columns)
+    except ValueError:
+        # Not a plain table: numerics of each row (slow path)
+        table = np.full((len(lines), columns), np.nan)
+        for row, tokens in enumerate(rows):
+            numerics = extract_numerics_array([" ".join(tokens)])
+            table[row, : min(columns, len(numerics))] = numerics[:columns]
+        return table
+
+
+@dataclass
+class GrepQuery:
+    """A single `grep` request, see `grep` for the arguments"""
+
+    pattern: str
+    exclude_pattern: Optional[bool] = False
+    start_patterns: Optional[List[str]] = None
+    end_pattern: Optional[str] = None
+    expected: Optional[bool] = True
+    starts_with: bool = False
+
+    @property
+    def needles(self) -> List[str]:
+        """All substrings that can change the state of the query"""
+        needles = [self.pattern]
+        if self.start_patterns:
+            needles.extend(self.start_patterns)
+        if self.end_pattern:
+            needles.append(self.end_pattern)
+        return needles
+
+
+class _GrepWindow:
+    """Line-by-line state of a `GrepQuery`.
+
+    Lines which contain none of the query needles do not change the state, which
+    lets callers skip them entirely."""
+
+    def __init__(self, query: GrepQuery):
+        self.query = query
+        self.spatterns = query.start_patterns.copy() if query.start_patterns else None
+        self.start_pattern = self.spatterns.pop(0) if self.spatterns else None
+        self.closed = False
+        self.results: List[str] = []
+
+    def feed(self, line: str):
+        q = self.query
+        if self.start_pattern and self.start_pattern in line:
+            if self.spatterns != []:
+                self.start_pattern = self.spatterns.pop(0) if self.spatterns else None
+            else:
+                self.start_pattern = None
+        if q.end_pattern and q.end_pattern in line:
+            self.closed = True
+            return
+        if not self.start_pattern and q.pattern in line:
+            if q.exclude_pattern and q.starts_with and line.startswith(q.pattern):
+                line = "".join(line.split(q.pattern)[1:])
+            elif q.exclude_pattern and q.pattern in line:
+                line = "".join(line.split(q.pattern)[1:])
+            if line != "":
+                self.results.append(line)
 
-    return [float(r) for r in results]
+    def finalize(self) -> List[str]:
+        if self.query.expected and self.results == []:
+            raise RuntimeError(f"Expecting {self.query.pattern} to be found")
+        return self.results
+
+
+def iter_lines_with(
+    filename: str,
+    patterns: Iterable[str],
+    start_offset: int = 0,
+) -> Iterator[Tuple[int, str]]:
+    """Yield (byte offset, line) of every line containing one of `patterns`.
+
+    The file is memory-mapped and searched with a single compiled regex, so
+    memory stays flat and the cost is one scan whatever the number of patterns.
+    Lines without any pattern are never decoded."""
+    if os.path.getsize(filename) == 0:
+        return
+    re_patterns = re.compile(
+        b"|".join(re.escape(p.encode("utf8")) for p in sorted(set(patterns)))
+    )
+    with open(filename, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm:
+        pos = start_offset
+        while True:
+            match = re_patterns.search(mm, pos)
+            if match is None:
+                return
+            line_start = mm.rfind(b"\n", 0, match.start()) + 1
+            line_end = mm.find(b"\n", match.end())
+            line_end = len(mm) if line_end == -1 else line_end + 1
+            yield line_start, decode_line(mm[line_start:line_end])
+            pos = line_end
+
+
+def decode_line(raw_line: bytes) -> str:
+    # Mimic text mode reads (utf8 & universal newlines)
+    return raw_line.decode("utf8", errors="replace").replace("\r\n", "\n")
+
+
+def grep_many(filename: str, queries: List[GrepQuery]) -> List[List[str]]:
+    """Answer all `queries` with a single scan of `filename`.
+
+    Reading stops as soon as every query window is closed by its end pattern."""
+    windows = [_GrepWindow(q) for q in queries]
+    needles = [n for q in queries for n in q.needles]
+    if needles != []:
+        for _, line in iter_lines_with(filename, needles):
+            for window in windows:
+                if not window.closed:
+                    window.feed(line)
+            if all(w.closed for w in windows):
+                break
+    return [w.finalize() for w in windows]
+
+
+def grep_lines(
+    lines: Iterable[str],
+    pattern: str,
+    exclude_pattern: Optional[bool] = False,
+    start_patterns: Optional[List[str]] = None,
+    end_pattern: Optional[str] = None,
+    expected: Optional[bool] = True,
+    starts_with: bool = False,
+) -> List[str]:
+    """`grep` on an already opened/indexed sequence of lines"""
+    window = _GrepWindow(
+        GrepQuery(
+            pattern,
+            exclude_pattern=exclude_pattern,
+            start_patterns=start_patterns,
+            end_pattern=end_pattern,
+            expected=expected,
+            starts_with=starts_with,
+        )
+    )
+    for line in lines:
+        window.feed(line)
+        if window.closed:
+            break
+    return window.finalize()
 
 
 def grep(
@@ -25,25 +227,16 @@ def grep(
     expected: Optional[bool] = True,
     starts_with: bool = False,
 ) -> List[str]:
-    results = []
-    spatterns = start_patterns.copy() if start_patterns else None
-    start_pattern = spatterns.pop(0) if spatterns else None
-    with open(filename, "r") as f:
-        for line in f.readlines():
-            if start_pattern and start_pattern and start_pattern in line:
-                if spatterns != []:
-                    start_pattern = spatterns.pop(0) if spatterns else None
-                else:
-                    start_pattern = None
-            if end_pattern and end_pattern in line:
-                break
-            if not start_pattern and pattern in line:
-                if exclude_pattern and starts_with and line.startswith(pattern):
-                    line = "".join(line.split(pattern)[1:])
-                elif exclude_pattern and pattern in line:
-                    line = "".join(line.split(pattern)[1:])
-                if line != "":
-                    results.append(line)
-    if expected and results == []:
-        raise RuntimeError(f"Expecting {pattern} to be found")
-    return results
+    return grep_many(
+        filename,
+        [
+            GrepQuery(
+                pattern,
+                exclude_pattern=exclude_pattern,
+                start_patterns=start_patterns,
+                end_pattern=end_pattern,
+                expected=expected,
+                starts_with=starts_with,
+            )
+        ],
+    )[0]
@@ -18,7 +18,10 @@ def cli(name: str, action: str, artifact: str, setup_only: bool):
     with the _ACTION_ (from  Validation, Benchmark or All).
 
     Environement variable:\n
-        CI_WORKSPACE: dispatch sets all work in this directory."""
+        CI_WORKSPACE: dispatch sets all work in this directory.\n
+        TCN_BENCHMARK_HISTORY: persistent benchmark history database (or its
+        directory) of the Benchmark check, which skips the regression check
+        without it."""
     dispatch(name, PipelineAction[action], artifact, setup_only)
 
 
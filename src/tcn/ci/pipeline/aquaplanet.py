@@ -5,15 +5,15 @@ from typing import Any, Dict
 
 import click
 
-from tcn.benchmark.geos_log_parser import parse_geos_log
-from tcn.benchmark.report import report
+from tcn.benchmark.history import BENCHMARK_HISTORY_ENV, configured_history_path
 from tcn.ci.actions.pipeline import PipelineAction
-from tcn.ci.pipeline.geos import copy_input_to_experiment_directory
+from tcn.ci.pipeline.geos import benchmark_check, copy_input_to_experiment_directory
 from tcn.ci.pipeline.task import TaskBase, get_config
 from tcn.ci.utils.environment import Environment
 from tcn.ci.utils.progress import Progress
 from tcn.ci.utils.registry import Registry
 from tcn.ci.utils.shell import ShellScript
+from tcn.validation.geos_status import get_geos_status
 
 
 def _replace_in_file(url: str, text_to_replace: str, new_text: str):
@@ -217,20 +217,28 @@ class Aquaplanet(TaskBase):
             env.experiment_action == PipelineAction.Benchmark
             or env.experiment_action == PipelineAction.All
         ):
+            # A configured history must persist: fails before any work
+            history = configured_history_path(env.get(BENCHMARK_HISTORY_ENV))
             for resolution in ["C180-L72"]:
-                logs = glob.glob(f"{geos_experiment_path}/{resolution}/benchmark.*")
+                logs = sorted(
+                    glob.glob(f"{geos_experiment_path}/{resolution}/benchmark.*")
+                )
                 benchmark_artifact = f"{artifact_directory}/Benchmark/{resolution}"
                 os.makedirs(benchmark_artifact, exist_ok=True)
-                bench_raw_data = []
+                rank0_logs = []
                 for log in logs:
                     shutil.copy(log, benchmark_artifact)
                     # Grab all rank 0 that are not caching runs
                     if ".0.out" in log and "cache" not in log:
-                        bench_raw_data.append(parse_geos_log(log))
-                benchmark_report = report(bench_raw_data)
-                print(benchmark_report)
-                with open(f"{benchmark_artifact}/report_benchmark.out", "w") as f:
-                    f.write(str(benchmark_report))
+                        rank0_logs.append(log)
+                # Keep history & flag slowdowns against previous runs
+                benchmark_check(
+                    rank0_logs,
+                    get_geos_status(geos_path),
+                    "Aquaplanet",
+                    history,
+                    benchmark_artifact,
+                )
 
         return True
 
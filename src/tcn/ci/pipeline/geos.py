@@ -1,5 +1,8 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
+from tcn.benchmark.geos_log_parser import parse_geos_logs
+from tcn.benchmark.history import Regression, record_benchmarks
+from tcn.benchmark.report import report
 from tcn.ci.actions.discover import one_gpu_srun
 from tcn.ci.actions.git import git_prelude
 from tcn.ci.pipeline.task import TaskBase
@@ -7,6 +10,7 @@ from tcn.ci.utils.environment import Environment
 from tcn.ci.utils.progress import Progress
 from tcn.ci.utils.registry import Registry
 from tcn.ci.utils.shell import ShellScript
+from tcn.validation.geos_status import GEOSStatus
 
 
 def _epilogue(env: Environment):
@@ -165,3 +169,30 @@ class GEOS(TaskBase):
         env: Environment,
     ) -> bool:
         return _check(env)
+
+
+def benchmark_check(
+    rank0_logs: List[str],
+    status: GEOSStatus,
+    experiment: str,
+    history: Optional[str],
+    benchmark_artifact: str,
+) -> List[Regression]:
+    """Report the benchmark logs, record them in the persistent `history`
+    (see `tcn.benchmark.history.history_path`) and flag the slowdowns against
+    previous runs. The report & regressions go to `report_benchmark.out`.
+    Without `history`, only the report is written."""
+    bench_raw_data = parse_geos_logs(rank0_logs, jobs=None)
+    benchmark_report = report(bench_raw_data)
+    print(benchmark_report)
+    regressions = (
+        record_benchmarks(history, bench_raw_data, status, experiment)
+        if history
+        else []
+    )
+    for regression in regressions:
+        print(regression)
+    with open(f"{benchmark_artifact}/report_benchmark.out", "w") as f:
+        f.write(str(benchmark_report))
+        f.writelines(f"{regression}\n" for regression in regressions)
+    return regressions
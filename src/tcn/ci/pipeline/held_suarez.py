@@ -6,10 +6,12 @@ from typing import Any, Dict, Tuple
 import click
 
 from tcn.benchmark.geos_log_parser import parse_geos_log
+from tcn.benchmark.history import BENCHMARK_HISTORY_ENV, configured_history_path
 from tcn.benchmark.report import report
 from tcn.ci.actions.pipeline import PipelineAction
 from tcn.ci.actions.slurm import SlurmConfiguration
 from tcn.ci.pipeline.geos import (
+    benchmark_check,
     copy_input_to_experiment_directory,
     set_python_environment,
 )
@@ -19,6 +21,7 @@ from tcn.ci.utils.environment import Environment
 from tcn.ci.utils.progress import Progress
 from tcn.ci.utils.registry import Registry
 from tcn.ci.utils.shell import ShellScript
+from tcn.validation.geos_status import get_geos_status
 
 
 class PrologScripts:
@@ -416,20 +419,28 @@ class HeldSuarez(TaskBase):
             env.experiment_action == PipelineAction.Benchmark
             or env.experiment_action == PipelineAction.All
         ):
+            # A configured history must persist: fails before any work
+            history = configured_history_path(env.get(BENCHMARK_HISTORY_ENV))
             for resolution in ["C180-L72", "C180-L91", "C180-L137"]:
-                logs = glob.glob(f"{geos_experiment_path}/{resolution}/benchmark.*")
+                logs = sorted(
+                    glob.glob(f"{geos_experiment_path}/{resolution}/benchmark.*")
+                )
                 benchmark_artifact = f"{artifact_directory}/Benchmark/{resolution}"
                 os.makedirs(benchmark_artifact, exist_ok=True)
-                bench_raw_data = []
+                rank0_logs = []
                 for log in logs:
                     shutil.copy(log, benchmark_artifact)
                     # Grab all rank 0 that are not caching runs
                     if ".0.out" in log and "cache" not in log:
-                        bench_raw_data.append(parse_geos_log(log))
-                benchmark_report = report(bench_raw_data)
-                print(benchmark_report)
-                with open(f"{benchmark_artifact}/report_benchmark.out", "w") as f:
-                    f.write(str(benchmark_report))
+                        rank0_logs.append(log)
+                # Keep history & flag slowdowns against previous runs
+                benchmark_check(
+                    rank0_logs,
+                    get_geos_status(geos_path),
+                    "HeldSuarez",
+                    history,
+                    benchmark_artifact,
+                )
 
         return True
 
@@ -1,20 +1,90 @@
 import dataclasses
-from typing import Any, Dict
+import os
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 
 import tcn.hws.constants as cst
 from tcn.hws.constants import HWS_HW_CPU
+from tcn.hws.dataset import (
+    MARKER_BEGIN,
+    MARKER_END,
+    MARKER_KINDS,
+    MARKER_NAMES,
+    MARKER_TIMES,
+    load_dataset,
+)
+
+# Idle power of a trace is estimated as this low quantile of its samples
+IDLE_QUANTILE = 0.05
 
 
 @dataclasses.dataclass
 class EnergyReport:
-    CPU_envelop_integrated: float = 0  # kW * sample_count
+    CPU_envelop_integrated: float = 0  # kW * s
     CPU_envelop_kWh: float = 0
-    GPU_envelop_integrated: float = 0  # kW * sample_count
+    GPU_envelop_integrated: float = 0  # kW * s
     GPU_envelop_kWh: float = 0
-    overall_envelop_integrated: float = 0  # kW * sample_count
+    overall_envelop_integrated: float = 0  # kW * s
     overall_envelop_kWh: float = 0
+    duration_s: float = 0
+    CPU_measured: bool = False  # RAPL counters, otherwise utilization model
+    GPU_device_integrated: List[float] = dataclasses.field(
+        default_factory=list
+    )  # kW * s per device
+    CPU_idle_W: float = 0
+    GPU_idle_W: float = 0
+    simulated_days: float = 0
+
+    @property
+    def idle_kWh(self) -> float:
+        return (self.CPU_idle_W + self.GPU_idle_W) * self.duration_s / 3.6e6
+
+    @property
+    def dynamic_kWh(self) -> float:
+        """Energy above the idle baseline"""
+        return self.overall_envelop_kWh - self.idle_kWh
+
+    @property
+    def kWh_per_simulated_day(self) -> float:
+        """Energy-to-solution, 0 when the simulated time is unknown"""
+        if self.simulated_days <= 0:
+            return 0
+        return self.overall_envelop_kWh / self.simulated_days
+
+
+def _trapezoid(y: np.ndarray, x: np.ndarray, axis: int = -1):
+    # `trapz` was renamed `trapezoid` in numpy 2
+    trapezoid = getattr(np, "trapezoid", None) or getattr(np, "trapz")
+    return trapezoid(y, x, axis=axis)
+
+
+def idle_baseline(power: np.ndarray, quantile: float = IDLE_QUANTILE) -> float:
+    """Idle power (W) of a trace: what it draws at its quietest"""
+    power = np.asarray(power, dtype=np.float64)
+    power = power[np.isfinite(power)]
+    return float(np.quantile(power, quantile)) if len(power) > 0 else 0
+
+
+def sample_times(
+    sample_count: int, timestamps: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Seconds since the first sample: recorded timestamps when available,
+    otherwise the default sample rate is assumed (older dumps)."""
+    if timestamps is not None:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        return timestamps - timestamps[0] if len(timestamps) > 0 else timestamps
+    return np.arange(sample_count) * cst.DEFAULT_SAMPLERATE_IN_S
+
+
+def time_range(data: Dict[str, Any], start_s: float, stop_s: float) -> slice:
+    """Samples recorded between `start_s` & `stop_s` seconds since the first
+    sample of a dump (see `sample_times`)"""
+    seconds = sample_times(len(data["cpu_psu"]), data.get("timestamps"))
+    return slice(
+        int(np.searchsorted(seconds, start_s, side="left")),
+        int(np.searchsorted(seconds, stop_s, side="right")),
+    )
 
 
 def energy_envelop_calculation(
@@ -22,51 +92,239 @@ def energy_envelop_calculation(
     gpu_psu_data: np.ndarray,
     cpu_label: str = HWS_HW_CPU,
     verbose: bool = True,
+    timestamps: Optional[np.ndarray] = None,
+    cpu_energy: Optional[np.ndarray] = None,
+    gpu_psu_per_device: Optional[np.ndarray] = None,
+    simulated_days: float = 0,
 ) -> EnergyReport:
+    """Energy of the samples. `cpu_energy` (cumulative J, RAPL) is used
+    instead of integrating `cpu_psu_data` when measured."""
     report = EnergyReport()
-    # TODO we need the sample rate here too
     sample_count = len(cpu_psu_data)
+    seconds = sample_times(sample_count, timestamps)
+    report.duration_s = float(seconds[-1]) if sample_count > 0 else 0
 
-    # Grab integrated power using trapezoide integration on all samples
-    report.GPU_envelop_integrated = np.trapz(gpu_psu_data / 1000)
-    report.CPU_envelop_integrated = np.trapz(cpu_psu_data / 1000)
+    # Integrated power using trapezoid integration on the real time axis
+    report.GPU_envelop_integrated = float(
+        _trapezoid(np.asarray(gpu_psu_data) / 1000, seconds)
+    )
+    report.CPU_envelop_integrated = float(
+        _trapezoid(np.asarray(cpu_psu_data) / 1000, seconds)
+    )
+    if gpu_psu_per_device is not None:
+        report.GPU_device_integrated = _trapezoid(
+            np.asarray(gpu_psu_per_device) / 1000, seconds, axis=0
+        ).tolist()
+    if cpu_energy is not None and len(cpu_energy) > 0:
+        measured = float(cpu_energy[-1]) - float(cpu_energy[0])
+        if np.isfinite(measured):
+            report.CPU_envelop_integrated = measured / 1000
+            report.CPU_measured = True
     report.overall_envelop_integrated = (
         report.GPU_envelop_integrated + report.CPU_envelop_integrated
     )
 
-    # Average kWh calculation
-    # TODO: Wrong?!
-    sampling_time_hours_default = (
-        (sample_count - 1) * cst.DEFAULT_SAMPLERATE_IN_S / (60 * 60)
-    )
-    report.overall_envelop_kWh = (
-        report.overall_envelop_integrated / sample_count
-    ) / sampling_time_hours_default
-    report.CPU_envelop_kWh = (
-        report.CPU_envelop_integrated / sample_count
-    ) / sampling_time_hours_default
-    report.GPU_envelop_kWh = (
-        report.GPU_envelop_integrated / sample_count
-    ) / sampling_time_hours_default
+    # kW * s -> kWh
+    report.overall_envelop_kWh = report.overall_envelop_integrated / 3600
+    report.CPU_envelop_kWh = report.CPU_envelop_integrated / 3600
+    report.GPU_envelop_kWh = report.GPU_envelop_integrated / 3600
+
+    report.CPU_idle_W = idle_baseline(cpu_psu_data)
+    report.GPU_idle_W = idle_baseline(gpu_psu_data)
+    report.simulated_days = simulated_days
 
     if verbose:
         print(
-            f"Number of samples: {sample_count}\n"
-            f"CPU envelop:{report.CPU_envelop_integrated:.0f} kW.sample_count\n"
-            f"CPU envelop (@ default sample rate): {report.CPU_envelop_kWh:.2f} kW/h\n"
-            f"GPU envelop:{report.GPU_envelop_integrated:.0f} kW.sample_count\n"
-            f"GPU envelop (@ default sample rate): {report.GPU_envelop_kWh:.2f} kW/h\n"
-            f"Overall envelop: {report.overall_envelop_integrated:.0f} kW.sample_count\n"
-            f"Overall envelop (@ default sample rate): {report.overall_envelop_kWh:.2f} kW/h"
+            f"Number of samples: {sample_count} over {report.duration_s:.1f}s\n"
+            f"CPU envelop:{report.CPU_envelop_integrated:.0f} kW.s"
+            f" ({'RAPL' if report.CPU_measured else 'extrapolated'})\n"
+            f"CPU envelop: {report.CPU_envelop_kWh:.4f} kWh\n"
+            f"GPU envelop:{report.GPU_envelop_integrated:.0f} kW.s\n"
+            f"GPU envelop: {report.GPU_envelop_kWh:.4f} kWh\n"
+            f"Overall envelop: {report.overall_envelop_integrated:.0f} kW.s\n"
+            f"Overall envelop: {report.overall_envelop_kWh:.4f} kWh\n"
+            f"Above idle ({report.CPU_idle_W:.0f}W CPU, {report.GPU_idle_W:.0f}W GPU):"
+            f" {report.dynamic_kWh:.4f} kWh"
         )
+        for i, energy in enumerate(report.GPU_device_integrated):
+            print(f"GPU {i} envelop: {energy:.0f} kW.s")
+        if report.simulated_days > 0:
+            print(f"Energy-to-solution: {report.kWh_per_simulated_day:.4f} kWh/SD")
 
     return report
 
 
+def dataset_energy_calculation(
+    data: Dict[str, Any],
+    data_range: slice = slice(None),
+    simulated_days: float = 0,
+    verbose: bool = True,
+) -> EnergyReport:
+    """`energy_envelop_calculation` of a dump (see `tcn.hws.dataset`)"""
+
+    def _get(key: str) -> Optional[np.ndarray]:
+        return data[key][data_range] if key in data else None
+
+    return energy_envelop_calculation(
+        data["cpu_psu"][data_range],
+        data["gpu_psu"][data_range],
+        verbose=verbose,
+        timestamps=_get("timestamps"),
+        cpu_energy=_get("cpu_energy"),
+        gpu_psu_per_device=_get("gpu_psu_per_device"),
+        simulated_days=simulated_days,
+    )
+
+
+@dataclasses.dataclass
+class RegionReport:
+    name: str
+    count: int = 0  # number of begin/end pairs
+    duration_s: float = 0
+    CPU_energy_J: float = 0
+    GPU_energy_J: float = 0
+    CPU_utilization_s: float = 0  # % * s, see `CPU_mean_utilization`
+    GPU_utilization_s: float = 0  # % * s, see `GPU_mean_utilization`
+    idle_W: float = 0  # CPU + GPU idle baseline of the whole dump
+
+    @property
+    def energy_J(self) -> float:
+        return self.CPU_energy_J + self.GPU_energy_J
+
+    @property
+    def dynamic_energy_J(self) -> float:
+        """Energy above the idle baseline"""
+        return self.energy_J - self.idle_W * self.duration_s
+
+    @property
+    def CPU_mean_power_W(self) -> float:
+        return self.CPU_energy_J / self.duration_s if self.duration_s else 0
+
+    @property
+    def GPU_mean_power_W(self) -> float:
+        return self.GPU_energy_J / self.duration_s if self.duration_s else 0
+
+    @property
+    def CPU_mean_utilization(self) -> float:
+        return self.CPU_utilization_s / self.duration_s if self.duration_s else 0
+
+    @property
+    def GPU_mean_utilization(self) -> float:
+        return self.GPU_utilization_s / self.duration_s if self.duration_s else 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name:<24} x{self.count:<5} {self.duration_s:10.2f}s "
+            f"{self.energy_J:12.1f}J ({self.dynamic_energy_J:12.1f}J above idle, "
+            f"CPU {self.CPU_mean_power_W:6.1f}W "
+            f"{self.CPU_mean_utilization:5.1f}%, GPU {self.GPU_mean_power_W:6.1f}W "
+            f"{self.GPU_mean_utilization:5.1f}%)"
+        )
+
+
+def region_intervals(data: Dict[str, Any]) -> List[Tuple[str, float, float]]:
+    """(name, begin, end) epoch times of the regions, nested or repeated
+    regions of the same name pair up last-begin-first-end"""
+    if MARKER_KINDS not in data:
+        return []
+    opened: Dict[str, List[float]] = {}
+    intervals = []
+    for kind, name, time in zip(
+        data[MARKER_KINDS].tolist(),
+        data[MARKER_NAMES].tolist(),
+        data[MARKER_TIMES].tolist(),
+    ):
+        if kind == MARKER_BEGIN:
+            opened.setdefault(name, []).append(time)
+        elif kind == MARKER_END and opened.get(name):
+            intervals.append((name, opened[name].pop(), time))
+    return intervals
+
+
+def _integral_at(
+    times: np.ndarray, values: np.ndarray, cumulative: np.ndarray, at: np.ndarray
+) -> np.ndarray:
+    # Integral from the first sample to each of `at`, values linear between
+    # samples (and constant outside of them)
+    i = np.clip(np.searchsorted(times, at, side="right") - 1, 0, len(times) - 1)
+    at_values = np.interp(at, times, values)
+    return cumulative[i] + (at - times[i]) * (values[i] + at_values) / 2
+
+
+def _integrate(
+    times: np.ndarray, values: np.ndarray, begins: np.ndarray, ends: np.ndarray
+) -> np.ndarray:
+    """Trapezoid integral of `values` over every [begin, end] at once"""
+    values = np.asarray(values, dtype=np.float64)
+    cumulative = np.concatenate(
+        [[0.0], np.cumsum(np.diff(times) * (values[1:] + values[:-1]) / 2)]
+    )
+    return _integral_at(times, values, cumulative, ends) - _integral_at(
+        times, values, cumulative, begins
+    )
+
+
+def region_energy_calculation(
+    data: Dict[str, Any],
+    verbose: bool = True,
+) -> Dict[str, RegionReport]:
+    """Energy, mean power & utilization of every named region (summed over
+    its occurrences), from the begin/end markers of a dump"""
+    if "timestamps" not in data or len(data["timestamps"]) == 0:
+        raise RuntimeError("Region energy needs timestamped samples")
+    times = np.asarray(data["timestamps"], dtype=np.float64)
+    intervals = region_intervals(data)
+    names = [name for name, _, _ in intervals]
+    begins = np.array([begin for _, begin, _ in intervals], dtype=np.float64)
+    ends = np.array([end for _, _, end in intervals], dtype=np.float64)
+    # Occurrences of a region are summed, reports in order of first end
+    reports: Dict[str, RegionReport] = {name: RegionReport(name) for name in names}
+    region_index = {name: i for i, name in enumerate(reports)}
+    occurrences = np.array([region_index[name] for name in names], dtype=np.int64)
+
+    def _per_region(per_interval: np.ndarray) -> List[float]:
+        return np.bincount(
+            occurrences, weights=per_interval, minlength=len(reports)
+        ).tolist()
+
+    series = {
+        "CPU_energy_J": data["cpu_psu"],
+        "GPU_energy_J": data["gpu_psu"],
+        "CPU_utilization_s": data["cpu_exe_utl"],
+        "GPU_utilization_s": data["gpu_exe_utl"],
+    }
+    per_region = {
+        attribute: _per_region(_integrate(times, values, begins, ends))
+        for attribute, values in series.items()
+    }
+    # Measured CPU joules: difference of the cumulative RAPL energy
+    cpu_energy = data["cpu_energy"] if "cpu_energy" in data else None
+    if cpu_energy is not None and np.all(np.isfinite(cpu_energy)):
+        per_region["CPU_energy_J"] = _per_region(
+            np.interp(ends, times, cpu_energy) - np.interp(begins, times, cpu_energy)
+        )
+    per_region["count"] = np.bincount(occurrences, minlength=len(reports)).tolist()
+    per_region["duration_s"] = _per_region(ends - begins)
+    idle_W = idle_baseline(data["cpu_psu"]) + idle_baseline(data["gpu_psu"])
+    per_region["idle_W"] = [idle_W] * len(reports)
+    for attribute, values in per_region.items():
+        for report, value in zip(reports.values(), values):
+            setattr(report, attribute, value)
+
+    if verbose:
+        for report in reports.values():
+            print(report)
+    return reports
+
+
 def load_data(
     data_filepath: str,
-    data_format: str = "npz",
+    data_format: Optional[str] = None,
 ) -> Dict[str, Any]:
-    if data_format != "npz":
+    """Dump of any `cst.HWS_DUMP_*` format, inferred from the extension
+    unless given"""
+    if data_format is None:
+        data_format = os.path.splitext(data_filepath)[1].lstrip(".")
+    if data_format not in [cst.HWS_DUMP_NPZ, cst.HWS_DUMP_JSON, cst.HWS_DUMP_STREAM]:
         raise NotImplementedError(f"Format {data_format} not implemented for graphing")
-    return np.load(data_filepath)
+    return load_dataset(data_filepath)
@@ -0,0 +1,44 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+class RingBuffer:
+    """Preallocated (capacity, columns) float64 sample storage.
+
+    Once full, the oldest samples are overwritten (and counted in `dropped`)
+    so a long run never reallocates nor grows unbounded."""
+
+    def __init__(self, columns: List[str], capacity: int):
+        if capacity <= 0:
+            raise RuntimeError(f"Ring buffer capacity must be > 0, got {capacity}")
+        self.columns = columns
+        self.capacity = capacity
+        self._data = np.zeros((capacity, len(columns)), dtype=np.float64)
+        self._count = 0  # total number of samples ever appended
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    @property
+    def dropped(self) -> int:
+        return max(self._count - self.capacity, 0)
+
+    def append(self, values: Sequence[float]):
+        self._data[self._count % self.capacity] = values
+        self._count += 1
+
+    def clear(self):
+        self._count = 0
+
+    def array(self) -> np.ndarray:
+        """Copy of the samples, oldest first: (len, columns)"""
+        if self._count <= self.capacity:
+            return self._data[: self._count].copy()
+        start = self._count % self.capacity
+        return np.concatenate([self._data[start:], self._data[:start]])
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """Samples per column, oldest first"""
+        data = self.array()
+        return {column: data[:, i] for i, column in enumerate(self.columns)}
@@ -2,10 +2,12 @@ from typing import Optional, Tuple
 
 import click
 
+import tcn.hws.analysis as hws_analysis
 import tcn.hws.client as hws_client
-import tcn.hws.constants as cst
+import tcn.hws.dataset as hws_dataset
 import tcn.hws.graph as hws_graph
 import tcn.hws.server as hws_server
+from tcn.hws.decimate import DECIMATE_LTTB, DECIMATE_MINMAX, DEFAULT_POINTS
 
 
 @click.group()
@@ -15,37 +17,78 @@ def cli(ctx):
 
 
 @cli.command()
-def server():
-    hws_server.cli()
+@click.option(
+    "--replay",
+    default=None,
+    help="Replay a recorded dump instead of reading the node sensors",
+)
+def server(replay: Optional[str]):
+    hws_server.cli(replay)
 
 
 @cli.command()
 @click.argument("command")
-@click.option("--name", default="hws", help="[dump] Filename for the .npz dump")
+@click.option(
+    "--name",
+    default="hws",
+    help="[dump] Filename for the .npz dump, [begin/end/tick] region name",
+)
 def client(command: str, name: str):
     hws_client.cli(command, name)
 
 
+@cli.command()
+@click.option("--name", default="hws", help="Dump name given to the client")
+def merge(name: str):
+    """Merge the per node dumps of a multi-node run into a single dataset"""
+    print(f"Merged into {hws_dataset.merge_node_dumps(name)}")
+
+
+@cli.command()
+@click.argument("data_filepath")
+def regions(data_filepath: str):
+    """Energy, power & utilization per region marked with begin/end"""
+    hws_analysis.region_energy_calculation(hws_analysis.load_dataset(data_filepath))
+
+
+@cli.command()
+@click.argument("data_filepath")
+@click.option(
+    "--simulated_days",
+    default=0.0,
+    help="Simulated time of the run, for the energy-to-solution",
+)
+def energy(data_filepath: str, simulated_days: float):
+    """Energy overall, per GPU & above idle of a dump"""
+    hws_analysis.dataset_energy_calculation(
+        hws_analysis.load_dataset(data_filepath), simulated_days=simulated_days
+    )
+
+
 @cli.command()
 @click.argument("data_filepath")
-def graph(data_filepath: str):
-    hws_graph.cli(data_filepath)
+@click.option("--points", default=DEFAULT_POINTS, help="Points kept per trace")
+@click.option(
+    "--method",
+    type=click.Choice([DECIMATE_MINMAX, DECIMATE_LTTB]),
+    default=DECIMATE_MINMAX,
+    help="Decimation of the traces",
+)
+@click.option("--html", is_flag=True, help="Also write an HTML page refining on zoom")
+def graph(data_filepath: str, points: int, method: str, html: bool):
+    hws_graph.cli(data_filepath, points=points, method=method, html=html)
 
 
 @cli.command()
 @click.argument("data_filepath")
-@click.option("--data_range", nargs=2, type=float)
-def envelop(
-    data_filepath: str, data_range: Optional[Tuple[float, float]]
-):  # TODO: this should be saved in a header in the data file
-    dt = cst.CLIENT_CMDS[cst.CLIENT_CMD_START]["dt"]
-    if data_range:
-        range_start, range_stop = data_range
-        range_start = int(range_start / dt)
-        range_stop = int(range_stop / dt)
-        hws_graph.cli(data_filepath, data_range=slice(range_start, range_stop))
-    else:
-        hws_graph.cli(data_filepath)
+@click.option(
+    "--data_range",
+    nargs=2,
+    type=float,
+    help="Seconds since the first sample, on the recorded timestamps",
+)
+def envelop(data_filepath: str, data_range: Optional[Tuple[float, float]]):
+    hws_graph.cli(data_filepath, seconds_range=data_range or None)
 
 
 if __name__ == "__main__":
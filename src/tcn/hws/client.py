@@ -1,20 +1,151 @@
-import json
+import atexit
+import os
 import socket
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
 
-from tcn.hws.constants import CLIENT_CMDS, SOCKET_FILENAME
+from tcn.hws.constants import (
+    CLIENT_CMD_BEGIN,
+    CLIENT_CMD_END,
+    CLIENT_CMD_TICK,
+    CLIENT_CMDS,
+    HWS_DUMP_NAME,
+    HWS_REGIONS_ENV,
+    SOCKET_FILENAME,
+)
+from tcn.hws.protocol import encode_order
 
+REGION_CMDS = [CLIENT_CMD_BEGIN, CLIENT_CMD_END, CLIENT_CMD_TICK]
+# Bytes of fire-and-forget orders kept while the server is not reading
+MAX_PENDING_BYTES = 1 << 20
 
-def client_main(order: str, dump_name: str):
-    filtered_order = CLIENT_CMDS[order]
+
+class HWSClient:
+    """Persistent connection to the node's sampler server.
+
+    `send` blocks until the order is written, `post` never blocks: what the
+    socket can't take right away is queued (up to `MAX_PENDING_BYTES`,
+    newer orders are dropped beyond) and written on the next call."""
+
+    def __init__(self, socket_filename: str = SOCKET_FILENAME):
+        self.socket_filename = socket_filename
+        self.dropped = 0
+        self._socket: Optional[socket.socket] = None
+        self._pending = bytearray()
+        self._pid = os.getpid()
+
+    def _connection(self) -> socket.socket:
+        if self._socket is None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                self._socket.connect(self.socket_filename)
+            except OSError:
+                self._socket.close()
+                self._socket = None
+                raise
+            self._socket.setblocking(False)
+        return self._socket
+
+    def _flush_pending(self, connection: socket.socket):
+        while self._pending:
+            try:
+                sent = connection.send(self._pending)
+            except BlockingIOError:
+                return
+            del self._pending[:sent]
+
+    def send(self, order: Dict[str, Any]):
+        connection = self._connection()
+        self._pending += encode_order(order)
+        connection.setblocking(True)
+        try:
+            connection.sendall(self._pending)
+            self._pending.clear()
+        finally:
+            connection.setblocking(False)
+
+    def post(self, order: Dict[str, Any]) -> bool:
+        """Fire-and-forget, False if the server can't be reached"""
+        try:
+            connection = self._connection()
+        except OSError:
+            return False
+        frame = encode_order(order)
+        if len(self._pending) + len(frame) > MAX_PENDING_BYTES:
+            self.dropped += 1
+        else:
+            self._pending += frame
+        try:
+            self._flush_pending(connection)
+        except OSError:
+            self.close()
+            return False
+        return True
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.setblocking(True)
+                self._socket.settimeout(1)
+                self._socket.sendall(self._pending)
+            except OSError:
+                pass
+            self._socket.close()
+            self._socket = None
+        self._pending.clear()
+
+
+_client: Optional[HWSClient] = None
+
+
+def get_client() -> HWSClient:
+    """Connection of this process (re-created in forked children)"""
+    global _client
+    if _client is None or _client._pid != os.getpid():
+        _client = HWSClient()
+        atexit.register(_client.close)
+    return _client
+
+
+def send_order(order: Dict[str, Any]):
+    get_client().send(order)
+
+
+def client_main(order: str, dump_name: str = HWS_DUMP_NAME, region: str = ""):
+    filtered_order = dict(CLIENT_CMDS[order])
     filtered_order["dump_name"] = dump_name
-    data = json.dumps(filtered_order)
-    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-    server.connect(SOCKET_FILENAME)
-    server.send(data.encode("utf8"))
+    if region != "":
+        filtered_order["name"] = region
+    send_order(filtered_order)
+
+
+def post_marker(order: str, name: str) -> bool:
+    """Non-blocking region marker (`begin`, `end` or `tick`)"""
+    return get_client().post({**CLIENT_CMDS[order], "name": name})
+
+
+def regions_enabled() -> bool:
+    return os.getenv(HWS_REGIONS_ENV, "0") == "1"
+
+
+@contextmanager
+def hws_region(name: str) -> Iterator[None]:
+    """Begin/end markers around a block, when `TCN_HWS_REGIONS=1`.
+
+    A missing server is not an error: markers are then dropped."""
+    enabled = regions_enabled() and post_marker(CLIENT_CMD_BEGIN, name)
+    try:
+        yield
+    finally:
+        if enabled:
+            post_marker(CLIENT_CMD_END, name)
 
 
 def cli(command: str, dump_name: str):
-    if command in CLIENT_CMDS.keys():
+    if command in REGION_CMDS:
+        # `name` is the region name
+        client_main(command, region=dump_name)
+    elif command in CLIENT_CMDS.keys():
         client_main(command, dump_name)
     else:
         raise RuntimeError(
@@ -1,31 +1,59 @@
 import os
+import socket
 from typing import Any, Dict
 
-# Socket details
+# Socket details - one server per node, the directory can be on a shared FS
 SOCKET_DIRECTORY = "./sockets-runtime"
-SOCKET_FILENAME = f"{SOCKET_DIRECTORY}/hws"
+SOCKET_FILENAME = f"{SOCKET_DIRECTORY}/hws.{socket.gethostname()}"
 
 # Dump
 HWS_DUMP_NAME = "hws_dump"
 HWS_DUMP_NPZ = "npz"
 HWS_DUMP_JSON = "json"
+HWS_DUMP_STREAM = "bin"  # copy of the append-only stream, see tcn.hws.stream
 HWS_DUMP_FORMAT = os.getenv("HWSAMPLER_DUMP_FORMAT", HWS_DUMP_NPZ)
 
+# Samples are streamed to disk by chunks of this many rows
+HWS_CHUNK_SIZE = int(os.getenv("HWS_CHUNK_SIZE", 1024))
+HWS_STREAM_FILENAME = f"{SOCKET_DIRECTORY}/hws.{socket.gethostname()}.bin"
+# Fields sampled on each GPU & on the host (timestamps are epoch seconds)
+HWS_GPU_FIELDS = ["gpu_psu", "gpu_exe_utl", "gpu_mem_utl", "gpu_mem"]
+# `missed_deadlines` is the running count of sampling deadlines missed,
+# `cpu_energy` the measured (RAPL) J since start - NaN when `cpu_psu` is the
+# utilization based model
+HWS_HOST_FIELDS = [
+    "timestamps",
+    "cpu_exe_utl",
+    "cpu_psu",
+    "missed_deadlines",
+    "cpu_energy",
+]
+# Host fields also sampled per package (RAPL) & per core (/proc/stat)
+HWS_CPU_PACKAGE_FIELDS = ["cpu_energy"]
+HWS_CPU_CORE_FIELDS = ["cpu_core_utl"]
+
 
 # All commands that the serve can process
 SERV_ORDER_START = "START"
 SERV_ORDER_STOP = "STOP"
 SERV_ORDER_DUMP = "DUMP"
 SERV_ORDER_TICK = "TICK"
+SERV_ORDER_REGION_BEGIN = "REGION_BEGIN"
+SERV_ORDER_REGION_END = "REGION_END"
 
 # Start the recording at dt intervals
 CLIENT_CMD_START = "start"
 # Stop recording, kill servers
 CLIENT_CMD_STOP = "stop"
 # Dump data into a format controlled by env var
-# HWS_DUMP_FORMAT = {npz, json}
+# HWS_DUMP_FORMAT = {npz, json, bin}
 CLIENT_CMD_DUMP = "dump"
 CLIENT_CMD_TICK = "tick"
+# Named region markers: energy is attributed to what runs in between
+CLIENT_CMD_BEGIN = "begin"
+CLIENT_CMD_END = "end"
+# Set to 1 for `hws_region` (profilers, Fortran bridge) to send markers
+HWS_REGIONS_ENV = "TCN_HWS_REGIONS"
 
 DEFAULT_SAMPLERATE_IN_S = 0.1
 
@@ -39,7 +67,9 @@ CLIENT_CMDS: Dict[str, Any] = {
         "action": SERV_ORDER_DUMP,
         "dump_name": HWS_DUMP_NAME,
     },
-    CLIENT_CMD_TICK: {"action": SERV_ORDER_TICK},
+    CLIENT_CMD_TICK: {"action": SERV_ORDER_TICK, "name": "tick"},
+    CLIENT_CMD_BEGIN: {"action": SERV_ORDER_REGION_BEGIN, "name": ""},
+    CLIENT_CMD_END: {"action": SERV_ORDER_REGION_END, "name": ""},
 }
 
 # Hardware specs
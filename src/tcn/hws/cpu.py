@@ -0,0 +1,113 @@
+import glob
+import os
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Linux powercap: one top level zone per package (AMD Zen also exposes its
+# RAPL counters as `intel-rapl` zones, recent kernels may use `amd-rapl`)
+POWERCAP_DIRECTORY = "/sys/class/powercap"
+PROC_STAT = "/proc/stat"
+CPU_POWER_RAPL = "rapl"
+CPU_POWER_MODEL = "model"
+
+_RE_PACKAGE_ZONE = re.compile(r"^(intel|amd)-rapl:\d+$")
+
+
+class RAPLReader:
+    """Cumulative energy (J) per package from the powercap RAPL counters.
+
+    Counters are in uJ and wrap at `max_energy_range_uj`: each read adds the
+    wrapped delta to the running totals."""
+
+    def __init__(self, powercap_directory: str = POWERCAP_DIRECTORY):
+        self.zones: List[str] = sorted(
+            path
+            for path in glob.glob(os.path.join(powercap_directory, "*"))
+            if _RE_PACKAGE_ZONE.match(os.path.basename(path))
+        )
+        self.names = [self._read_text(zone, "name") for zone in self.zones]
+        self.ranges = np.array(
+            [int(self._read_text(z, "max_energy_range_uj")) for z in self.zones],
+            dtype=np.int64,
+        )
+        self._last = self._read_counters()
+        self.energy = np.zeros(len(self.zones))  # J since creation
+
+    @staticmethod
+    def _read_text(zone: str, name: str) -> str:
+        with open(os.path.join(zone, name)) as f:
+            return f.read().strip()
+
+    def _read_counters(self) -> np.ndarray:
+        return np.array(
+            [int(self._read_text(zone, "energy_uj")) for zone in self.zones],
+            dtype=np.int64,
+        )
+
+    def read(self) -> np.ndarray:
+        """Cumulative J per package"""
+        counters = self._read_counters()
+        delta = counters - self._last
+        # Wraparound: the counter restarted from 0 after `max_energy_range_uj`
+        delta = np.where(delta < 0, delta + self.ranges + 1, delta)
+        self._last = counters
+        self.energy = self.energy + delta / 1e6
+        return self.energy
+
+
+def rapl_reader(powercap_directory: str = POWERCAP_DIRECTORY) -> Optional[RAPLReader]:
+    """RAPL reader if package counters are there & readable (root only on
+    most kernels), None otherwise"""
+    try:
+        reader = RAPLReader(powercap_directory)
+    except (OSError, ValueError):
+        return None
+    return reader if reader.zones else None
+
+
+class ProcStatReader:
+    """Per core utilization (%) from the /proc/stat jiffies between reads"""
+
+    def __init__(self, proc_stat: str = PROC_STAT):
+        self.proc_stat = proc_stat
+        self._last_busy, self._last_total = self._read_jiffies()
+
+    def _read_jiffies(self) -> Tuple[np.ndarray, np.ndarray]:
+        busy, total = [], []
+        with open(self.proc_stat) as f:
+            for line in f:
+                # `cpuN ...` lines, the aggregated `cpu ` line is skipped
+                if not line.startswith("cpu") or line[3] == " ":
+                    continue
+                jiffies = [int(j) for j in line.split()[1:]]
+                # user nice system idle iowait irq softirq steal (guest* are
+                # already in user/nice)
+                idle = jiffies[3] + (jiffies[4] if len(jiffies) > 4 else 0)
+                spent = sum(jiffies[:8])
+                busy.append(spent - idle)
+                total.append(spent)
+        return np.array(busy, dtype=np.int64), np.array(total, dtype=np.int64)
+
+    @property
+    def cores(self) -> int:
+        return len(self._last_total)
+
+    def read(self) -> np.ndarray:
+        busy, total = self._read_jiffies()
+        delta_total = total - self._last_total
+        utilization = np.where(
+            delta_total > 0,
+            100 * (busy - self._last_busy) / np.maximum(delta_total, 1),
+            0.0,
+        )
+        self._last_busy, self._last_total = busy, total
+        return utilization
+
+
+def proc_stat_reader(proc_stat: str = PROC_STAT) -> Optional[ProcStatReader]:
+    try:
+        return ProcStatReader(proc_stat)
+    except (OSError, ValueError, IndexError):
+        return None
@@ -0,0 +1,274 @@
+import glob
+import json
+import os
+import shutil
+import socket
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tcn.hws.constants import (
+    HWS_CPU_CORE_FIELDS,
+    HWS_CPU_PACKAGE_FIELDS,
+    HWS_DUMP_FORMAT,
+    HWS_DUMP_JSON,
+    HWS_DUMP_NPZ,
+    HWS_DUMP_STREAM,
+    HWS_GPU_FIELDS,
+    HWS_HOST_FIELDS,
+)
+from tcn.hws.stream import StreamWriter, read_stream
+
+# Per device samples are stored as (samples, devices) under `<field>_per_device`
+PER_DEVICE_SUFFIX = "_per_device"
+PER_PACKAGE_SUFFIX = "_per_package"
+PER_CORE_SUFFIX = "_per_core"
+# Fields sampled per device/package/core: `<field>.<index>` in the stream
+_SPLIT_FIELDS = {
+    **{field: PER_DEVICE_SUFFIX for field in HWS_GPU_FIELDS},
+    **{field: PER_PACKAGE_SUFFIX for field in HWS_CPU_PACKAGE_FIELDS},
+    **{field: PER_CORE_SUFFIX for field in HWS_CPU_CORE_FIELDS},
+}
+
+# Region markers (kind, name, epoch time) are stored as 3 parallel arrays
+MARKER_KINDS = "marker_kinds"
+MARKER_NAMES = "marker_names"
+MARKER_TIMES = "marker_times"
+MARKER_BEGIN = "begin"
+MARKER_END = "end"
+MARKER_TICK = "tick"
+_MARKER_KEYS = [MARKER_KINDS, MARKER_NAMES, MARKER_TIMES]
+
+# How devices (and nodes) are folded into the single series used by the graphs
+# and the energy analysis: power & memory add up, utilization is averaged
+REDUCTIONS: Dict[str, Callable[..., np.ndarray]] = {
+    "gpu_psu": np.sum,
+    "gpu_exe_utl": np.mean,
+    "gpu_mem_utl": np.mean,
+    "gpu_mem": np.sum,
+    "cpu_psu": np.sum,
+    "cpu_exe_utl": np.mean,
+    "missed_deadlines": np.sum,
+    "cpu_energy": np.sum,
+}
+
+
+def _reduce(field: str, per_device: np.ndarray) -> np.ndarray:
+    if per_device.shape[1] == 0:
+        return np.zeros(per_device.shape[0])
+    return REDUCTIONS[field](per_device, axis=1)
+
+
+def stream_columns(device_count: int, packages: int = 0, cores: int = 0) -> List[str]:
+    """Columns of a node stream: host fields then `<field>.<index>` per
+    device, per CPU package & per core"""
+    columns = list(HWS_HOST_FIELDS)
+    for count, fields in [
+        (device_count, HWS_GPU_FIELDS),
+        (packages, HWS_CPU_PACKAGE_FIELDS),
+        (cores, HWS_CPU_CORE_FIELDS),
+    ]:
+        columns += [f"{field}.{i}" for i in range(count) for field in fields]
+    return columns
+
+
+def _split_count(columns: Dict[str, np.ndarray], field: str) -> int:
+    count = 0
+    while f"{field}.{count}" in columns:
+        count += 1
+    return count
+
+
+def build_dataset(
+    columns: Dict[str, np.ndarray],
+    device_names: List[str],
+    nodes: List[str],
+) -> Dict[str, np.ndarray]:
+    """Dataset (per device/package/core arrays & reduced series) from stream
+    columns"""
+    samples = len(columns["timestamps"])
+    # Host fields no sensor provided (e.g. a replayed GPU-only trace) are NaN
+    data = {
+        field: (
+            np.asarray(columns[field]) if field in columns else np.full(samples, np.nan)
+        )
+        for field in HWS_HOST_FIELDS
+    }
+    for field, suffix in _SPLIT_FIELDS.items():
+        split = [columns[f"{field}.{i}"] for i in range(_split_count(columns, field))]
+        stacked = np.stack(split, axis=1) if split else np.zeros((samples, 0))
+        data[f"{field}{suffix}"] = stacked
+        if field in REDUCTIONS and field not in data:
+            data[field] = _reduce(field, stacked)
+    data["devices"] = np.array(device_names, dtype=np.str_)
+    data["nodes"] = np.array(nodes, dtype=np.str_)
+    return data
+
+
+def markers_dataset(markers: List[Tuple[str, str, float]]) -> Dict[str, np.ndarray]:
+    return {
+        MARKER_KINDS: np.array([m[0] for m in markers], dtype=np.str_),
+        MARKER_NAMES: np.array([m[1] for m in markers], dtype=np.str_),
+        MARKER_TIMES: np.array([m[2] for m in markers], dtype=np.float64),
+    }
+
+
+def _markers_path(stream_path: str) -> str:
+    # Markers of a stream dump are kept next to it, the stream is columns only
+    return f"{stream_path}.markers.json"
+
+
+def _save_markers(data: Dict[str, np.ndarray], stream_path: str):
+    if MARKER_KINDS in data:
+        with open(_markers_path(stream_path), "w") as f:
+            json.dump({k: data[k].tolist() for k in _MARKER_KEYS}, f)
+
+
+def stream_of(data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Stream columns of a dataset, inverse of `build_dataset`"""
+    columns = {field: data[field] for field in HWS_HOST_FIELDS if field in data}
+    for field, suffix in _SPLIT_FIELDS.items():
+        split = data.get(f"{field}{suffix}", np.zeros((0, 0)))
+        for i in range(split.shape[1]):
+            columns[f"{field}.{i}"] = split[:, i]
+    return columns
+
+
+def is_multi_node() -> bool:
+    return int(os.getenv("SLURM_JOB_NUM_NODES", os.getenv("SLURM_NNODES", 1))) > 1
+
+
+def node_dump_name(dump_name: str) -> str:
+    """Per node dump name when running across a SLURM allocation"""
+    if is_multi_node():
+        return f"{dump_name}.{socket.gethostname()}"
+    return dump_name
+
+
+def save_dataset(
+    data: Dict[str, np.ndarray],
+    dump_name: str,
+    data_format: str = HWS_DUMP_FORMAT,
+) -> str:
+    if data_format == HWS_DUMP_NPZ:
+        path = f"{dump_name}.npz"
+        np.savez_compressed(path, **data)  # type: ignore[arg-type]
+    elif data_format == HWS_DUMP_JSON:
+        path = f"{dump_name}.json"
+        with open(path, "w") as f:
+            json.dump({k: np.asarray(v).tolist() for k, v in data.items()}, f)
+    elif data_format == HWS_DUMP_STREAM:
+        path = f"{dump_name}.{HWS_DUMP_STREAM}"
+        columns = stream_of(data)
+        writer = StreamWriter(
+            path,
+            list(columns),
+            chunk_size=max(len(data["timestamps"]), 1),
+            metadata={
+                "devices": data["devices"].tolist(),
+                "nodes": data["nodes"].tolist(),
+            },
+        )
+        for row in np.stack(list(columns.values()), axis=1):
+            writer.append(row)
+        writer.close()
+        _save_markers(data, path)
+    else:
+        raise RuntimeWarning(f"Can't dump in unknown format {data_format}")
+    return path
+
+
+def dump_stream(
+    stream_path: str,
+    dump_name: str,
+    data_format: str = HWS_DUMP_FORMAT,
+    markers: Optional[List[Tuple[str, str, float]]] = None,
+) -> str:
+    """Dump a (flushed) node stream and its region markers. The stream format
+    is a plain file copy, the others load the whole stream in memory."""
+    marker_data = markers_dataset(markers or [])
+    if data_format == HWS_DUMP_STREAM:
+        path = f"{dump_name}.{HWS_DUMP_STREAM}"
+        shutil.copyfile(stream_path, path)
+        _save_markers(marker_data, path)
+        return path
+    data = load_dataset(stream_path)
+    data.update(marker_data)
+    return save_dataset(data, dump_name, data_format)
+
+
+def load_dataset(path: str) -> Dict[str, np.ndarray]:
+    if path.endswith(f".{HWS_DUMP_NPZ}"):
+        with np.load(path) as npz:
+            return {k: npz[k] for k in npz.files}
+    if path.endswith(f".{HWS_DUMP_JSON}"):
+        with open(path) as f:
+            return {k: np.asarray(v) for k, v in json.load(f).items()}
+    if path.endswith(f".{HWS_DUMP_STREAM}"):
+        header, columns = read_stream(path)
+        data = build_dataset(columns, header["devices"], header["nodes"])
+        if os.path.exists(_markers_path(path)):
+            with open(_markers_path(path)) as f:
+                data.update({k: np.asarray(v) for k, v in json.load(f).items()})
+        return data
+    raise RuntimeError(f"Can't load hardware samples from {path}: unknown format")
+
+
+def merge_datasets(datasets: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Merge node datasets on a common time axis.
+
+    The axis spans the time all nodes were sampling, at the median sampling
+    interval; every series is linearly interpolated on it. Devices of all
+    nodes are concatenated in the per device arrays."""
+    if datasets == []:
+        raise RuntimeError("No hardware samples to merge")
+    starts = [d["timestamps"][0] for d in datasets if len(d["timestamps"]) > 0]
+    if len(starts) != len(datasets):
+        raise RuntimeError("Can't merge a node without samples")
+    start = max(starts)
+    end = min(d["timestamps"][-1] for d in datasets)
+    if end < start:
+        raise RuntimeError("Nodes were not sampling at the same time")
+    intervals = np.concatenate([np.diff(d["timestamps"]) for d in datasets])
+    dt = float(np.median(intervals)) if len(intervals) > 0 else 1.0
+    timestamps = start + dt * np.arange(int((end - start) / dt) + 1)
+
+    def _interp(d: Dict[str, np.ndarray], series: np.ndarray) -> np.ndarray:
+        return np.interp(timestamps, d["timestamps"], series)
+
+    merged: Dict[str, np.ndarray] = {"timestamps": timestamps}
+    for field, suffix in _SPLIT_FIELDS.items():
+        key = f"{field}{suffix}"
+        columns = [
+            _interp(d, d[key][:, i])
+            for d in datasets
+            if key in d
+            for i in range(d[key].shape[1])
+        ]
+        split = np.stack(columns, axis=1) if columns else np.zeros((len(timestamps), 0))
+        merged[key] = split
+        if field in REDUCTIONS and field not in HWS_HOST_FIELDS:
+            merged[field] = _reduce(field, split)
+    for field in HWS_HOST_FIELDS[1:]:
+        merged[field] = _reduce(
+            field, np.stack([_interp(d, d[field]) for d in datasets], axis=1)
+        )
+    markers = [d for d in datasets if MARKER_KINDS in d]
+    if markers != []:
+        order = np.argsort(
+            np.concatenate([d[MARKER_TIMES] for d in markers]), kind="stable"
+        )
+        for key in _MARKER_KEYS:
+            merged[key] = np.concatenate([d[key] for d in markers])[order]
+    merged["devices"] = np.concatenate([d["devices"] for d in datasets])
+    merged["nodes"] = np.concatenate([d["nodes"] for d in datasets])
+    return merged
+
+
+def merge_node_dumps(dump_name: str, data_format: str = HWS_DUMP_FORMAT) -> str:
+    """Merge the `<dump_name>.<node>.<format>` dumps into `<dump_name>.<format>`"""
+    paths = sorted(glob.glob(f"{dump_name}.*.{data_format}"))
+    if paths == []:
+        raise RuntimeError(f"No per node dumps found for {dump_name}")
+    merged = merge_datasets([load_dataset(path) for path in paths])
+    return save_dataset(merged, dump_name, data_format)
@@ -0,0 +1,94 @@
+from typing import List, Tuple
+
+import numpy as np
+
+# Points kept per trace when rendering
+DEFAULT_POINTS = 2000
+DECIMATE_MINMAX = "minmax"
+DECIMATE_LTTB = "lttb"
+
+
+def minmax_indices(y: np.ndarray, points: int) -> np.ndarray:
+    """Indices of the min & max of `points // 2` equal buckets (plus the
+    first & last sample): every peak survives, in time order"""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    buckets = max(points // 2, 1)
+    if n <= points:
+        return np.arange(n)
+    size = -(-n // buckets)
+    # Pad with the last sample so the buckets reshape, pad indices clip back
+    padded = np.concatenate([y, np.full(buckets * size - n, y[-1])])
+    rows = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    lows = np.argmin(np.where(np.isnan(rows), np.inf, rows), axis=1) + offsets
+    highs = np.argmax(np.where(np.isnan(rows), -np.inf, rows), axis=1) + offsets
+    indices = np.concatenate([[0, n - 1], lows, highs])
+    return np.unique(np.minimum(indices, n - 1))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: per bucket, the sample making the
+    largest triangle with the previous pick and the next bucket average"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= points or points < 3:
+        return np.arange(n)
+    # First & last samples are kept, the others split in `points - 2` buckets
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    indices = np.empty(points, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    picked = 0
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_stop = edges[bucket + 1], edges[bucket + 2]
+            next_x = x[next_start:next_stop].mean()
+            next_y = np.nanmean(y[next_start:next_stop])
+        else:
+            next_x, next_y = x[-1], y[-1]
+        areas = np.abs(
+            (x[picked] - next_x) * (y[start:stop] - y[picked])
+            - (x[picked] - x[start:stop]) * (next_y - y[picked])
+        )
+        if not np.all(np.isnan(areas)):
+            picked = start + int(np.nanargmax(areas))
+        else:
+            picked = start
+        indices[bucket + 1] = picked
+    return indices
+
+
+def decimate(
+    x: np.ndarray,
+    y: np.ndarray,
+    points: int = DEFAULT_POINTS,
+    method: str = DECIMATE_MINMAX,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """At most ~`points` samples of (x, y) for rendering"""
+    if method == DECIMATE_MINMAX:
+        indices = minmax_indices(y, points)
+    elif method == DECIMATE_LTTB:
+        indices = lttb_indices(x, y, points)
+    else:
+        raise RuntimeError(f"Unknown decimation {method}")
+    return np.asarray(x)[indices], np.asarray(y)[indices]
+
+
+def pyramid(
+    x: np.ndarray,
+    y: np.ndarray,
+    points: int = DEFAULT_POINTS,
+    levels: int = 4,
+    factor: int = 4,
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Min-max decimations of (x, y) from `points` up, each level `factor`
+    times finer (the last one may be the raw samples)"""
+    result = []
+    for level in range(levels):
+        level_x, level_y = decimate(x, y, points * factor**level, DECIMATE_MINMAX)
+        result.append((level_x, level_y))
+        if len(level_x) == len(x):
+            break
+    return result
@@ -1,47 +1,104 @@
+import json
+import os
+from typing import List, Optional, Tuple
+
 import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
-from tcn.hws.analysis import energy_envelop_calculation, load_data
+from tcn.hws.analysis import dataset_energy_calculation, load_data, time_range
 from tcn.hws.constants import HWS_HARDWARE_SPECS, HWS_HW_CPU, HWS_HW_GPU
+from tcn.hws.decimate import DECIMATE_MINMAX, DEFAULT_POINTS, decimate, pyramid
 
 COLOR_VRAM = "C4"
 
 
+# (dataset key, legend, secondary y axis) of the plotted series
+TRACES = [
+    ("gpu_psu", "GPU PSU(W)", False),
+    ("gpu_exe_utl", "GPU Utilization(%)", False),
+    ("cpu_psu", "CPU PSU(W - extrapolated)", False),
+    ("cpu_exe_utl", "CPU Utilization(%)", False),
+    ("gpu_mem", "GPU VRAM (Mb)", True),
+]
+
+# Swaps every trace for the finest pyramid level that fits `budget` points in
+# the zoomed x range (level 0 when zoomed out)
+_PYRAMID_SCRIPT = """
+var plot = document.getElementById("{plot_id}");
+var levels = %(levels)s;
+var budget = %(budget)d;
+function visible(x, range) {
+  var lo = 0, hi = x.length;
+  while (lo < x.length && x[lo] < range[0]) lo++;
+  while (hi > lo && x[hi - 1] > range[1]) hi--;
+  return [Math.max(lo - 1, 0), Math.min(hi + 1, x.length)];
+}
+function pick(range) {
+  var update = {x: [], y: []};
+  levels.forEach(function (trace) {
+    var x = trace[0][0], y = trace[0][1];
+    for (var k = trace.length - 1; range && k > 0; k--) {
+      var span = visible(trace[k][0], range);
+      if (span[1] - span[0] <= budget) {
+        x = trace[k][0].slice(span[0], span[1]);
+        y = trace[k][1].slice(span[0], span[1]);
+        break;
+      }
+    }
+    update.x.push(x);
+    update.y.push(y);
+  });
+  Plotly.restyle(plot, update);
+}
+plot.on("plotly_relayout", function (e) {
+  if (e["xaxis.range[0]"] !== undefined) {
+    pick([e["xaxis.range[0]"], e["xaxis.range[1]"]]);
+  } else if (e["xaxis.autorange"]) {
+    pick(null);
+  }
+});
+"""
+
+
+def _pyramid_script(levels: List[List[Tuple[np.ndarray, np.ndarray]]], budget: int):
+    return _PYRAMID_SCRIPT % {
+        "levels": json.dumps(
+            [[[x.tolist(), y.tolist()] for x, y in trace] for trace in levels]
+        ),
+        "budget": budget,
+    }
+
+
 def cli(
     data_filepath: str,
-    data_format: str = "npz",
+    data_format: Optional[str] = None,
     data_range: slice = slice(None),
+    seconds_range: Optional[Tuple[float, float]] = None,
     cpu_label: str = HWS_HW_CPU,
     gpu_label: str = HWS_HW_GPU,
+    points: int = DEFAULT_POINTS,
+    method: str = DECIMATE_MINMAX,
+    html: bool = False,
 ):
+    """PNG of the sensors, decimated to ~`points` per trace. `html` also
+    writes an interactive page refining the traces on zoom. `seconds_range`
+    selects the samples on the recorded time instead of `data_range`."""
     d = load_data(data_filepath, data_format)
+    if seconds_range is not None:
+        data_range = time_range(d, *seconds_range)
     sample_count = len(d["cpu_psu"][data_range])
     yd = np.arange(sample_count)
 
     fig = make_subplots(specs=[[{"secondary_y": True}]])
-    # Add traces
-    fig.add_trace(
-        go.Scatter(y=d["gpu_psu"][data_range], x=yd, name="GPU PSU(W)"),
-        secondary_y=False,
-    )
-    fig.add_trace(
-        go.Scatter(y=d["gpu_exe_utl"][data_range], x=yd, name="GPU Utilization(%)"),
-        secondary_y=False,
-    )
-    fig.add_trace(
-        go.Scatter(y=d["cpu_psu"][data_range], x=yd, name="CPU PSU(W - extrapolated)"),
-        secondary_y=False,
-    )
-    fig.add_trace(
-        go.Scatter(y=d["cpu_exe_utl"][data_range], x=yd, name="CPU Utilization(%)"),
-        secondary_y=False,
-    )
-
-    fig.add_trace(
-        go.Scatter(y=d["gpu_mem"][data_range], x=yd, name="GPU VRAM (Mb)"),
-        secondary_y=True,
-    )
+    # Add traces, decimated: raw runs can be millions of samples
+    levels = []
+    for key, name, secondary_y in TRACES:
+        series = np.asarray(d[key][data_range])
+        x, y = decimate(yd, series, points, method)
+        fig.add_trace(go.Scatter(y=y, x=x, name=name), secondary_y=secondary_y)
+        if html:
+            levels.append(pyramid(yd, series, points))
 
     # Labels
     fig.update_layout(
@@ -66,9 +123,19 @@ def cli(
         f"Max CPU exe: {np.max(d['gpu_exe_utl'][data_range])}\n"
     )
 
-    fig.write_image(data_filepath.replace(f".{data_format}", ".png"))
+    # Next to the dump, whatever its format
+    output_stem = os.path.splitext(data_filepath)[0]
+    fig.write_image(f"{output_stem}.png")
+    if html:
+        # Zoomed out view is the pyramid's coarsest level
+        for trace, trace_levels in zip(fig.data, levels):
+            trace.x, trace.y = trace_levels[0]
+        fig.write_html(
+            f"{output_stem}.html",
+            post_script=_pyramid_script(levels, points),
+        )
 
-    energy_envelop_calculation(d["cpu_psu"][data_range], d["gpu_psu"][data_range])
+    dataset_energy_calculation(d, data_range)
 
 
 # Useful for debug
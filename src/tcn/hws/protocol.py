@@ -0,0 +1,28 @@
+import asyncio
+import json
+import struct
+from typing import Any, Dict, Optional
+
+# Client/server messages: uint32 LE payload length, then the JSON order
+FRAME_HEADER = struct.Struct("<I")
+# Anything bigger is a protocol error, not an order
+MAX_FRAME_SIZE = 1 << 16
+
+
+def encode_order(order: Dict[str, Any]) -> bytes:
+    payload = json.dumps(order, separators=(",", ":")).encode("utf8")
+    if len(payload) > MAX_FRAME_SIZE:
+        raise RuntimeError(f"HWS order too large ({len(payload)} bytes)")
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+async def read_order(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    """Next order of a connection, None when the client is gone"""
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+        (length,) = FRAME_HEADER.unpack(header)
+        if length > MAX_FRAME_SIZE:
+            raise RuntimeError(f"HWS frame too large ({length} bytes)")
+        return json.loads(await reader.readexactly(length))
+    except asyncio.IncompleteReadError:
+        return None
@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+
+class DeadlineScheduler:
+    """Fires on absolute deadlines `start + k * period` (monotonic clock).
+
+    The cost of the work between two `wait` does not accumulate as drift;
+    deadlines that passed while working are skipped and counted in `missed`.
+    `timestamp` maps the monotonic clock to epoch seconds (for cross-node
+    alignment) without following wall clock adjustments."""
+
+    def __init__(self, period_s: float):
+        if period_s <= 0:
+            raise RuntimeError(f"Sampling period must be > 0, got {period_s}")
+        self.period_ns = int(period_s * 1e9)
+        self.start_ns = time.monotonic_ns()
+        self._epoch_start = time.time()
+        self.missed = 0
+        self._fired = 0  # index of the last deadline fired (0: start)
+
+    def timestamp(self) -> float:
+        """Epoch seconds, monotonic"""
+        return self._epoch_start + (time.monotonic_ns() - self.start_ns) / 1e9
+
+    async def wait(self) -> int:
+        """Sleep until the next deadline, returns the deadlines missed since
+        the previous call"""
+        now = time.monotonic_ns()
+        due = (now - self.start_ns) // self.period_ns + 1
+        missed = max(int(due) - self._fired - 1, 0)
+        self.missed += missed
+        self._fired = max(self._fired + 1, int(due))
+        deadline = self.start_ns + self._fired * self.period_ns
+        await asyncio.sleep(max(deadline - time.monotonic_ns(), 0) / 1e9)
+        return missed
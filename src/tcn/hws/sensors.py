@@ -0,0 +1,207 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import psutil
+
+from tcn.hws.constants import HWS_GPU_FIELDS, HWS_HARDWARE_SPECS, HWS_HW_CPU
+from tcn.hws.cpu import (
+    CPU_POWER_MODEL,
+    CPU_POWER_RAPL,
+    ProcStatReader,
+    RAPLReader,
+    proc_stat_reader,
+    rapl_reader,
+)
+from tcn.hws.dataset import load_dataset, stream_of
+
+# Conditional NVML import for CPU-only machines
+try:
+    import pynvml
+except ModuleNotFoundError:
+    pynvml = None
+
+
+class SensorProvider(ABC):
+    """Source of some of the sampled stream columns.
+
+    `read` returns one value per entry of `columns`, `metadata` ends up in
+    the stream header (e.g. device names)."""
+
+    def __init__(self, columns: List[str], metadata: Optional[Dict[str, Any]] = None):
+        self.columns = columns
+        self.metadata: Dict[str, Any] = metadata if metadata is not None else {}
+
+    @abstractmethod
+    def read(self, timestamp: float) -> List[float]:
+        pass
+
+    def __str__(self) -> str:
+        return type(self).__name__
+
+
+class PsutilProvider(SensorProvider):
+    """Overall CPU utilization, when /proc/stat isn't available"""
+
+    def __init__(self):
+        super().__init__(["cpu_exe_utl"])
+        self.last_utilization = psutil.cpu_percent()
+
+    def read(self, timestamp: float) -> List[float]:
+        self.last_utilization = psutil.cpu_percent()
+        return [self.last_utilization]
+
+
+class ProcStatProvider(SensorProvider):
+    """Overall & per core CPU utilization"""
+
+    def __init__(self, reader: ProcStatReader):
+        super().__init__(
+            ["cpu_exe_utl"] + [f"cpu_core_utl.{core}" for core in range(reader.cores)]
+        )
+        self.reader = reader
+        self.last_utilization = 0.0
+
+    def read(self, timestamp: float) -> List[float]:
+        cores = self.reader.read()
+        self.last_utilization = float(cores.mean()) if len(cores) else 0.0
+        return [self.last_utilization, *cores.tolist()]
+
+
+class RAPLProvider(SensorProvider):
+    """Measured CPU power & cumulative energy (overall and per package)"""
+
+    def __init__(self, reader: RAPLReader):
+        super().__init__(
+            ["cpu_psu", "cpu_energy"]
+            + [f"cpu_energy.{package}" for package in range(len(reader.zones))],
+            {"cpu_power": CPU_POWER_RAPL, "packages": reader.names},
+        )
+        self.reader = reader
+        self._last: Optional[tuple] = None
+
+    def read(self, timestamp: float) -> List[float]:
+        packages = self.reader.read()
+        energy = float(packages.sum())
+        power = 0.0
+        if self._last is not None and timestamp > self._last[0]:
+            power = (energy - self._last[1]) / (timestamp - self._last[0])
+        self._last = (timestamp, energy)
+        return [power, energy, *packages.tolist()]
+
+
+class CPUModelProvider(SensorProvider):
+    """CPU power extrapolated from the utilization: linear between the idle
+    power & TDP of `HWS_HW_CPU`. Reads after `utilization`."""
+
+    def __init__(self, utilization: SensorProvider, cpu_label: str = HWS_HW_CPU):
+        super().__init__(["cpu_psu", "cpu_energy"], {"cpu_power": CPU_POWER_MODEL})
+        self.utilization = utilization
+        self.idle = HWS_HARDWARE_SPECS[cpu_label]["PSU_IDLE"]
+        self.tdp = HWS_HARDWARE_SPECS[cpu_label]["PSU_TDP"]
+
+    def read(self, timestamp: float) -> List[float]:
+        cpu_use = getattr(self.utilization, "last_utilization", 0.0)
+        return [max(cpu_use / 100 * self.tdp, self.idle), np.nan]
+
+
+class NVMLProvider(SensorProvider):
+    """Power, utilization & memory of every NVIDIA GPU of the node"""
+
+    def __init__(self):
+        self.handles = [
+            pynvml.nvmlDeviceGetHandleByIndex(i)
+            for i in range(pynvml.nvmlDeviceGetCount())
+        ]
+        names = [pynvml.nvmlDeviceGetName(handle) for handle in self.handles]
+        names = [n.decode() if isinstance(n, bytes) else n for n in names]
+        super().__init__(
+            [
+                f"{field}.{i}"
+                for i in range(len(self.handles))
+                for field in HWS_GPU_FIELDS
+            ],
+            {"devices": names},
+        )
+
+    def read(self, timestamp: float) -> List[float]:
+        row: List[float] = []
+        for handle in self.handles:
+            nvmlUtlz = pynvml.nvmlDeviceGetUtilizationRates(handle)
+            nvmlMem = pynvml.nvmlDeviceGetMemoryInfo(handle)
+            row.extend(
+                (
+                    pynvml.nvmlDeviceGetPowerUsage(handle) / 1000,
+                    nvmlUtlz.gpu,
+                    nvmlUtlz.memory,
+                    nvmlMem.used / (1024 * 1024),
+                )
+            )
+        return row
+
+
+def nvml_provider() -> Optional[NVMLProvider]:
+    """NVML provider if the driver is there & sees at least one GPU"""
+    if pynvml is None:
+        return None
+    try:
+        pynvml.nvmlInit()
+        print("[NVML SERVER] Driver Version:", pynvml.nvmlSystemGetDriverVersion())
+        provider = NVMLProvider()
+    except pynvml.NVMLError:
+        return None
+    return provider if provider.handles else None
+
+
+class ReplayProvider(SensorProvider):
+    """Deterministic replay of a recorded dataset (see `tcn.hws.dataset`):
+    each read returns the next recorded sample, looping at the end. The
+    recorded timestamps & missed deadlines are not replayed."""
+
+    def __init__(self, columns: Dict[str, np.ndarray], metadata: Dict[str, Any]):
+        super().__init__(
+            [
+                name
+                for name in columns
+                if name not in ["timestamps", "missed_deadlines"]
+            ],
+            metadata,
+        )
+        self._samples = (
+            np.stack([np.asarray(columns[name]) for name in self.columns], axis=1)
+            if self.columns
+            else np.zeros((0, 0))
+        )
+        if len(self._samples) == 0:
+            raise RuntimeError("Can't replay a recording without samples")
+        self._next = 0
+
+    @classmethod
+    def from_dump(cls, path: str) -> "ReplayProvider":
+        """Replay of a dump (npz, json or bin), devices names are kept"""
+        data = load_dataset(path)
+        return cls(stream_of(data), {"devices": data["devices"].tolist()})
+
+    def read(self, timestamp: float) -> List[float]:
+        row = self._samples[self._next % len(self._samples)]
+        self._next += 1
+        return row.tolist()
+
+
+def select_providers(replay: Optional[ReplayProvider] = None) -> List[SensorProvider]:
+    """What this machine has: GPUs through NVML, CPU utilization from
+    /proc/stat (or psutil) and CPU power from RAPL (or the utilization
+    model). A replay provider replaces them all."""
+    if replay is not None:
+        return [replay]
+    proc_stat = proc_stat_reader()
+    utilization: SensorProvider = (
+        ProcStatProvider(proc_stat) if proc_stat else PsutilProvider()
+    )
+    rapl = rapl_reader()
+    power = RAPLProvider(rapl) if rapl else CPUModelProvider(utilization)
+    providers = [utilization, power]
+    gpus = nvml_provider()
+    if gpus is not None:
+        providers.append(gpus)
+    return providers
@@ -1,151 +1,189 @@
 import asyncio
-import json
 import os
 import socket
-from typing import List
-
-import numpy as np
-import psutil
-from pynvml import (
-    nvmlDeviceGetCount,
-    nvmlDeviceGetHandleByIndex,
-    nvmlDeviceGetMemoryInfo,
-    nvmlDeviceGetName,
-    nvmlDeviceGetPowerUsage,
-    nvmlDeviceGetUtilizationRates,
-    nvmlInit,
-    nvmlSystemGetDriverVersion,
-)
+from typing import Any, Dict, List, Optional, Tuple
 
 from tcn.hws.constants import (
-    HWS_DUMP_FORMAT,
-    HWS_DUMP_JSON,
-    HWS_DUMP_NPZ,
-    HWS_HARDWARE_SPECS,
-    HWS_HW_CPU,
+    HWS_CHUNK_SIZE,
+    HWS_STREAM_FILENAME,
     SERV_ORDER_DUMP,
+    SERV_ORDER_REGION_BEGIN,
+    SERV_ORDER_REGION_END,
     SERV_ORDER_START,
     SERV_ORDER_STOP,
     SERV_ORDER_TICK,
     SOCKET_DIRECTORY,
     SOCKET_FILENAME,
 )
+from tcn.hws.dataset import (
+    MARKER_BEGIN,
+    MARKER_END,
+    MARKER_TICK,
+    dump_stream,
+    node_dump_name,
+)
+from tcn.hws.protocol import read_order
+from tcn.hws.scheduler import DeadlineScheduler
+from tcn.hws.sensors import ReplayProvider, SensorProvider, select_providers
+from tcn.hws.stream import StreamWriter
+
+# Orders recorded as markers on the sample time axis
+MARKER_ORDERS = {
+    SERV_ORDER_REGION_BEGIN: MARKER_BEGIN,
+    SERV_ORDER_REGION_END: MARKER_END,
+    SERV_ORDER_TICK: MARKER_TICK,
+}
 
 
 async def psu_utlz_read(
-    gpu_psu: List[float],
-    gpu_exe_utl: List[float],
-    gpu_mem_utl: List[float],
-    gpu_mem: List[float],
-    cpu_exe_utl: List[float],
-    cpu_psu: List[float],
-    record_dt: float,
-    handle,
+    stream: StreamWriter,
+    scheduler: DeadlineScheduler,
+    providers: List[SensorProvider],
 ):
     while True:
-        # NVML reads
-        gpu_psu.append(nvmlDeviceGetPowerUsage(handle) / 1000)
-        nvmlUtlz = nvmlDeviceGetUtilizationRates(handle)
-        gpu_exe_utl.append(nvmlUtlz.gpu)
-        gpu_mem_utl.append(nvmlUtlz.memory)
-        nvmlMem = nvmlDeviceGetMemoryInfo(handle)
-        gpu_mem.append(nvmlMem.used / (1024 * 1024))
-        # CPU - EPYC 7402
-        cpu_use = psutil.cpu_percent()
-        cpu_exe_utl.append(cpu_use)
-        # linear regression for power on CPU from utl
-        idle = HWS_HARDWARE_SPECS[HWS_HW_CPU]["PSU_IDLE"]
-        tdp = HWS_HARDWARE_SPECS[HWS_HW_CPU]["PSU_TDP"]
-        cpu_psu.append(max(cpu_use / 100 * tdp, idle))
-        # Sleep the dt
-        await asyncio.sleep(record_dt)
-
-
-async def main():
-    # # Setup
-    print("NVML server up & waiting for connection")
-    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-    os.makedirs(SOCKET_DIRECTORY, exist_ok=True)
-    if os.path.exists(SOCKET_FILENAME):
-        os.remove(SOCKET_FILENAME)
-    server.bind(SOCKET_FILENAME)
-    server.listen(1)
-    server.setblocking(False)
-
-    # Actions
-    record_dt = 1
-    hardware_load = {}
-    hardware_load["gpu_psu"] = []
-    hardware_load["gpu_exe_utl"] = []
-    hardware_load["gpu_mem_utl"] = []
-    hardware_load["gpu_mem"] = []
-    hardware_load["cpu_exe_utl"] = []
-    hardware_load["cpu_psu"] = []
-    ticks = []
-
-    # Spin NVML
-    nvmlInit()
-    print("[NVML SERVER] Driver Version:", nvmlSystemGetDriverVersion())
-    deviceCount = nvmlDeviceGetCount()
-    assert deviceCount == 1
-    handle = nvmlDeviceGetHandleByIndex(0)
-    name = nvmlDeviceGetName(handle)
-    print(f"[NVML SERVER] Device: {name}")
-
-    # asyncio
-    loop = asyncio.get_event_loop()
-
-    # Server loop
-    while True:
-        # Deal with client/server
-        client, _ = await loop.sock_accept(server)
-        print(f"[NVML SERVER] Connection from {client}")
+        timestamp = scheduler.timestamp()
+        row = [timestamp, scheduler.missed]
+        for provider in providers:
+            row.extend(provider.read(timestamp))
+        stream.append(row)
+        # Sleep until the next deadline
+        await scheduler.wait()
+
+
+class SamplerServer:
+    """Sampling state of the node, driven by the clients orders"""
 
-        # Process request
-        request = (await loop.sock_recv(client, 255)).decode("utf8")
-        order = json.loads(request)
+    def __init__(self, providers: List[SensorProvider]):
+        self.providers = providers
+        print(f"[NVML SERVER] Sensors: {', '.join(str(p) for p in providers)}")
+        metadata: Dict[str, Any] = {"devices": []}
+        for provider in providers:
+            metadata.update(provider.metadata)
+        metadata["nodes"] = [socket.gethostname()]
+        self.stream = StreamWriter(
+            HWS_STREAM_FILENAME,
+            ["timestamps", "missed_deadlines"]
+            + [column for provider in providers for column in provider.columns],
+            HWS_CHUNK_SIZE,
+            metadata=metadata,
+        )
+        self.scheduler: Optional[DeadlineScheduler] = None
+        self.sampling: Optional[asyncio.Task] = None
+        self.markers: List[Tuple[str, str, float]] = []
+        self.stopped = asyncio.Event()
+        self.dumps: List[asyncio.Future] = []
 
-        # We have a valid message
-        if order["action"] == SERV_ORDER_STOP:
+    def process(self, order: Dict[str, Any]):
+        action = order.get("action")
+        if action in MARKER_ORDERS:
+            # Hot path: no print
+            if self.scheduler is not None:
+                self.markers.append(
+                    (
+                        MARKER_ORDERS[action],
+                        order.get("name", ""),
+                        self.scheduler.timestamp(),
+                    )
+                )
+        elif action == SERV_ORDER_STOP:
             print("[NVML SERVER] Closing...")
-            client.close()
-            break
-        elif order["action"] == SERV_ORDER_START:
+            asyncio.get_running_loop().create_task(self._stop())
+        elif action == SERV_ORDER_START:
             record_dt = order["dt"]
-            loop.create_task(
-                psu_utlz_read(
-                    hardware_load["gpu_psu"],
-                    hardware_load["gpu_exe_utl"],
-                    hardware_load["gpu_mem_utl"],
-                    hardware_load["gpu_mem"],
-                    hardware_load["cpu_exe_utl"],
-                    hardware_load["cpu_psu"],
-                    record_dt,
-                    handle,
+            if self.sampling is None:
+                self.scheduler = DeadlineScheduler(record_dt)
+                self.sampling = asyncio.get_running_loop().create_task(
+                    psu_utlz_read(self.stream, self.scheduler, self.providers)
                 )
-            )
             print(f"[NVML SERVER] Recording every {record_dt} seconds")
-        elif order["action"] == SERV_ORDER_DUMP:
-            hws_dump_name = order["dump_name"]
-            if HWS_DUMP_FORMAT == HWS_DUMP_NPZ:
-                np.savez_compressed(f"./{hws_dump_name}.npz", **hardware_load)
-            elif HWS_DUMP_FORMAT == HWS_DUMP_JSON:
-                json_data = json.dumps(hardware_load, indent=4)
-                with open(f"{hws_dump_name}.json", "w") as f:
-                    f.write(json_data)
-            else:
-                raise RuntimeWarning(f"Can't dump in unknown format {HWS_DUMP_FORMAT}")
-        elif order["action"] == SERV_ORDER_TICK:
-            ticks.append(len(hardware_load))
-            print(f"[NVML SERVER] Recorded tick at {ticks[-1]}")
+        elif action == SERV_ORDER_DUMP:
+            if self.scheduler and self.scheduler.missed > 0:
+                print(
+                    f"[NVML SERVER] {self.scheduler.missed} sampling deadlines missed"
+                )
+            self.stream.flush()
+            # Exports load & compress the whole stream: off the loop, so that
+            # sampling & the clients keep being served meanwhile
+            self.dumps = [dump for dump in self.dumps if not dump.done()]
+            self.dumps.append(
+                asyncio.get_running_loop().run_in_executor(
+                    None,
+                    self._dump,
+                    node_dump_name(order["dump_name"]),
+                    list(self.markers),
+                    len(self.stream),
+                )
+            )
         else:
             print(f"[NVML SERVER] Received unknown {order}")
 
-        # One-time client
-        client.close()
-    # psu_read_task.cancel()
+    def _dump(
+        self, dump_name: str, markers: List[Tuple[str, str, float]], samples: int
+    ):
+        try:
+            path = dump_stream(self.stream.path, dump_name, markers=markers)
+        except Exception as e:
+            print(f"[NVML SERVER] Failed to dump {dump_name}: {e!r}")
+            return
+        print(
+            f"[NVML SERVER] Dumped {samples} samples "
+            f"& {len(markers)} markers to {path}"
+        )
+
+    async def _stop(self):
+        # Pending dumps complete before the stream gets closed
+        await asyncio.gather(*self.dumps)
+        self.stopped.set()
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        # One connection per client process, orders until it disconnects
+        try:
+            while not self.stopped.is_set():
+                order = await read_order(reader)
+                if order is None:
+                    break
+                try:
+                    self.process(order)
+                except Exception as e:
+                    # A bad order must not take the sampler down
+                    print(f"[NVML SERVER] Failed to process {order}: {e!r}")
+        except (RuntimeError, ValueError) as e:
+            print(f"[NVML SERVER] Dropping client: {e}")
+        finally:
+            writer.close()
+
+    def close(self):
+        if self.sampling is not None:
+            self.sampling.cancel()
+        self.stream.close()
+
+
+async def main(replay: Optional[str] = None):
+    # # Setup
+    os.makedirs(SOCKET_DIRECTORY, exist_ok=True)
+    if os.path.exists(SOCKET_FILENAME):
+        os.remove(SOCKET_FILENAME)
+
+    # Sensors this machine has, or the replay of a recorded run
+    providers = select_providers(
+        ReplayProvider.from_dump(replay) if replay is not None else None
+    )
+    for provider in providers:
+        for i, name in enumerate(provider.metadata.get("devices", [])):
+            print(f"[NVML SERVER] Device {i}: {name}")
+
+    # Clients are multiplexed on the asyncio loop, next to the sampling task
+    sampler = SamplerServer(providers)
+    server = await asyncio.start_unix_server(
+        sampler.handle_client, path=SOCKET_FILENAME
+    )
+    print("NVML server up & waiting for connection")
+    await sampler.stopped.wait()
     server.close()
+    sampler.close()
 
 
-def cli():
-    asyncio.run(main())
+def cli(replay: Optional[str] = None):
+    asyncio.run(main(replay))
@@ -0,0 +1,83 @@
+import json
+import os
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tcn.hws.buffer import RingBuffer
+
+# Append-only sample stream:
+#   MAGIC | header length (uint32 LE) | JSON header | float64 LE rows
+# The header describes the columns, rows are appended chunk by chunk so the
+# file is readable (up to the last flushed chunk) at any time.
+STREAM_MAGIC = b"TCNHWS\x00\x01"
+_LENGTH = struct.Struct("<I")
+_DTYPE = np.dtype("<f8")
+
+
+class StreamWriter:
+    """Stage samples in a fixed-size chunk, append full chunks to `path`"""
+
+    def __init__(
+        self,
+        path: str,
+        columns: List[str],
+        chunk_size: int,
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        self.path = path
+        self.columns = columns
+        self._chunk = RingBuffer(columns, chunk_size)
+        self.flushed = 0  # rows on disk
+        header = json.dumps({"columns": columns, **(metadata or {})}).encode("utf8")
+        self._file = open(path, "wb")
+        self._file.write(STREAM_MAGIC + _LENGTH.pack(len(header)) + header)
+        self._file.flush()
+
+    def __len__(self) -> int:
+        return self.flushed + len(self._chunk)
+
+    def append(self, row: Sequence[float]):
+        self._chunk.append(row)
+        if len(self._chunk) == self._chunk.capacity:
+            self.flush()
+
+    def flush(self):
+        """Hand the staged rows to the OS: readers see them, no disk sync.
+        `flush` runs in the sampling loop, fsync would block it on I/O."""
+        if len(self._chunk) > 0:
+            rows = self._chunk.array()
+            self._file.write(rows.astype(_DTYPE, copy=False).tobytes())
+            self.flushed += len(rows)
+            self._chunk.clear()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+
+def _read_header(f) -> Tuple[Dict[str, Any], int]:
+    if f.read(len(STREAM_MAGIC)) != STREAM_MAGIC:
+        raise RuntimeError(f"{f.name} is not a hardware samples stream")
+    (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+    header = json.loads(f.read(length).decode("utf8"))
+    return header, len(STREAM_MAGIC) + _LENGTH.size + length
+
+
+def read_stream(path: str) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Header & memory-mapped columns of a stream. A partially written
+    trailing row (writer still running) is ignored."""
+    with open(path, "rb") as f:
+        header, offset = _read_header(f)
+    width = len(header["columns"])
+    rows = (os.path.getsize(path) - offset) // (_DTYPE.itemsize * width)
+    if rows == 0:
+        data = np.zeros((0, width), dtype=_DTYPE)
+    else:
+        data = np.memmap(path, dtype=_DTYPE, mode="r", offset=offset)
+        data = data[: rows * width].reshape(rows, width)
+    return header, {name: data[:, i] for i, name in enumerate(header["columns"])}
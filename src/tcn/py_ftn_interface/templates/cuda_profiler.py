@@ -1,5 +1,16 @@
 import time
-from typing import Dict, List
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List
+
+# Hardware sampler region markers, when tcn is installed
+try:
+    from tcn.hws.client import hws_region
+except ModuleNotFoundError:
+
+    @contextmanager
+    def hws_region(name: str) -> Iterator[None]:
+        yield
+
 
 # Conditional cupy import for non-GPU machines
 try:
@@ -57,18 +68,25 @@ class CUDAProfiler:
 
 
 class TimedCUDAProfiler(CUDAProfiler):
+    """Times the block and marks it as a region for the hardware sampler
+    (see `tcn.hws.client.hws_region`)"""
+
     def __init__(self, label: str, timings: Dict[str, List[float]]) -> None:
         super().__init__(label)
         self._start_time = 0
         self._timings = timings
+        self._region = nullcontext()
 
     def __enter__(self):
         super().__enter__()
+        self._region = hws_region(self.label)
+        self._region.__enter__()
         self._start_time = time.perf_counter()
 
     def __exit__(self, _type, _val, _traceback):
         super().__exit__(_type, _val, _traceback)
         t = time.perf_counter() - self._start_time
+        self._region.__exit__(_type, _val, _traceback)
         if self.label not in self._timings:
             self._timings[self.label] = [t]
         else:
@@ -1,7 +1,19 @@
+import os
+
+import dask
+import numpy as np
 import xarray as xr
 import plotly.express as px
-from typing import Optional
-import numpy as np
+from typing import Dict, List, Optional
+
+from tcn.validation.compare import Tolerance, error_profile_graph
+from tcn.validation.streaming import (
+    VariableStatistics,
+    aligned,
+    compute_report,
+    compute_statistics,
+    write_summary,
+)
 
 
 def analysis(
@@ -12,17 +24,17 @@ def analysis(
 ):
     for name in list(ref_dataset.keys()):
         if variable and variable == name:
-            ref_var = ref_dataset[name].isel(time=time)
-            cpu_var = cpu_dataset[name].isel(time=time)
-            diff = (cpu_var - ref_var).values.flatten()
-            diff = diff[~np.isnan(diff)]
-            print(f"{name}:\n  " f"Max: {diff.max():.2f}\n" f"  Min: {diff.min():.2f}")
+            # Streamed chunk by chunk, see `tcn.validation.streaming`
+            statistics = compute_statistics(
+                ref_dataset, cpu_dataset, [name], selection={"time": time}
+            )[name]
+            print(statistics)
 
+            ref_var = ref_dataset[name]
             var_name = ref_var.attrs["long_name"].replace("_", " ").title()
-            fig = px.histogram(
-                x=diff,
-                log_y=True,
-            )
+            # Signed difference, binned per decade on each side of 0
+            bins, counts = statistics.signed_histogram()
+            fig = px.bar(x=bins, y=counts, log_y=True)
             fig.update_layout(
                 title=f"{var_name} ({name})",
                 xaxis_title=f"Difference in {ref_var.attrs['units']}",
@@ -30,6 +42,114 @@ def analysis(
             fig.write_image(f"{name}_hist.png")
 
 
+def _report_table(report: List[VariableStatistics]) -> str:
+    lines = [
+        f"{'variable':<24} {'compared':>12} {'exact %':>8} {'NaN diff':>9} "
+        f"{'max abs':>10} {'max rel':>10} {'max ULP':>12} {'fail':>10}"
+    ]
+    for s in report:
+        if s.time is not None:
+            continue
+        exact = 100 * s.exact / s.count if s.count else np.nan
+        lines.append(
+            f"{s.name:<24} {s.count:>12} {exact:>8.2f} {s.nan_mismatch:>9} "
+            f"{s.max_abs_error:>10.3e} {s.max_rel_error:>10.3e} {s.max_ulp:>12.0f} "
+            f"{s.outside_tolerance:>10}"
+        )
+    return "\n".join(lines)
+
+
+def batch_analysis(
+    ref_dataset: xr.Dataset,
+    cpu_dataset: xr.Dataset,
+    variables: Optional[List[str]] = None,
+    window: Optional[slice] = None,
+    summary: Optional[str] = None,
+    plot: Optional[str] = None,
+    tolerance: Optional[Tolerance] = None,
+    profile_dims: Optional[List[str]] = None,
+    profile_output: str = ".",
+) -> List[VariableStatistics]:
+    """Every variable (default: all shared ones) over every time step of the
+    window, in one pass. Per step statistics go to the `summary` file, `plot`
+    is a variable x time heatmap of the max absolute error. Pairs failing the
+    `tolerance` are counted in the "fail" column."""
+    ref_dataset, cpu_dataset = aligned(ref_dataset, cpu_dataset)
+    report = compute_report(
+        ref_dataset, cpu_dataset, variables, window, tolerance=tolerance
+    )
+    print(_report_table(report))
+    if summary:
+        write_summary(report, summary)
+    if plot:
+        steps = [
+            (s.name, s.time, s.max_abs_error) for s in report if s.time is not None
+        ]
+        names = list(dict.fromkeys(name for name, _, _ in steps))
+        times = sorted({step for _, step, _ in steps})
+        errors = np.full((len(names), len(times)), np.nan)
+        for name, step, error in steps:
+            if error > 0:
+                errors[names.index(name), times.index(step)] = np.log10(error)
+        fig = px.imshow(
+            errors,
+            x=times,
+            y=names,
+            aspect="auto",
+            labels={"x": "Time step", "color": "log10 max abs"},
+        )
+        fig.update_layout(title="Max absolute error")
+        fig.write_image(plot)
+    if profile_dims:
+        write_profiles(
+            ref_dataset,
+            cpu_dataset,
+            list(dict.fromkeys(s.name for s in report)),
+            profile_dims,
+            profile_output,
+            window,
+            tolerance,
+        )
+    return report
+
+
+def write_profiles(
+    ref_dataset: xr.Dataset,
+    cpu_dataset: xr.Dataset,
+    variables: List[str],
+    dims: List[str],
+    output: str,
+    window: Optional[slice] = None,
+    tolerance: Optional[Tolerance] = None,
+):
+    """Error profiles along each of `dims` (e.g. level, tile) of every variable
+    having it, computed together and saved as `profile_<dim>.nc` with one
+    `<variable>_<statistic>` per profile"""
+    graphs: Dict[str, Dict[str, xr.Dataset]] = {dim: {} for dim in dims}
+    for name in variables:
+        reference, computed = ref_dataset[name], cpu_dataset[name]
+        if window and "time" in reference.dims:
+            reference = reference.isel(time=window)
+            computed = computed.isel(time=window)
+        for dim in dims:
+            if dim in reference.dims:
+                graphs[dim][name] = error_profile_graph(
+                    reference, computed, dim, tolerance
+                )
+    (profiles,) = dask.compute(graphs)
+    for dim, by_variable in profiles.items():
+        if by_variable == {}:
+            print(f"No variable along {dim}, no profile")
+            continue
+        xr.Dataset(
+            {
+                f"{name}_{statistic}": profile[statistic]
+                for name, profile in by_variable.items()
+                for statistic in profile.data_vars
+            }
+        ).to_netcdf(os.path.join(output, f"profile_{dim}.nc"))
+
+
 if __name__ == "__main__":
     import sys
 
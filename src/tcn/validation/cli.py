@@ -1,7 +1,9 @@
 import click
-from tcn.validation.analysis import analysis
+from tcn.validation.analysis import analysis, batch_analysis
+from tcn.validation.compare import Tolerance
 import tcn.validation.serialbox.serialbox_dat_to_netcdf as sdnc
 import xarray as xr
+from typing import Optional, Tuple
 
 
 @click.group()
@@ -28,24 +30,105 @@ def validate(
     )
 
 
+@click.command()
+@click.argument("reference_nc4", type=str)
+@click.argument("computed_nc4", type=str)
+@click.option(
+    "--variable", "-v", type=str, multiple=True, help="Default: all shared ones"
+)
+@click.option("--time_begin", type=int, default=None)
+@click.option("--time_end", type=int, default=None, help="Exclusive")
+@click.option("--summary", type=str, default=None, help=".json or .parquet")
+@click.option("--plot", type=str, default=None, help="Error heatmap image")
+@click.option("--atol", type=float, default=0.0)
+@click.option("--rtol", type=float, default=0.0)
+@click.option("--ulp", type=float, default=0.0)
+@click.option(
+    "--profile",
+    type=str,
+    multiple=True,
+    help="Dimension of an error profile (e.g. lev), written to profile_<dim>.nc",
+)
+@click.option("--profile_output", type=str, default=".")
+def validate_all(
+    reference_nc4: str,
+    computed_nc4: str,
+    variable: Tuple[str, ...],
+    time_begin: Optional[int],
+    time_end: Optional[int],
+    summary: Optional[str],
+    plot: Optional[str],
+    atol: float,
+    rtol: float,
+    ulp: float,
+    profile: Tuple[str, ...],
+    profile_output: str,
+):
+    # Chunked per time step, the unit of the report
+    batch_analysis(
+        ref_dataset=xr.open_mfdataset(reference_nc4, chunks={"time": 1}),
+        cpu_dataset=xr.open_mfdataset(computed_nc4, chunks={"time": 1}),
+        variables=list(variable) or None,
+        window=slice(time_begin, time_end),
+        summary=summary,
+        plot=plot,
+        tolerance=Tolerance(atol, rtol, ulp) if atol or rtol or ulp else None,
+        profile_dims=list(profile),
+        profile_output=profile_output,
+    )
+
+
 @click.command()
 @click.argument("data_path_of_dat", type=str)
 @click.argument("output_path", type=str)
 @click.option("--rank", "-r", type=int, default=-1)
 @click.option("--savepoint", "-s", type=int, default=-1)
+@click.option("--workers", "-w", type=int, default=1)
+@click.option(
+    "--parallel",
+    type=click.Choice([sdnc.PARALLEL_RANK, sdnc.PARALLEL_VARIABLE]),
+    default=sdnc.PARALLEL_RANK,
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice([sdnc.OUTPUT_NETCDF, sdnc.OUTPUT_ZARR]),
+    default=sdnc.OUTPUT_NETCDF,
+)
+@click.option(
+    "--chunks",
+    type=click.Choice([sdnc.CHUNKS_NONE, sdnc.CHUNKS_RANK, sdnc.CHUNKS_LEVEL]),
+    default=sdnc.CHUNKS_NONE,
+)
+@click.option(
+    "--compressor",
+    type=click.Choice(list(sdnc.COMPRESSORS)),
+    default=sdnc.COMPRESSOR_ZLIB,
+)
+@click.option("--complevel", type=int, default=1)
 def serialbox(
     data_path_of_dat: str,
     output_path: str,
     rank: int,
     savepoint: int,
+    workers: int,
+    parallel: str,
+    output_format: str,
+    chunks: str,
+    compressor: str,
+    complevel: int,
 ):
     sdnc.main(
         data_path=data_path_of_dat,
         output_path=output_path,
         do_only_rank=rank,
         do_only_savepoint=savepoint,
+        workers=workers,
+        parallel=parallel,
+        layout=sdnc.OutputLayout(output_format, chunks, compressor, complevel),
     )
 
 
 cli.add_command(validate)
+cli.add_command(validate_all)
 cli.add_command(serialbox)
@@ -0,0 +1,156 @@
+###
+# Vectorized comparison kernels of a reference (Fortran) & computed (DSL)
+# output: elementwise numpy functions, so they apply as is to the chunks of
+# a Dask array (`map_blocks`, `xr.apply_ufunc(..., dask="parallelized")`).
+###
+
+import dataclasses
+from typing import Dict, Iterable, Optional
+
+import dask
+import numpy as np
+import xarray as xr
+
+
+def _float_type(reference: np.ndarray, computed: np.ndarray) -> np.dtype:
+    # Common type of the comparison: float32 only if both are
+    dtype = np.result_type(reference, computed)
+    return np.dtype(np.float32 if dtype == np.float32 else np.float64)
+
+
+def _ordered_bits(values: np.ndarray) -> np.ndarray:
+    # IEEE sign-magnitude bits -> integers ordered like the floats, so that
+    # consecutive floats are consecutive integers (-0.0 and 0.0 are both 0)
+    int_type = np.int32 if values.dtype == np.float32 else np.int64
+    bits = values.view(int_type).astype(np.int64)
+    return np.where(bits < 0, np.iinfo(int_type).min - bits, bits)
+
+
+def ulp_distance(reference: np.ndarray, computed: np.ndarray) -> np.ndarray:
+    """Number of representable floats between `reference` & `computed`, in
+    their common float type (float64 ULPs for anything but float32). NaN
+    where either is NaN, plain absolute difference for integers."""
+    if not np.issubdtype(np.result_type(reference, computed), np.floating):
+        return np.abs(
+            np.asarray(computed, np.float64) - np.asarray(reference, np.float64)
+        )
+    dtype = _float_type(reference, computed)
+    reference = np.ascontiguousarray(reference, dtype=dtype)
+    computed = np.ascontiguousarray(computed, dtype=dtype)
+    ordered_reference = _ordered_bits(reference)
+    ordered_computed = _ordered_bits(computed)
+    # Same sign: exact integer difference. Opposite signs can overflow int64
+    # (float64), the distance is then the sum of both distances to 0
+    same_sign = (ordered_reference < 0) == (ordered_computed < 0)
+    distance = np.where(
+        same_sign,
+        np.abs(ordered_computed - np.where(same_sign, ordered_reference, 0)).astype(
+            np.float64
+        ),
+        np.abs(ordered_reference.astype(np.float64))
+        + np.abs(ordered_computed.astype(np.float64)),
+    )
+    return np.where(np.isnan(reference) | np.isnan(computed), np.nan, distance)
+
+
+def identical(reference: np.ndarray, computed: np.ndarray) -> np.ndarray:
+    """Bitwise identity of the values (0.0 != -0.0, same NaNs are equal),
+    after promotion to the common type"""
+    dtype = np.result_type(reference, computed)
+    if not np.issubdtype(dtype, np.floating):
+        return np.asarray(reference) == np.asarray(computed)
+    dtype = _float_type(reference, computed)
+    int_type = np.int32 if dtype == np.float32 else np.int64
+    reference = np.ascontiguousarray(reference, dtype=dtype)
+    computed = np.ascontiguousarray(computed, dtype=dtype)
+    return reference.view(int_type) == computed.view(int_type)
+
+
+def relative_error(
+    reference: np.ndarray, computed: np.ndarray, floor: Optional[float] = None
+) -> np.ndarray:
+    """|computed - reference| / max(|reference|, floor), in float64. The floor
+    (default: smallest normal of the common type) keeps zero references
+    finite and makes 0 vs 0 an error of 0."""
+    if floor is None:
+        floor = float(np.finfo(_float_type(reference, computed)).tiny)
+    reference = np.asarray(reference, np.float64)
+    computed = np.asarray(computed, np.float64)
+    return np.abs(computed - reference) / np.maximum(np.abs(reference), floor)
+
+
+@dataclasses.dataclass
+class Tolerance:
+    """A pair passes when within any of the non zero bounds (or identical)"""
+
+    atol: float = 0.0
+    rtol: float = 0.0
+    ulp: float = 0.0
+
+    def mask(self, reference: np.ndarray, computed: np.ndarray) -> np.ndarray:
+        passed = identical(reference, computed)
+        if self.atol > 0:
+            passed |= (
+                np.abs(
+                    np.asarray(computed, np.float64) - np.asarray(reference, np.float64)
+                )
+                <= self.atol
+            )
+        if self.rtol > 0:
+            passed |= relative_error(reference, computed) <= self.rtol
+        if self.ulp > 0:
+            passed |= ulp_distance(reference, computed) <= self.ulp
+        return passed
+
+
+def error_profile_graph(
+    reference: xr.DataArray,
+    computed: xr.DataArray,
+    dim: str,
+    tolerance: Optional[Tolerance] = None,
+) -> xr.Dataset:
+    """Lazy error statistics along `dim` (e.g. the level or the tile), reduced
+    over every other dimension. Dask backed inputs stay chunked."""
+    others = [d for d in reference.dims if d != dim]
+
+    def _kernel(function, dtype=np.float64) -> xr.DataArray:
+        return xr.apply_ufunc(
+            function,
+            reference,
+            computed,
+            dask="parallelized",
+            output_dtypes=[dtype],
+        )
+
+    valid = _kernel(lambda r, c: np.isfinite(r) & np.isfinite(c), bool)
+    error = (computed.astype(np.float64) - reference).where(valid)
+    ulp = _kernel(ulp_distance).where(valid)
+    profile = {
+        "compared": valid.sum(others),
+        "bit_identical": _kernel(identical, bool).sum(others),
+        "rmse": np.sqrt((error**2).mean(others)),
+        "max_abs_error": abs(error).max(others),
+        "max_rel_error": _kernel(relative_error).where(valid).max(others),
+        "max_ulp": ulp.max(others),
+        "mean_ulp": ulp.mean(others),
+    }
+    if tolerance:
+        profile["outside_tolerance"] = (valid & ~_kernel(tolerance.mask, bool)).sum(
+            others
+        )
+    return xr.Dataset(profile)
+
+
+def error_profiles(
+    reference: xr.DataArray,
+    computed: xr.DataArray,
+    dims: Iterable[str],
+    tolerance: Optional[Tolerance] = None,
+) -> Dict[str, xr.Dataset]:
+    """`error_profile_graph` along each of `dims` (e.g. ["lev", "nf"]), all
+    out of a single pass over the data"""
+    graphs = {
+        dim: error_profile_graph(reference, computed, dim, tolerance) for dim in dims
+    }
+    (profiles,) = dask.compute(graphs)
+    return profiles
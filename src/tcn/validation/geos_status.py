@@ -1,4 +1,6 @@
 import dataclasses
+import hashlib
+import os
 from dataclasses import dataclass
 from git import Repo
 import yaml
@@ -37,6 +39,20 @@ class GEOSStatus:
 
         return True
 
+    @property
+    def digest(self) -> str:
+        """Short hash identifying the exact set of repositories hashes"""
+        key = ";".join(sorted(f"{r.name}:{r.hexsha}" for r in self.repositories))
+        return hashlib.sha1(key.encode("utf8")).hexdigest()[:12]
+
+
+def get_geos_status(geos_directory: str, verbose: bool = False) -> GEOSStatus:
+    """Status of all repositories of a mepo-cloned GEOS, empty if not a clone"""
+    mepo_components_path = f"{geos_directory}/components.yaml"
+    if not os.path.isfile(mepo_components_path):
+        return GEOSStatus()
+    return _get_all_repo_status(mepo_components_path, verbose=verbose)
+
 
 def _get_all_repo_status(
     mepo_components_path: str, verbose: bool = False
@@ -0,0 +1,178 @@
+###
+# Write/read throughput & size of the serialbox converter output layouts.
+#
+# Runs on a converted savepoint (`--source Driver-In.nc`) or on synthetic
+# cube-sphere fields of a given resolution & layout (C24: 24 1, C180: 180 4).
+# Reads time a full variable, one rank and one k-level, the access patterns
+# of the validation tools.
+###
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import xarray as xr
+
+from tcn.validation.serialbox.serialbox_dat_to_netcdf import (
+    CHUNKS_LEVEL,
+    CHUNKS_NONE,
+    CHUNKS_RANK,
+    COMPRESSOR_NONE,
+    COMPRESSOR_ZLIB,
+    COMPRESSORS,
+    OUTPUT_NETCDF,
+    OUTPUT_ZARR,
+    OutputLayout,
+)
+
+
+@dataclass
+class LayoutTimings:
+    layout: OutputLayout
+    size_MB: float
+    write_s: float
+    read_all_s: float
+    read_rank_s: float
+    read_level_s: float
+
+    def __str__(self) -> str:
+        name = f"{self.layout.format}/{self.layout.chunks}"
+        if self.layout.format == OUTPUT_NETCDF:
+            name += f"/{self.layout.compressor}"
+        return (
+            f"{name:<24} {self.size_MB:10.1f} {self.write_s:9.2f} "
+            f"{self.read_all_s:9.2f} {self.read_rank_s:9.3f} {self.read_level_s:9.3f}"
+        )
+
+
+def synthetic_savepoint(
+    resolution: int,
+    layout: int,
+    levels: int = 72,
+    savepoints: int = 2,
+    variables: int = 8,
+) -> xr.Dataset:
+    """Smooth 3D float64 fields with low bits noise, (savepoint, rank, i, j, k)
+    like the converter output"""
+    ranks = 6 * layout * layout
+    n = resolution // layout
+    rng = np.random.default_rng(0)
+    i, j, k = np.meshgrid(
+        np.linspace(0, np.pi, n),
+        np.linspace(0, np.pi, n),
+        np.linspace(0, 1, levels),
+        indexing="ij",
+    )
+    data_vars = {}
+    for v in range(variables):
+        base = np.sin(i * (v + 1)) * np.cos(j) * (1 + k) * 10 ** (v % 4)
+        field = base[np.newaxis, np.newaxis] + rng.normal(
+            0, 1e-6, (savepoints, ranks, n, n, levels)
+        )
+        name = f"var{v}"
+        data_vars[name] = xr.DataArray(
+            field, dims=["savepoint", "rank"] + [f"dim_{name}_{d}" for d in range(3)]
+        )
+    return xr.Dataset(data_vars)
+
+
+def _size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(path)
+        for f in files
+    )
+
+
+def _timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def benchmark_layout(
+    dataset: xr.Dataset, layout: OutputLayout, directory: str
+) -> LayoutTimings:
+    path = layout.path(directory, "bench")
+    data_vars = {str(name): dataset[name] for name in dataset.data_vars}
+    write_s = _timed(lambda: layout.write(data_vars, path, append=False))
+    opener = xr.open_zarr if layout.format == OUTPUT_ZARR else xr.open_dataset
+    variable = list(data_vars)[0]
+
+    def _read(selection):
+        with opener(path) as saved:
+            saved[variable].isel(selection).values
+
+    timings = LayoutTimings(
+        layout,
+        size_MB=_size(path) / 1e6,
+        write_s=write_s,
+        read_all_s=_timed(lambda: _read({})),
+        read_rank_s=_timed(lambda: _read({"rank": 0})),
+        read_level_s=_timed(lambda: _read({dataset[variable].dims[-1]: 0})),
+    )
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+    return timings
+
+
+def main(
+    source: Optional[str] = None,
+    resolution: int = 24,
+    layout: int = 1,
+    zarr: bool = True,
+) -> List[LayoutTimings]:
+    dataset = (
+        xr.open_dataset(source).load()
+        if source
+        else synthetic_savepoint(resolution, layout)
+    )
+    # Unchunked as the converter always did, then every compressor per chunking
+    layouts = [
+        OutputLayout(OUTPUT_NETCDF, CHUNKS_NONE, compressor)
+        for compressor in [COMPRESSOR_NONE, COMPRESSOR_ZLIB]
+    ] + [
+        OutputLayout(OUTPUT_NETCDF, chunks, compressor)
+        for chunks in [CHUNKS_RANK, CHUNKS_LEVEL]
+        for compressor in COMPRESSORS
+    ]
+    if zarr:
+        layouts += [
+            OutputLayout(OUTPUT_ZARR, chunks) for chunks in [CHUNKS_RANK, CHUNKS_LEVEL]
+        ]
+    print(f"Raw data: {dataset.nbytes / 1e6:.1f} MB")
+    print(
+        f"{'layout':<24} {'size MB':>10} {'write s':>9} "
+        f"{'read s':>9} {'rank s':>9} {'level s':>9}"
+    )
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for output_layout in layouts:
+            try:
+                timings = benchmark_layout(dataset, output_layout, directory)
+            except (ImportError, ValueError, RuntimeError) as e:
+                # Codec or zarr not available in this install
+                print(f"{output_layout.format}/{output_layout.chunks}: skipped ({e})")
+                continue
+            print(timings)
+            results.append(timings)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser("benchmarks serialbox converter layouts")
+    parser.add_argument("--source", type=str, help="converted savepoint NetCDF")
+    parser.add_argument("--resolution", type=int, default=24)
+    parser.add_argument("--layout", type=int, default=1)
+    parser.add_argument("--no_zarr", action="store_true")
+    args = parser.parse_args()
+    main(args.source, args.resolution, args.layout, zarr=not args.no_zarr)
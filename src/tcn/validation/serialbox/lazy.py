@@ -0,0 +1,181 @@
+###
+# Lazy access to serialbox data, without the NetCDF conversion.
+#
+# A savepoint opens as an xarray Dataset of Dask arrays laid out like the
+# converted NetCDF - (savepoint, rank, ...) with the same dims, halo trimming
+# and 1e40 masking - with one chunk per (savepoint, rank): only the chunks a
+# computation touches are read from the .dat files.
+#
+#   xr.open_dataset(data_path, engine="serialbox", savepoint_name="Driver-In")
+###
+
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import dask
+import dask.array as da
+import f90nml
+import numpy as np
+import xarray as xr
+from xarray.backends import BackendEntrypoint
+
+from tcn.validation.serialbox.serialbox_dat_to_netcdf import (
+    HALO_SAVEPOINTS,
+    HALO_TRACERS,
+    _cached_serializer,
+    get_all_savepoint_names,
+    import_serialbox,
+)
+
+# Serialized "missing" value, exported as 0
+SERIALBOX_MISSING = 1e40
+
+_NUMPY_TYPES = {
+    "Boolean": np.bool_,
+    "Int32": np.int32,
+    "Int64": np.int64,
+    "Float32": np.float32,
+    "Float64": np.float64,
+}
+
+# One lock per serializer: reads of different ranks run in parallel
+_locks: Dict[Tuple[str, int], threading.Lock] = {}
+_locks_lock = threading.Lock()
+
+
+def _serializer_lock(data_path: str, rank: int) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault((data_path, rank), threading.Lock())
+
+
+def _read_block(
+    data_path: str, rank: int, savepoint_name: str, index: int, name: str
+) -> np.ndarray:
+    # Chunk (1, 1, ...) of a (savepoint, rank, ...) array
+    with _serializer_lock(data_path, rank):
+        serializer = _cached_serializer(data_path, rank)
+        savepoint = serializer.get_savepoint(savepoint_name)[index]
+        data = np.asarray(serializer.read(name, savepoint))
+    if data.size == 1:
+        data = data.reshape(())
+    return data[np.newaxis, np.newaxis]
+
+
+def ranks_of(data_path: str) -> List[int]:
+    """Ranks of the layout in the `input.nml` next to the data"""
+    namelist = f90nml.read(os.path.join(data_path, "input.nml"))
+    layout = namelist["fv_core_nml"]["layout"]
+    return list(range(6 * layout[0] * layout[1]))
+
+
+def _field_info(
+    data_path: str, rank: int, name: str
+) -> Tuple[List[int], Optional[np.dtype]]:
+    with _serializer_lock(data_path, rank):
+        info = _cached_serializer(data_path, rank).get_field_metainfo(name)
+    dims = [int(d) for d in info.dims]
+    numpy_type = _NUMPY_TYPES.get(getattr(info.type, "name", str(info.type)))
+    return dims, np.dtype(numpy_type) if numpy_type else None
+
+
+def _lazy_variable(
+    data_path: str,
+    savepoint_name: str,
+    ranks: List[int],
+    savepoints: int,
+    name: str,
+) -> xr.DataArray:
+    shape, dtype = _field_info(data_path, ranks[0], name)
+    if int(np.prod(shape)) == 1:
+        shape = []
+    if dtype is None:
+        # Unknown serialized type: ask the first block
+        dtype = _read_block(data_path, ranks[0], savepoint_name, 0, name).dtype
+    read = dask.delayed(_read_block, pure=True)
+    blocks = [
+        [
+            da.from_delayed(
+                read(data_path, rank, savepoint_name, index, name),
+                shape=tuple([1, 1] + shape),
+                dtype=dtype,
+            )
+            for rank in ranks
+        ]
+        for index in range(savepoints)
+    ]
+    array = da.concatenate([da.concatenate(row, axis=1) for row in blocks], axis=0)
+    if shape != [] and np.issubdtype(dtype, np.floating):
+        array = da.where(array == SERIALBOX_MISSING, dtype.type(0), array)
+    data = xr.DataArray(
+        array,
+        dims=["savepoint", "rank"] + [f"dim_{name}_{i}" for i in range(len(shape))],
+    )
+    if savepoint_name in HALO_SAVEPOINTS and name in HALO_TRACERS:
+        data = data[:, :, 3:-3, 3:-3, :]
+    return data
+
+
+def open_savepoint(
+    data_path: str,
+    savepoint_name: str,
+    ranks: Optional[Iterable[int]] = None,
+    drop_variables: Optional[Iterable[str]] = None,
+) -> xr.Dataset:
+    """Lazy (savepoint, rank, ...) Dataset of every field of a savepoint,
+    ranks default to the whole layout"""
+    import_serialbox()
+    ranks = list(ranks) if ranks is not None else ranks_of(data_path)
+    with _serializer_lock(data_path, ranks[0]):
+        serializer = _cached_serializer(data_path, ranks[0])
+        savepoints = serializer.get_savepoint(savepoint_name)
+        if savepoints == []:
+            raise RuntimeError(f"No savepoint {savepoint_name} in {data_path}")
+        names = set(serializer.fields_at_savepoint(savepoints[0]))
+    names = names.difference(["rank", *(drop_variables or [])])
+    return xr.Dataset(
+        {
+            name: _lazy_variable(
+                data_path, savepoint_name, ranks, len(savepoints), name
+            )
+            for name in sorted(names)
+        }
+    )
+
+
+def savepoint_names(data_path: str) -> List[str]:
+    return sorted(get_all_savepoint_names(import_serialbox(), data_path))
+
+
+class SerialboxBackendEntrypoint(BackendEntrypoint):
+    """`xr.open_dataset(data_path, engine="serialbox", savepoint_name=...)`"""
+
+    description = "Lazy serialbox savepoints (tcn)"
+    open_dataset_parameters = (
+        "filename_or_obj",
+        "drop_variables",
+        "savepoint_name",
+        "ranks",
+    )
+
+    def open_dataset(
+        self,
+        filename_or_obj: Any,
+        *,
+        drop_variables: Optional[Iterable[str]] = None,
+        savepoint_name: str = "",
+        ranks: Optional[Iterable[int]] = None,
+    ) -> xr.Dataset:
+        if savepoint_name == "":
+            raise RuntimeError(
+                "Serialbox data needs a savepoint_name, one of "
+                f"{savepoint_names(str(filename_or_obj))}"
+            )
+        return open_savepoint(
+            str(filename_or_obj), savepoint_name, ranks, drop_variables
+        )
+
+    def guess_can_open(self, filename_or_obj: Any) -> bool:
+        return isinstance(filename_or_obj, (str, os.PathLike)) and os.path.exists(
+            os.path.join(str(filename_or_obj), "MetaData-Generator_rank0.json")
+        )
@@ -8,16 +8,62 @@
 # Optional capacity to reduce NetCDF size:
 # - do_only_rank: export to NetCDF only one rank. Use `which_rank` to apply.
 # - do_only_savepoint: export only one savepoint
+#
+# Conversion can run on a pool of processes (`workers`), parallel either by rank
+# (all ranks of a savepoint read at once) or by variable (each worker reads its
+# own shard of ranks, one variable per task, written as soon as all shards are
+# read). Savepoints are done one after the other and at most `2 * workers` tasks
+# are in flight, to bound memory.
+#
+# Output format (NetCDF or Zarr), chunking & compressor: see `OutputLayout`,
+# and `python -m tcn.validation.serialbox.layout_benchmark` to compare them.
 ###
 
 import sys
 import argparse
 import os
 import shutil
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import xarray as xr
 import f90nml
 import numpy as np
 
+PARALLEL_RANK = "rank"
+PARALLEL_VARIABLE = "variable"
+
+OUTPUT_NETCDF = "netcdf"
+OUTPUT_ZARR = "zarr"
+CHUNKS_NONE = "none"
+CHUNKS_RANK = "rank"
+CHUNKS_LEVEL = "level"
+COMPRESSOR_NONE = "none"
+COMPRESSOR_ZLIB = "zlib"
+# netCDF4 encodings of the compressors (zstd & blosc need netCDF-C >= 4.9)
+COMPRESSORS: Dict[str, Dict[str, Any]] = {
+    COMPRESSOR_NONE: {},
+    COMPRESSOR_ZLIB: {"zlib": True},
+    "zstd": {"compression": "zstd"},
+    "blosc": {"compression": "blosc_lz4", "blosc_shuffle": 1},
+}
+
+# Tracers of those savepoints are serialized with their halo, trimmed on export
+HALO_SAVEPOINTS = ["FVDynamics-In", "FVDynamics-Out", "Driver-In", "Driver-Out"]
+HALO_TRACERS = [
+    "qvapor",
+    "qliquid",
+    "qice",
+    "qrain",
+    "qsnow",
+    "qgraupel",
+    "qo3mr",
+    "qsgs_tke",
+]
+
 
 def get_parser():
     parser = argparse.ArgumentParser("converts serialbox data to netcdf")
@@ -41,6 +87,31 @@ def get_parser():
         help="Single savepoint to be exported. Will be exported as 0",
         required=False,
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes reading serialbox data in parallel",
+    )
+    parser.add_argument(
+        "--parallel",
+        choices=[PARALLEL_RANK, PARALLEL_VARIABLE],
+        default=PARALLEL_RANK,
+        help="Split the work of a savepoint by rank or by variable",
+    )
+    parser.add_argument(
+        "--format", choices=[OUTPUT_NETCDF, OUTPUT_ZARR], default=OUTPUT_NETCDF
+    )
+    parser.add_argument(
+        "--chunks",
+        choices=[CHUNKS_NONE, CHUNKS_RANK, CHUNKS_LEVEL],
+        default=CHUNKS_NONE,
+        help="Chunk per (savepoint, rank) or per (savepoint, rank, level)",
+    )
+    parser.add_argument(
+        "--compressor", choices=list(COMPRESSORS), default=COMPRESSOR_ZLIB
+    )
+    parser.add_argument("--complevel", type=int, default=1)
     return parser
 
 
@@ -66,21 +137,245 @@ def get_serializer(serialbox, data_path, rank):
     )
 
 
-def main(
-    data_path: str,
-    output_path: str,
-    do_only_rank: int = -1,
-    do_only_savepoint: int = -1,
-):
+def import_serialbox():
     SERIALBOX_PYTHON = os.getenv("SERIALBOX_PYTHON", "")
     if SERIALBOX_PYTHON == "":
         raise RuntimeError(
             "You must define env var SERIALBOX_PYTHON to point to root python package of serialbox."
         )
-
-    sys.path.append(SERIALBOX_PYTHON)
+    if SERIALBOX_PYTHON not in sys.path:
+        sys.path.append(SERIALBOX_PYTHON)
     import serialbox  # noqa: E402
 
+    return serialbox
+
+
+# Serializers opened by this process, metadata is parsed once per rank. Only
+# the most recently used are kept open: by rank, a worker goes through all the
+# ranks. By variable, the cache is sized to the ranks the process reads.
+SERIALIZER_CACHE_SIZE = 16
+_serializers: "OrderedDict[Tuple[str, int], Any]" = OrderedDict()
+_serializers_lock = threading.Lock()
+_serializers_size = SERIALIZER_CACHE_SIZE
+
+
+def set_serializer_cache_size(size: int):
+    """Serializers kept open by this process (`SERIALIZER_CACHE_SIZE` by default)"""
+    global _serializers_size
+    with _serializers_lock:
+        _serializers_size = max(size, 1)
+        while len(_serializers) > _serializers_size:
+            _serializers.popitem(last=False)
+
+
+def _cached_serializer(data_path: str, rank: int):
+    key = (data_path, rank)
+    with _serializers_lock:
+        if key in _serializers:
+            _serializers.move_to_end(key)
+            return _serializers[key]
+    # Opened outside of the lock, metadata parsing of ranks can overlap
+    serializer = get_serializer(import_serialbox(), data_path, rank)
+    with _serializers_lock:
+        serializer = _serializers.setdefault(key, serializer)
+        while len(_serializers) > _serializers_size:
+            _serializers.popitem(last=False)
+    return serializer
+
+
+def clear_serializers():
+    """Close the serializers opened by this process, back to the default size"""
+    global _serializers_size
+    with _serializers_lock:
+        _serializers.clear()
+        _serializers_size = SERIALIZER_CACHE_SIZE
+
+
+def read_rank(
+    data_path: str,
+    savepoint_name: str,
+    rank: int,
+    names: List[str],
+    do_only_savepoint: int = -1,
+) -> Dict[str, List[Any]]:
+    """Data of `names` for every savepoint named `savepoint_name` of a rank"""
+    serializer = _cached_serializer(data_path, rank)
+    savepoints = serializer.get_savepoint(savepoint_name)
+    if do_only_savepoint >= 0:
+        savepoints = [savepoints[do_only_savepoint]]
+    return {
+        name: [read_serialized_data(serializer, sp, name) for sp in savepoints]
+        for name in names
+    }
+
+
+def read_variable(
+    data_path: str,
+    savepoint_name: str,
+    ranks: List[int],
+    name: str,
+    do_only_savepoint: int = -1,
+) -> List[List[Any]]:
+    """Data of one variable for every savepoint named `savepoint_name`, per
+    rank"""
+    return [
+        read_rank(data_path, savepoint_name, rank, [name], do_only_savepoint)[name]
+        for rank in ranks
+    ]
+
+
+def _bounded_map(
+    executor: Optional[Executor],
+    function: Callable,
+    tasks: Iterable[Tuple],
+    in_flight: int,
+) -> Iterator[Any]:
+    # Ordered results of `function(*task)` with at most `in_flight` pending,
+    # unlike `Executor.map` which submits everything upfront
+    if executor is None:
+        for task in tasks:
+            yield function(*task)
+        return
+    pending: deque = deque()
+    for task in tasks:
+        pending.append(executor.submit(function, *task))
+        if len(pending) >= in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _rank_shards(ranks: List[int], workers: int) -> List[List[int]]:
+    # Contiguous ranks, as evenly split as possible across the workers
+    shard_size, larger = divmod(len(ranks), max(workers, 1))
+    shards, start = [], 0
+    for worker in range(max(workers, 1)):
+        stop = start + shard_size + (1 if worker < larger else 0)
+        if stop > start:
+            shards.append(ranks[start:stop])
+        start = stop
+    return shards
+
+
+def _worker_pools(
+    parallel: str, shards: List[List[int]], workers: int
+) -> List[Executor]:
+    # Spawned workers: serialbox state isn't shared with the parent
+    if workers <= 1:
+        return []
+    if parallel == PARALLEL_RANK:
+        return [ProcessPoolExecutor(workers, mp_context=get_context("spawn"))]
+    # One single process pool per shard: a rank is only opened by one worker
+    return [
+        ProcessPoolExecutor(
+            1,
+            mp_context=get_context("spawn"),
+            initializer=set_serializer_cache_size,
+            initargs=(len(shard),),
+        )
+        for shard in shards
+    ]
+
+
+def _data_array(
+    savepoint_name: str, varname: str, per_rank: List[List[Any]]
+) -> xr.DataArray:
+    data_shape = list(np.shape(per_rank[0][0]))
+    data = get_data(
+        data_shape,
+        len(per_rank),
+        len(per_rank[0]),
+        [{varname: rank_data} for rank_data in per_rank],
+        varname,
+    )
+    if savepoint_name in HALO_SAVEPOINTS and varname in HALO_TRACERS:
+        data = data[:, :, 3:-3, 3:-3, :]
+    return data
+
+
+@dataclass
+class OutputLayout:
+    """How savepoints are written: file format, chunk shape & compressor.
+
+    Chunks are aligned on the way data is read back: `rank` is one chunk per
+    (savepoint, rank), `level` one per (savepoint, rank, k-level) of 3D
+    fields, `none` lets the backend decide. Zarr chunks are compressed & written
+    in parallel (dask) with the Zarr default codec, `compressor` is NetCDF
+    only."""
+
+    format: str = OUTPUT_NETCDF
+    chunks: str = CHUNKS_NONE
+    compressor: str = COMPRESSOR_ZLIB
+    complevel: int = 1
+
+    def __post_init__(self):
+        if self.format not in [OUTPUT_NETCDF, OUTPUT_ZARR]:
+            raise RuntimeError(f"Unknown output format {self.format}")
+        if self.chunks not in [CHUNKS_NONE, CHUNKS_RANK, CHUNKS_LEVEL]:
+            raise RuntimeError(f"Unknown chunk layout {self.chunks}")
+        if self.compressor not in COMPRESSORS:
+            raise RuntimeError(f"Unknown compressor {self.compressor}")
+
+    def path(self, output_path: str, savepoint_name: str) -> str:
+        extension = "zarr" if self.format == OUTPUT_ZARR else "nc"
+        return os.path.join(output_path, f"{savepoint_name}.{extension}")
+
+    def chunk_shape(self, data: xr.DataArray) -> Optional[Tuple[int, ...]]:
+        # Scalars (savepoint, rank) are left alone
+        if self.chunks == CHUNKS_NONE or data.ndim <= 2:
+            return None
+        shape = [1, 1] + list(data.shape[2:])
+        if self.chunks == CHUNKS_LEVEL and data.ndim > 4:
+            shape[-1] = 1
+        return tuple(shape)
+
+    def encoding(self, data: xr.DataArray) -> Dict[str, Any]:
+        encoding: Dict[str, Any] = {}
+        if self.format == OUTPUT_ZARR:
+            return encoding
+        # Compress 3D fields (savepoint & rank come first)
+        if data.ndim > 4 and self.compressor != COMPRESSOR_NONE:
+            encoding.update(COMPRESSORS[self.compressor], complevel=self.complevel)
+        chunks = self.chunk_shape(data)
+        if chunks is not None:
+            encoding["chunksizes"] = chunks
+        return encoding
+
+    def write(self, data_vars: Dict[str, xr.DataArray], path: str, append: bool):
+        if self.format == OUTPUT_ZARR:
+            dataset = xr.Dataset(
+                {
+                    name: data.chunk(
+                        dict(zip(data.dims, self.chunk_shape(data) or data.shape))
+                    )
+                    for name, data in data_vars.items()
+                }
+            )
+            dataset.to_zarr(path, mode="a" if append else "w")
+        else:
+            xr.Dataset(data_vars).to_netcdf(
+                path,
+                mode="a" if append else "w",
+                encoding={
+                    name: self.encoding(data) for name, data in data_vars.items()
+                },
+            )
+
+
+def main(
+    data_path: str,
+    output_path: str,
+    do_only_rank: int = -1,
+    do_only_savepoint: int = -1,
+    workers: int = 1,
+    parallel: str = PARALLEL_RANK,
+    layout: Optional[OutputLayout] = None,
+):
+    serialbox = import_serialbox()
+    layout = layout or OutputLayout()
+    if parallel not in [PARALLEL_RANK, PARALLEL_VARIABLE]:
+        raise RuntimeError(f"Unknown parallel conversion {parallel}")
+
     print("Make directory & read namelist... 🚧")
     os.makedirs(output_path, exist_ok=True)
     namelist_filename_in = os.path.join(data_path, "input.nml")
@@ -91,104 +386,149 @@ def main(
     total_ranks = (
         6 * namelist["fv_core_nml"]["layout"][0] * namelist["fv_core_nml"]["layout"][1]
     )
+    ranks = [do_only_rank] if do_only_rank >= 0 else list(range(total_ranks))
     print("Done ✅")
 
     print("Read savepoints... 🚧")
     savepoint_names = get_all_savepoint_names(serialbox, data_path)
     print(f"Read {savepoint_names}... ✅")
-    for savepoint_name in sorted(list(savepoint_names)):
-        rank_list = []
-        # all ranks have the same names, just look at first one
-        serializer = get_serializer(serialbox, data_path, rank=0)
-        names_list = list(
-            serializer.fields_at_savepoint(serializer.get_savepoint(savepoint_name)[0])
-        )
-        serializer_list = []
-        if do_only_rank >= 0:
-            total_ranks = 1
-        print(f"/ Gather data for {savepoint_name} for {total_ranks} ranks... 🚧")
-        for rank in range(total_ranks):
-            if do_only_rank >= 0:
-                rank = do_only_rank
-            print(f"/ / Processing rank {rank}")
-            serializer = get_serializer(serialbox, data_path, rank)
-            serializer_list.append(serializer)
-            savepoints = serializer.get_savepoint(savepoint_name)
-            rank_data = {}
-            for name in set(names_list):
-                rank_data[name] = []
-                if do_only_savepoint < 0:
-                    for savepoint in savepoints:
-                        rank_data[name].append(
-                            read_serialized_data(serializer, savepoint, name)
-                        )
-                else:
-                    rank_data[name].append(
-                        read_serialized_data(
-                            serializer, savepoints[do_only_savepoint], name
-                        )
-                    )
-            rank_list.append(rank_data)
-        print(f"/ {savepoint_name} gathered. ✅")
-        if do_only_savepoint < 0:
-            n_savepoints = len(savepoints)  # checking from last rank is fine
-        else:
-            n_savepoints = 1
-        data_vars = {}
-        if n_savepoints > 0:
-            print(f"/ Write NETCDF for {savepoint_name}... 🚧")
-            encoding = {}
-            for varname in set(names_list).difference(["rank"]):
-                data_shape = list(rank_list[0][varname][0].shape)
-                if savepoint_name in [
-                    "FVDynamics-In",
-                    "FVDynamics-Out",
-                    "Driver-In",
-                    "Driver-Out",
-                ]:
-                    if varname in [
-                        "qvapor",
-                        "qliquid",
-                        "qice",
-                        "qrain",
-                        "qsnow",
-                        "qgraupel",
-                        "qo3mr",
-                        "qsgs_tke",
-                    ]:
-                        data_vars[varname] = get_data(
-                            data_shape, total_ranks, n_savepoints, rank_list, varname
-                        )[:, :, 3:-3, 3:-3, :]
-                    else:
-                        data_vars[varname] = get_data(
-                            data_shape, total_ranks, n_savepoints, rank_list, varname
-                        )
-                else:
-                    data_vars[varname] = get_data(
-                        data_shape, total_ranks, n_savepoints, rank_list, varname
+    shards = _rank_shards(ranks, workers)
+    executors = _worker_pools(parallel, shards, workers)
+    if parallel == PARALLEL_VARIABLE and not executors:
+        # Serial by variable: every rank is read for each variable
+        set_serializer_cache_size(len(ranks))
+    try:
+        for savepoint_name in sorted(list(savepoint_names)):
+            # all ranks have the same names, just look at first one
+            serializer = _cached_serializer(data_path, 0)
+            names_list = sorted(
+                set(
+                    serializer.fields_at_savepoint(
+                        serializer.get_savepoint(savepoint_name)[0]
                     )
-                if len(data_shape) > 2:
-                    encoding[varname] = {"zlib": True, "complevel": 1}
-            dataset = xr.Dataset(data_vars=data_vars)
-            dataset.to_netcdf(
-                os.path.join(output_path, f"{savepoint_name}.nc"), encoding=encoding
+                ).difference(["rank"])
             )
-            print(f"/ Wrote {output_path} ✅")
+            print(
+                f"/ Convert {savepoint_name} for {len(ranks)} ranks"
+                f" ({workers} workers, by {parallel})... 🚧"
+            )
+            if parallel == PARALLEL_RANK:
+                _convert_by_rank(
+                    executors[0] if executors else None,
+                    workers,
+                    data_path,
+                    output_path,
+                    savepoint_name,
+                    ranks,
+                    names_list,
+                    do_only_savepoint,
+                    layout,
+                )
+            else:
+                _convert_by_variable(
+                    executors,
+                    data_path,
+                    output_path,
+                    savepoint_name,
+                    shards,
+                    names_list,
+                    do_only_savepoint,
+                    layout,
+                )
+    finally:
+        for executor in executors:
+            executor.shutdown()
+        clear_serializers()
+
+
+def _convert_by_rank(
+    executor: Optional[Executor],
+    workers: int,
+    data_path: str,
+    output_path: str,
+    savepoint_name: str,
+    ranks: List[int],
+    names_list: List[str],
+    do_only_savepoint: int,
+    layout: OutputLayout,
+):
+    rank_list = list(
+        _bounded_map(
+            executor,
+            read_rank,
+            (
+                (data_path, savepoint_name, rank, names_list, do_only_savepoint)
+                for rank in ranks
+            ),
+            2 * workers,
+        )
+    )
+    print(f"/ {savepoint_name} gathered. ✅")
+    if names_list == [] or len(rank_list[0][names_list[0]]) == 0:
+        return
+    print(f"/ Write {layout.format} for {savepoint_name}... 🚧")
+    data_vars = {
+        varname: _data_array(
+            savepoint_name, varname, [rank_data[varname] for rank_data in rank_list]
+        )
+        for varname in names_list
+    }
+    path = layout.path(output_path, savepoint_name)
+    layout.write(data_vars, path, append=False)
+    print(f"/ Wrote {path} ✅")
+
+
+def _convert_by_variable(
+    executors: List[Executor],
+    data_path: str,
+    output_path: str,
+    savepoint_name: str,
+    shards: List[List[int]],
+    names_list: List[str],
+    do_only_savepoint: int,
+    layout: OutputLayout,
+):
+    # Each shard of ranks is read by its own executor (serially without any),
+    # variable after variable. Variables are appended to the output as they
+    # come: only the variables in flight are in memory
+    path = layout.path(output_path, savepoint_name)
+    append = False
+    pools: List[Optional[Executor]] = list(executors) or [None] * len(shards)
+
+    def _tasks(shard: List[int]) -> Iterator[Tuple]:
+        for name in names_list:
+            yield (data_path, savepoint_name, shard, name, do_only_savepoint)
+
+    per_shard = [
+        _bounded_map(executor, read_variable, _tasks(shard), 2)
+        for executor, shard in zip(pools, shards)
+    ]
+    for varname, *shard_data in zip(names_list, *per_shard):
+        per_rank = [rank_data for shard in shard_data for rank_data in shard]
+        if len(per_rank[0]) == 0:
+            return
+        data = _data_array(savepoint_name, varname, per_rank)
+        layout.write({varname: data}, path, append)
+        append = True
+    print(f"/ Wrote {path} ✅")
 
 
 def get_data(data_shape, total_ranks, n_savepoints, output_list, varname):
-    array = np.full([n_savepoints, total_ranks] + data_shape, fill_value=np.nan)
+    # Assembled in numpy, in the serialized dtype, then wrapped once
+    dtype = np.result_type(
+        *[
+            np.asarray(output_list[rank][varname][0]).dtype
+            for rank in range(total_ranks)
+        ]
+    )
+    array = np.empty([n_savepoints, total_ranks] + data_shape, dtype=dtype)
+    for rank in range(total_ranks):
+        for i_savepoint in range(n_savepoints):
+            array[i_savepoint, rank] = output_list[rank][varname][i_savepoint]
     dims = ["savepoint", "rank"] + [
         f"dim_{varname}_{i}" for i in range(len(data_shape))
     ]
-    data = xr.DataArray(array, dims=dims)
-    for rank in range(total_ranks):
-        for i_savepoint in range(n_savepoints):
-            if len(data_shape) > 0:
-                data[i_savepoint, rank, :] = output_list[rank][varname][i_savepoint]
-            else:
-                data[i_savepoint, rank] = output_list[rank][varname][i_savepoint]
-    return data
+    return xr.DataArray(array, dims=dims)
 
 
 if __name__ == "__main__":
@@ -199,4 +539,7 @@ if __name__ == "__main__":
         output_path=args.output_path,
         do_only_rank=args.do_only_rank,
         do_only_savepoint=args.do_only_savepoint,
+        workers=args.workers,
+        parallel=args.parallel,
+        layout=OutputLayout(args.format, args.chunks, args.compressor, args.complevel),
     )
@@ -0,0 +1,306 @@
+import dataclasses
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import dask
+import dask.array as da
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from tcn.validation.compare import Tolerance, identical, relative_error, ulp_distance
+
+# Absolute errors are binned per decade of magnitude, from 1e-20 to 1e10:
+# fixed edges so the histogram builds in the same pass as the statistics
+HISTOGRAM_LOG10_EDGES = np.arange(-20, 11)
+
+
+@dataclasses.dataclass
+class VariableStatistics:
+    name: str
+    # Index along the time dimension, None for the whole selection
+    time: Optional[int] = None
+    count: int = 0  # finite pairs compared
+    nan_mismatch: int = 0  # NaN in only one of the datasets
+    exact: int = 0  # bit identical pairs
+    outside_tolerance: int = 0  # finite pairs failing the tolerance, if any
+    min_error: float = np.nan  # computed - reference
+    max_error: float = np.nan
+    max_abs_error: float = np.nan
+    mean_abs_error: float = np.nan
+    max_rel_error: float = np.nan  # |error| / |reference|, reference != 0
+    mean_rel_error: float = np.nan
+    max_ulp: float = np.nan
+    mean_ulp: float = np.nan
+    # Counts of |error| per decade, see `HISTOGRAM_LOG10_EDGES`
+    histogram: List[int] = dataclasses.field(default_factory=list)
+    # Same, for the negative errors only (computed < reference)
+    negative_histogram: List[int] = dataclasses.field(default_factory=list)
+
+    def signed_histogram(self) -> Tuple[List[str], List[int]]:
+        """(bin labels, counts) of the signed error: negative decades from
+        the largest, exact matches, then positive decades"""
+        edges = HISTOGRAM_LOG10_EDGES[:-1]
+        if not self.histogram:
+            return [], []
+        positive = np.subtract(self.histogram, self.negative_histogram).tolist()
+        zero = self.count - sum(self.histogram)
+        return (
+            [f"-1e{e}" for e in edges[::-1]] + ["0"] + [f"1e{e}" for e in edges],
+            self.negative_histogram[::-1] + [zero] + positive,
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}{'' if self.time is None else f' @ {self.time}'}:\n"
+            f"  Max: {self.max_error:.2f}\n"
+            f"  Min: {self.min_error:.2f}\n"
+            f"  Max abs: {self.max_abs_error:.3e} (mean {self.mean_abs_error:.3e})\n"
+            f"  Max rel: {self.max_rel_error:.3e} (mean {self.mean_rel_error:.3e})\n"
+            f"  Max ULP: {self.max_ulp:.0f} (mean {self.mean_ulp:.1f})\n"
+            f"  Exact: {self.exact}/{self.count}, NaN mismatches: {self.nan_mismatch}, "
+            f"outside tolerance: {self.outside_tolerance}"
+        )
+
+
+def _as_dask(data: xr.DataArray) -> da.Array:
+    return data.data if isinstance(data.data, da.Array) else da.from_array(data.data)
+
+
+def _chunk_partials(
+    reference: np.ndarray,
+    computed: np.ndarray,
+    tolerance: Optional[Tolerance] = None,
+) -> Dict[str, Any]:
+    # Everything needed from one chunk, in a single pass over it
+    valid = np.isfinite(reference) & np.isfinite(computed)
+    reference_valid, computed_valid = reference[valid], computed[valid]
+    error = computed_valid.astype(np.float64) - reference_valid
+    abs_error = np.abs(error)
+    relative = relative_error(reference_valid, computed_valid)[reference_valid != 0]
+    ulp = ulp_distance(reference_valid, computed_valid)
+    magnitude = np.clip(
+        np.log10(abs_error[abs_error > 0]),
+        HISTOGRAM_LOG10_EDGES[0],
+        HISTOGRAM_LOG10_EDGES[-1],
+    )
+    negative = (error < 0)[abs_error > 0]
+
+    def _extremum(function, values: np.ndarray, empty: float) -> float:
+        return float(function(values)) if len(values) > 0 else empty
+
+    return {
+        "count": int(valid.sum()),
+        "nan_mismatch": int((np.isnan(reference) != np.isnan(computed)).sum()),
+        "exact": int(identical(reference_valid, computed_valid).sum()),
+        "outside_tolerance": (
+            int((~tolerance.mask(reference_valid, computed_valid)).sum())
+            if tolerance
+            else 0
+        ),
+        "min_error": _extremum(np.min, error, np.inf),
+        "max_error": _extremum(np.max, error, -np.inf),
+        "max_abs_error": _extremum(np.max, abs_error, -np.inf),
+        "sum_abs_error": float(abs_error.sum()),
+        "max_rel_error": _extremum(np.max, relative, -np.inf),
+        "sum_rel_error": float(relative.sum()),
+        "rel_count": len(relative),
+        "max_ulp": _extremum(np.max, ulp, -np.inf),
+        "sum_ulp": float(ulp.sum()),
+        "histogram": np.histogram(magnitude, bins=HISTOGRAM_LOG10_EDGES)[0],
+        "negative_histogram": np.histogram(
+            magnitude[negative], bins=HISTOGRAM_LOG10_EDGES
+        )[0],
+    }
+
+
+def _combine(
+    name: str, partials: List[Dict[str, Any]], time: Optional[int] = None
+) -> VariableStatistics:
+    def _total(key: str):
+        return sum(p[key] for p in partials)
+
+    def _finite(value: float) -> float:
+        return value if np.isfinite(value) else np.nan
+
+    count, rel_count = _total("count"), _total("rel_count")
+    return VariableStatistics(
+        name,
+        time=time,
+        count=count,
+        nan_mismatch=_total("nan_mismatch"),
+        exact=_total("exact"),
+        outside_tolerance=_total("outside_tolerance"),
+        min_error=_finite(min(p["min_error"] for p in partials)),
+        max_error=_finite(max(p["max_error"] for p in partials)),
+        max_abs_error=_finite(max(p["max_abs_error"] for p in partials)),
+        mean_abs_error=_total("sum_abs_error") / count if count else np.nan,
+        max_rel_error=_finite(max(p["max_rel_error"] for p in partials)),
+        mean_rel_error=_total("sum_rel_error") / rel_count if rel_count else np.nan,
+        max_ulp=_finite(max(p["max_ulp"] for p in partials)),
+        mean_ulp=_total("sum_ulp") / count if count else np.nan,
+        histogram=_total("histogram").tolist(),
+        negative_histogram=_total("negative_histogram").tolist(),
+    )
+
+
+def _partials_graph(
+    reference: da.Array, computed: da.Array, tolerance: Optional[Tolerance]
+) -> np.ndarray:
+    # One task per chunk pair, laid out like the blocks: chunks are streamed
+    # through memory, never the whole arrays
+    computed = computed.rechunk(reference.chunks)
+    reference_blocks, computed_blocks = reference.to_delayed(), computed.to_delayed()
+    chunk_partials = dask.delayed(_chunk_partials, pure=True)
+    partials = np.empty(reference.numblocks, dtype=object)
+    for index in np.ndindex(*reference.numblocks):
+        partials[index] = chunk_partials(
+            reference_blocks[index], computed_blocks[index], tolerance
+        )
+    return partials
+
+
+def _statistics_graph(
+    name: str,
+    reference: da.Array,
+    computed: da.Array,
+    tolerance: Optional[Tolerance] = None,
+):
+    partials = _partials_graph(reference, computed, tolerance)
+    return dask.delayed(_combine, pure=True)(name, partials.ravel().tolist())
+
+
+def shared_variables(ref_dataset: xr.Dataset, cpu_dataset: xr.Dataset) -> List[str]:
+    """Numeric variables of both datasets"""
+    return [
+        str(name)
+        for name in ref_dataset.data_vars
+        if name in cpu_dataset.data_vars
+        and np.issubdtype(ref_dataset[name].dtype, np.number)
+        and np.issubdtype(cpu_dataset[name].dtype, np.number)
+    ]
+
+
+def aligned(
+    ref_dataset: xr.Dataset, cpu_dataset: xr.Dataset, dim: str = "time"
+) -> Tuple[xr.Dataset, xr.Dataset]:
+    """Both datasets restricted to their common `dim` coordinates (e.g. a
+    run stopped early): aligned once and shared by every variable"""
+    if dim not in ref_dataset.indexes or dim not in cpu_dataset.indexes:
+        return ref_dataset, cpu_dataset
+    common = ref_dataset.indexes[dim].intersection(cpu_dataset.indexes[dim])
+    if len(common) == 0:
+        raise RuntimeError(f"Reference and computed share no {dim}")
+    return ref_dataset.sel({dim: common}), cpu_dataset.sel({dim: common})
+
+
+def _variable_pair(
+    ref_dataset: xr.Dataset,
+    cpu_dataset: xr.Dataset,
+    name: str,
+    selection: Optional[Dict[str, Any]],
+) -> Tuple[xr.DataArray, xr.DataArray]:
+    reference, computed = ref_dataset[name], cpu_dataset[name]
+    if selection:
+        reference = reference.isel(
+            {k: v for k, v in selection.items() if k in reference.dims}
+        )
+        computed = computed.isel(
+            {k: v for k, v in selection.items() if k in computed.dims}
+        )
+    if reference.shape != computed.shape:
+        raise RuntimeError(
+            f"{name}: reference {reference.shape} and computed "
+            f"{computed.shape} shapes differ"
+        )
+    return reference, computed
+
+
+def compute_statistics(
+    ref_dataset: xr.Dataset,
+    cpu_dataset: xr.Dataset,
+    variables: Optional[List[str]] = None,
+    selection: Optional[Dict[str, Any]] = None,
+    tolerance: Optional[Tolerance] = None,
+) -> Dict[str, VariableStatistics]:
+    """Error statistics of every variable (default: all shared ones), in one
+    chunk-wise pass over the data - all variables are computed in parallel
+    and arrays are never loaded whole. `selection` is an `isel` applied to
+    the variables having those dimensions (e.g. {"time": 0}). Pairs failing
+    the `tolerance` are counted in `outside_tolerance`."""
+    variables = variables or shared_variables(ref_dataset, cpu_dataset)
+    graphs = {}
+    for name in variables:
+        reference, computed = _variable_pair(ref_dataset, cpu_dataset, name, selection)
+        graphs[name] = _statistics_graph(
+            name, _as_dask(reference), _as_dask(computed), tolerance
+        )
+    (statistics,) = dask.compute(graphs)
+    return statistics
+
+
+def compute_report(
+    ref_dataset: xr.Dataset,
+    cpu_dataset: xr.Dataset,
+    variables: Optional[List[str]] = None,
+    window: Optional[slice] = None,
+    dim: str = "time",
+    tolerance: Optional[Tolerance] = None,
+) -> List[VariableStatistics]:
+    """Statistics of every variable over the `window` of `dim` (default: all
+    of it), followed by one per step of the window - every variable and every
+    step out of the same single pass as `compute_statistics`"""
+    variables = variables or shared_variables(ref_dataset, cpu_dataset)
+    window = window or slice(None)
+    combine = dask.delayed(_combine, pure=True)
+    graphs = []
+    for name in variables:
+        reference, computed = _variable_pair(
+            ref_dataset, cpu_dataset, name, {dim: window}
+        )
+        reference_data, computed_data = _as_dask(reference), _as_dask(computed)
+        if dim not in ref_dataset[name].dims:
+            graphs.append(
+                [_statistics_graph(name, reference_data, computed_data, tolerance)]
+            )
+            continue
+        # One chunk per step, so that steps are whole blocks
+        axis = ref_dataset[name].dims.index(dim)
+        reference_data = reference_data.rechunk({axis: 1})
+        partials = _partials_graph(reference_data, computed_data, tolerance)
+        steps = range(ref_dataset.sizes[dim])[window]
+        graphs.append(
+            [combine(name, partials.ravel().tolist())]
+            + [
+                combine(name, np.take(partials, i, axis=axis).ravel().tolist(), step)
+                for i, step in enumerate(steps)
+            ]
+        )
+    (report,) = dask.compute(graphs)
+    return [statistics for variable in report for statistics in variable]
+
+
+def write_summary(statistics: Iterable[VariableStatistics], path: str):
+    """Statistics, one row each, as JSON or Parquet (from the extension)"""
+    rows = [dataclasses.asdict(s) for s in statistics]
+    if path.endswith(".parquet"):
+        pd.DataFrame(rows).to_parquet(path)
+    elif path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "histogram_log10_edges": HISTOGRAM_LOG10_EDGES.tolist(),
+                    # NaN (nothing to compare) isn't JSON
+                    "variables": [
+                        {
+                            k: None if isinstance(v, float) and np.isnan(v) else v
+                            for k, v in row.items()
+                        }
+                        for row in rows
+                    ],
+                },
+                f,
+                indent=1,
+            )
+    else:
+        raise RuntimeError(f"Can't write a summary to {path}: .json or .parquet")
@@ -0,0 +1,59 @@
+import os
+
+from click.testing import CliRunner
+
+from tcn.benchmark.archive import read_parquet, read_timings, write_parquet
+from tcn.benchmark.benchmark import Benchmark
+from tcn.benchmark.cli import cli
+from tcn.benchmark.columnar import TimingColumns
+from tcn.benchmark.geos_log_parser import parse_geos_log
+
+REFERENCE_LOG = os.path.join(
+    os.path.dirname(__file__),
+    "../../benchmarker/reference_fortran/logs_florian_machine",
+    "microphys_driver/rank.0/stdout",
+)
+
+
+def test_parquet_roundtrip(tmp_path):
+    benchmarks = [
+        Benchmark(
+            backend="fortran",
+            grid_resolution=(24, 24, 72),
+            node_setup=(1, 1, 6),
+            global_run_time=12.5,
+            fv_dyncore_timings=[0.2, 0.3],
+            agcm_timings=[("AGCM", 10.0, ""), ("MOIST", 4.0, "PHYSICS")],
+            run_timings=[("RUN", 12.0, "")],
+        ),
+        Benchmark(
+            backend="gtfv3_dacegpu",
+            agcm_timings=[("MOIST", 1.0, "PHYSICS"), ("GOCART2G", 2.0, "CHEMISTRY")],
+        ),
+    ]
+    path = str(tmp_path / "benchmarks.parquet")
+    write_parquet(benchmarks, path)
+
+    assert read_parquet(path) == benchmarks
+    timings = read_timings(path, "agcm_timings")
+    assert timings["benchmark"].tolist() == [0, 0, 1, 1]
+    assert timings["name"].tolist() == ["AGCM", "MOIST", "MOIST", "GOCART2G"]
+    assert timings["parent"].tolist() == ["", "PHYSICS", "PHYSICS", "CHEMISTRY"]
+
+
+def test_benchmark_stores_columns():
+    benchmark = Benchmark(agcm_timings=[("AGCM", 10.0, ""), ("MOIST", 4.0, "AGCM")])
+    assert isinstance(benchmark.agcm_timings, TimingColumns)
+    assert benchmark.columns("agcm_timings") is benchmark.agcm_timings
+    assert benchmark.agcm_timings.times.tolist() == [10.0, 4.0]
+    assert isinstance(Benchmark().run_timings, TimingColumns)
+
+
+def test_cli_archive(tmp_path):
+    path = str(tmp_path / "nightly.parquet")
+    for _ in range(2):
+        result = CliRunner().invoke(cli, [REFERENCE_LOG, "--archive", path])
+        assert result.exit_code == 0, result.output
+    archived = read_parquet(path)
+    assert len(archived) == 2 and archived[0] == archived[1]
+    assert archived[0] == parse_geos_log(REFERENCE_LOG)
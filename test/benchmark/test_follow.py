@@ -0,0 +1,59 @@
+from tcn.benchmark.follow import GEOSLogFollower
+
+STEP = " 0: fv_dynamics: time taken =   {}     s\n"
+DATE = " AGCM Date: 2000/04/14  Time: {}:00:00  Throughput(days/day)[Avg Tot Run]: 1\n"
+
+
+def test_poll_growing_log(tmp_path):
+    log = tmp_path / "geos.out"
+    log.write_text(STEP.format(0.1) + DATE.format("21") + " 0: fv_dyn")
+    follower = GEOSLogFollower(str(log))
+
+    assert follower.poll()
+    assert follower.status.fv_dyncore_timings == [0.1]
+    assert follower.status.simulated_time.hour == 21
+    assert not follower.poll()  # nothing new
+
+    # Completes the partial line, which was kept aside
+    with open(log, "a") as f:
+        f.write("amics: time taken =   0.2     s\n" + DATE.format("22"))
+    assert follower.poll()
+    assert follower.status.fv_dyncore_timings == [0.1, 0.2]
+    assert follower.status.simulated_time.hour == 22
+
+    # Truncated log: parse starts over
+    log.write_text(STEP.format(0.3))
+    assert follower.poll()
+    assert follower.status.fv_dyncore_timings == [0.3]
+
+
+def test_follow_until_end_of_run(tmp_path):
+    log = tmp_path / "geos.out"
+    log.write_text(STEP.format(0.1))
+    appends = [STEP.format(0.2), STEP.format(0.3) + " GEOSgcm Run Status: 0\n"]
+    seen = []
+
+    def _callback(status):
+        # The run writes more between two polls
+        seen.append(list(status.fv_dyncore_timings))
+        if appends:
+            with open(log, "a") as f:
+                f.write(appends.pop(0))
+
+    follower = GEOSLogFollower(str(log))
+    updates = list(follower.follow(interval=0.0, callback=_callback, timeout=5.0))
+    assert len(updates) == 3 and updates[-1].finished
+    assert seen == [[0.1], [0.1, 0.2], [0.1, 0.2, 0.3]]
+
+    # Nothing happens until the generator is iterated
+    lazy = GEOSLogFollower(str(log)).follow(interval=0.0, callback=seen.append)
+    assert len(seen) == 3
+    next(lazy)
+    assert len(seen) == 4
+
+
+def test_follow_timeout(tmp_path):
+    log = tmp_path / "geos.out"
+    log.write_text(STEP.format(0.1))
+    follower = GEOSLogFollower(str(log))
+    assert len(list(follower.follow(interval=0.01, timeout=0.05))) == 1
@@ -0,0 +1,88 @@
+import os
+
+from tcn.benchmark.geos_log_parser import parse_geos_log, parse_geos_logs
+
+# Real GEOS stdout, MAPL lines as `profiler: NAME | ... |`
+REFERENCE_LOG = os.path.join(
+    os.path.dirname(__file__),
+    "../../benchmarker/reference_fortran/logs_florian_machine",
+    "microphys_driver/rank.0/stdout",
+)
+
+
+def test_parse_reference_log():
+    # Same content as the bespoke pattern parser it replaced
+    benchmark = parse_geos_log(REFERENCE_LOG)
+    assert benchmark.backend == "fortran"
+    assert benchmark.grid_resolution == (25, 25, 72)
+    assert benchmark.node_setup == (1, 1, 6)
+    assert len(benchmark.fv_dyncore_timings) == 49
+    assert (
+        benchmark.global_init_time,
+        benchmark.global_run_time,
+        benchmark.global_finalize_time,
+    ) == (5.454, 172.636, 0.959)
+
+    # Timers declared by the components in their run phases, then the tree
+    assert benchmark.agcm_timings.to_tuples()[:8] == [
+        ("AGCM_BARRIER", 0.49, "AGCM"),
+        ("DYN_ANA", 1.65, "DYN"),
+        ("DYN_PROLOGUE", 0.21, "DYN"),
+        ("DYN_CORE", 17.22, "DYN"),
+        ("MASS_FIX", 0.07, "DYN_CORE"),
+        ("NH_ADIABATIC_IN", 0.73, "DYN_CORE"),
+        ("FV_DYNAMICS", 15.29, "DYN_CORE"),
+        ("DYN_EPILOGUE", 1.35, "DYN"),
+    ]
+    assert len(benchmark.agcm_timings) == 113
+    assert ("AGCM", 134.305, "") in benchmark.agcm_timings
+    assert ("GOCART2G", 0.138, "CHEMISTRY") in benchmark.agcm_timings
+    assert ("LAND", 31.387, "SURFACE") in benchmark.agcm_timings
+    assert ("RRTMG_RUN", 9.81, "RRTMG") in benchmark.agcm_timings
+    # Framework timers (Run, GenRunMine, ...) are not reported
+    assert not {"Run", "GenRunMine", "RUN", "generic"} & set(
+        benchmark.agcm_timings.names
+    )
+    assert benchmark.ogcm_timings == [
+        ("ModRun", 0.02, "SEAICE"),
+        ("UPDATE", 0.0, "DATASEAICE"),
+        ("ModRun", 0.02, "OCEAN"),
+        ("UPDATE", 0.01, "DATASEA"),
+        ("OGCM", 0.225, ""),
+        ("ORAD", 0.023, "OGCM"),
+        ("SEAICE", 0.037, "OGCM"),
+        ("DATASEAICE", 0.023, "SEAICE"),
+        ("OCEAN", 0.076, "OGCM"),
+        ("DATASEA", 0.024, "OCEAN"),
+    ]
+    assert benchmark.run_timings == [
+        ("RUN", 172.636, ""),
+        ("EXTDATA", 0.002, "RUN"),
+        ("GCM", 134.789, "RUN"),
+        ("AIAU", 0.002, "GCM"),
+        ("ADFI", 0.009, "GCM"),
+        ("HIST", 37.792, "RUN"),
+        ("ATMOSPHERE", 134.22, "GCM"),
+        ("A2O", 0.12, "GCM"),
+        ("O2A", 0.06, "GCM"),
+        ("Couplers", 0.0, "HIST"),
+        ("I/O", 37.74, "HIST"),
+        ("IO", 0.0, "I/O"),
+    ]
+
+
+def test_parse_geos_logs_parallel(tmp_path):
+    # Logs told apart by their run time, parallel results keep the input order
+    with open(REFERENCE_LOG) as f:
+        log = f.read()
+    filenames = []
+    for run_time in ["172.636", "100.000", "50.000"]:
+        filename = tmp_path / f"{run_time}.out"
+        filename.write_text(log.replace("1   172.636  96.16", f"1   {run_time}  96.16"))
+        filenames.append(str(filename))
+    filenames = filenames * 2
+
+    serial = parse_geos_logs(filenames, jobs=1)
+    parallel = parse_geos_logs(filenames, jobs=3)
+    assert parallel == serial
+    assert [b.global_run_time for b in parallel] == [172.636, 100.0, 50.0] * 2
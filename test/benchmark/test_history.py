@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from tcn.benchmark.benchmark import Benchmark
+from tcn.benchmark.history import (
+    BENCHMARK_HISTORY_ENV,
+    BENCHMARK_HISTORY_FILENAME,
+    BenchmarkHistory,
+    configured_history_path,
+    history_path,
+    mann_whitney_greater,
+    record_benchmarks,
+)
+from tcn.validation.geos_status import GEOSStatus, RepositoryStatus
+
+STATUS = GEOSStatus([RepositoryStatus("GEOSgcm", "abc123", "v11")])
+
+
+def _benchmark(dycore_time: float, seed: int) -> Benchmark:
+    rng = np.random.default_rng(seed)
+    return Benchmark(
+        backend="gtfv3_dace_gpu",
+        grid_resolution=(180, 180, 72),
+        node_setup=(4, 4, 96),
+        global_run_time=100.0,
+        fv_dyncore_timings=(dycore_time + rng.normal(0, 0.01, 50)).tolist(),
+    )
+
+
+def test_history_path(tmp_path, monkeypatch):
+    monkeypatch.delenv(BENCHMARK_HISTORY_ENV, raising=False)
+    with pytest.raises(RuntimeError):
+        history_path()
+    with pytest.raises(RuntimeError):
+        history_path(str(tmp_path / "missing" / "history.sqlite"))
+    assert history_path(str(tmp_path)) == str(tmp_path / BENCHMARK_HISTORY_FILENAME)
+    monkeypatch.setenv(BENCHMARK_HISTORY_ENV, str(tmp_path / "h.sqlite"))
+    assert history_path() == str(tmp_path / "h.sqlite")
+
+
+def test_benchmark_history(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    with BenchmarkHistory(path) as history:
+        run_ids = [
+            history.append(_benchmark(1.0, seed), STATUS, "HS") for seed in (0, 1)
+        ]
+        assert history.benchmark(run_ids[0]) == _benchmark(1.0, 0)
+        timings = history.dyncore_timings("HS", "gtfv3_dace_gpu", "C180-L72", "4x4")
+        assert [len(t) for t in timings] == [50, 50]
+        assert history.dyncore_timings("HS", "fortran", "C180-L72", "4x4") == []
+
+    # Persisted across connections
+    with BenchmarkHistory(path) as history:
+        slow = history.append(_benchmark(1.2, 2), STATUS, "HS")
+        regression = history.detect_regression(slow)
+        assert regression is not None and regression.slowdown > 1.15
+        same = history.append(_benchmark(1.0, 3), STATUS, "HS")
+        assert history.detect_regression(same) is None
+
+
+def test_record_benchmarks(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    assert record_benchmarks(path, [_benchmark(1.0, 0)], STATUS, "HS") == []
+    regressions = record_benchmarks(path, [_benchmark(2.0, 1)], STATUS, "HS")
+    assert [r.run_id for r in regressions] == [2]
+    # Another experiment has no history yet
+    assert record_benchmarks(path, [_benchmark(3.0, 2)], STATUS, "AQ") == []
+
+
+def test_mann_whitney_greater():
+    baseline = np.arange(20.0)
+    assert mann_whitney_greater(baseline + 100, baseline) < 1e-6
+    assert mann_whitney_greater(baseline, baseline) > 0.4
+
+
+def test_configured_history_path(tmp_path, monkeypatch):
+    monkeypatch.delenv(BENCHMARK_HISTORY_ENV, raising=False)
+    assert configured_history_path() is None
+    # Configured but unusable: still fails loudly
+    with pytest.raises(RuntimeError):
+        configured_history_path(str(tmp_path / "missing" / "history.sqlite"))
+    monkeypatch.setenv(BENCHMARK_HISTORY_ENV, str(tmp_path))
+    assert configured_history_path() == str(tmp_path / BENCHMARK_HISTORY_FILENAME)
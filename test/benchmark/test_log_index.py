@@ -0,0 +1,69 @@
+from tcn.benchmark.log_index import GEOSLogIndex
+from tcn.benchmark.string_trf import grep
+
+GEOS_LOG = """ Integer*4 Resource Parameter: NX:4
+ Integer*4 Resource Parameter: NY:24
+ Integer*4 Resource Parameter: RUN_GTFV3:1
+ backend : dace:gpu
+Resolution of dynamics restart     =   180   180   72
+ AGCM Date: 2000/04/14  Time: 21:00:00
+[DaCe Orchestration] Run... 0.15
+ 0 , geos_gtfv3 0.25
+ AGCM Date: 2000/04/14  Time: 21:30:00
+[DaCe Orchestration] Run... 0.16
+ 0 , geos_gtfv3 0.26
+ Times for component <DYN>
+Name                     #-cycles  Inclusive    % Incl  Exclusive   % Excl
+DYN                       1 10.0 100.00 1.0 10.00
+--------DYN_CORE          48 8.0 80.00 2.0 20.00
+ Times for component <SUPERDYNAMICS>
+SUPERDYNAMICS             1 11.0 100.00 1.0 10.00
+ Model Throughput:    123.4 days per day
+All 1 150.0 100.0 1.0 1.0
+--Initialize 1 10.0 6.6 1.0 1.0
+--Run 1 130.0 86.6 1.0 1.0
+----GCM 1 120.0 80.0 1.0 1.0
+--Finalize 1 10.0 6.6 1.0 1.0
+ GEOSgcm Run Status: 0
+"""
+
+QUERIES = [
+    dict(pattern="RUN_GTFV3:1", exclude_pattern=True, expected=False),
+    dict(pattern="backend : ", exclude_pattern=True, expected=False),
+    dict(pattern=" 0 , geos_gtfv3", exclude_pattern=True),
+    dict(pattern="] Run...", exclude_pattern=True),
+    dict(pattern="Resource Parameter: NY:", exclude_pattern=True),
+    dict(pattern="--Run", start_patterns=["Model Throughput"]),
+    dict(
+        pattern="--------DYN_CORE",
+        start_patterns=["Times for component <DYN>"],
+        end_pattern="Times for component <SUPERDYNAMICS>",
+        expected=False,
+    ),
+    dict(
+        pattern="SUPERDYNAMICS",
+        start_patterns=["Times for component <SUPERDYNAMICS>"],
+        end_pattern="Times for component <DYN>",
+        expected=False,
+    ),
+    dict(
+        pattern="----GCM",
+        start_patterns=["Model Throughput", "--Run"],
+        end_pattern="GEOSgcm Run Status",
+        starts_with=True,
+    ),
+]
+
+
+def test_log_index_matches_grep(tmp_path):
+    log = tmp_path / "geos.0.out"
+    log.write_text(GEOS_LOG)
+
+    index = GEOSLogIndex(str(log))
+    for query in QUERIES:
+        assert index.grep(**query) == grep(str(log), **query), query
+
+    assert list(index.sections.keys()) == ["DYN", "SUPERDYNAMICS"]
+    with open(log, "rb") as f:
+        f.seek(index.sections["SUPERDYNAMICS"])
+        assert b"<SUPERDYNAMICS>" in f.readline()
@@ -0,0 +1,62 @@
+from tcn.benchmark.mapl_profiler import parse_mapl_profile, timer_line
+
+MAPL_REPORT = """ Times for component <MOIST>
+Name                     #-cycles  Inclusive    % Incl  Exclusive   % Excl
+MOIST                     1 30.0 100.00 3.0 10.00
+--Initialize              1 2.0 6.00 1.0 3.00
+----INIT_TABLES           1 1.0 3.00 1.0 3.00
+--Run                     1 27.0 90.00 1.0 3.00
+----GenRunMine            1 26.0 86.00 1.0 3.00
+------BACM_1M             37 20.0 66.00 20.0 66.00
+------GF                  46 6.0 20.00 6.0 20.00
+
+ Model Throughput:    123.4 days per day
+Name   Inclusive % Incl Exclusive % Excl
+All 1 150.0 100.0 1.0 1.0
+--Initialize 1 10.0 6.6 1.0 1.0
+--Run 1 130.0 86.6 1.0 1.0
+----GCM 1 120.0 80.0 1.0 1.0
+------AGCM 1 100.0 66.0 1.0 1.0
+--------MOIST 1 30.0 20.0 1.0 1.0
+------OGCM 1 15.0 10.0 1.0 1.0
+--Finalize 1 10.0 6.6 1.0 1.0
+"""
+
+
+def test_parse_mapl_profile():
+    profile = parse_mapl_profile(MAPL_REPORT.splitlines(keepends=True))
+    assert list(profile.blocks) == ["MOIST", "All"]
+    assert profile.components == ["MOIST"]
+
+    # Digits in the timer name are not measures
+    assert profile["MOIST/Run/GenRunMine/BACM_1M"].measures == [37, 20.0, 66.0, 20.0, 66.0]
+    # Framework timers are skipped, parent is the component
+    assert profile.user_timers("MOIST", 1) == [
+        ("INIT_TABLES", 1.0, "MOIST"),
+        ("BACM_1M", 20.0, "MOIST"),
+        ("GF", 6.0, "MOIST"),
+    ]
+    assert profile.user_timers("MOIST", 1, phases=["RUN", "Run2"]) == [
+        ("BACM_1M", 20.0, "MOIST"),
+        ("GF", 6.0, "MOIST"),
+    ]
+
+    run = profile["All/Run"]
+    assert profile.find(run, "AGCM").path == "All/Run/GCM/AGCM"
+    assert profile.subtree_timings(run, 1, exclude=["AGCM", "OGCM"]) == [
+        ("Run", 130.0, ""),
+        ("GCM", 120.0, "Run"),
+    ]
+
+
+def test_timer_line_real_format():
+    line = (
+        "  profiler: ----FV_INIT               |   0.05       0.01       0.01 |"
+        "   0.05       0.01       0.01 |   0.05       0.01       0.01 |"
+        "  00005  00000 |        2\n"
+    )
+    name, level, measures = timer_line(line)
+    assert (name, level) == ("FV_INIT", 4)
+    assert measures[:4] == [0.05, 0.01, 0.01, 0.05] and measures[-1] == 2
+    assert timer_line("  profiler: \n") is None
+    assert timer_line("  profiler: Name   %   inclusive  exclusive\n") is None
@@ -0,0 +1,67 @@
+import os
+import shutil
+
+import numpy as np
+from click.testing import CliRunner
+
+from tcn.benchmark.cli import cli
+from tcn.benchmark.rank_logs import parse_rank_logs, rank_log_files
+
+REFERENCE_LOG = os.path.join(
+    os.path.dirname(__file__),
+    "../../benchmarker/reference_fortran/logs_florian_machine",
+    "microphys_driver/rank.0/stdout",
+)
+
+
+def _rank_log(fv_dynamics, moist):
+    steps = "".join(f" 0: fv_dynamics: time taken =   {t}     s\n" for t in fv_dynamics)
+    return (
+        steps
+        + "  profiler: Times for component <MOIST>\n"
+        + "  profiler: Name   #-cycles  Inclusive  Exclusive\n"
+        + f"  profiler: MOIST        1  {moist}  1.0\n"
+        + "  profiler: --Run        1  1.0  1.0\n"
+        + "  profiler: \n"
+    )
+
+
+def test_parse_rank_logs(tmp_path):
+    for rank, (steps, moist) in enumerate(
+        [([1.0, 1.0], 10.0), ([1.0, 3.0], 30.0), ([1.0, 2.0], 20.0)]
+    ):
+        (tmp_path / f"run.{rank}.out").write_text(_rank_log(steps, moist))
+    filenames = rank_log_files(str(tmp_path / "run.%t.out"))
+
+    timings = parse_rank_logs(filenames, jobs=2)
+    assert timings.ranks.tolist() == [0, 1, 2]
+    assert timings.components == ["fv_dynamics", "MOIST"]
+    assert timings.timings.shape == (3, 2, 2)
+    assert timings.totals()[:, 0].tolist() == [2.0, 4.0, 3.0]
+    assert timings.per_timestep_imbalance("fv_dynamics").tolist() == [1.0, 1.5]
+
+    fv_dynamics, moist = timings.imbalance(slowest_count=2)
+    assert (fv_dynamics.min, fv_dynamics.max, fv_dynamics.mean) == (2.0, 4.0, 3.0)
+    assert fv_dynamics.slowest_ranks == [1, 2]
+    assert moist.imbalance == 1.5 and moist.slowest_ranks == [1, 2]
+
+
+def test_parse_reference_rank_logs(tmp_path):
+    # MAPL only prints its Min/Mean/Max over the PEs on the root rank
+    for rank in range(2):
+        os.makedirs(tmp_path / f"rank.{rank}")
+        shutil.copy(REFERENCE_LOG, tmp_path / f"rank.{rank}" / "stdout")
+    filenames = rank_log_files(str(tmp_path / "rank.%t" / "stdout"))
+
+    timings = parse_rank_logs(filenames)
+    assert timings.timings.shape == (2, 1, 49)
+    moist = {c.component: c for c in timings.imbalance()}["MOIST"]
+    assert (moist.min, moist.mean, moist.max) == (17.03, 20.39, 24.16)
+    assert moist.slowest_ranks == [3]
+    assert np.isclose(moist.imbalance, 24.16 / 20.39)
+
+    result = CliRunner().invoke(
+        cli, ["--rank_logs", str(tmp_path / "rank.%t" / "stdout")]
+    )
+    assert result.exit_code == 0
+    assert "MOIST" in result.output
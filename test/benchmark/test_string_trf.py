@@ -0,0 +1,91 @@
+import numpy as np
+
+import tcn.benchmark.string_trf as string_trf
+from tcn.benchmark.string_trf import (
+    TIME_TAKEN_PREFIX,
+    TIME_TAKEN_SUFFIX,
+    GrepQuery,
+    extract_numerics,
+    extract_numerics_array,
+    extract_table,
+    grep_lines,
+    grep_many,
+    line_tokens,
+)
+
+LOG = """ Times for component <A>
+--X 1 2.0
+--Y 1 3.0
+ Times for component <B>
+--X 1 4.0
+--Y 1 5.0\r
+ Run Status: 0
+--X 1 6.0
+"""
+
+
+def test_grep_many_matches_grep_lines(tmp_path):
+    log = tmp_path / "log.out"
+    log.write_bytes(LOG.encode("utf8"))
+    queries = [
+        GrepQuery("--X", start_patterns=["<B>"]),
+        GrepQuery("--Y", start_patterns=["<A>"], end_pattern="<B>"),
+        GrepQuery("--Y", start_patterns=["<A>", "<B>"], exclude_pattern=True),
+        GrepQuery("--X", end_pattern="Run Status"),
+        GrepQuery("--Z", expected=False),
+    ]
+
+    with open(log) as f:
+        lines = f.readlines()
+    expected = [
+        grep_lines(
+            lines,
+            q.pattern,
+            exclude_pattern=q.exclude_pattern,
+            start_patterns=q.start_patterns,
+            end_pattern=q.end_pattern,
+            expected=q.expected,
+        )
+        for q in queries
+    ]
+    assert grep_many(str(log), queries) == expected
+
+
+def test_extract_table():
+    lines = ["--DYN 1 10.0 100.00", "----MOIST 3 2.5e1", "--GF 1 x2.5 3"]
+    table = extract_table(lines, columns=3)
+    assert table.shape == (3, 3)
+    assert table[0].tolist() == [1, 10.0, 100.0]
+    assert table[1, :2].tolist() == [3, 25.0] and np.isnan(table[1, 2])
+    # Non numeric tokens fall back to the numerics of the row
+    assert table[2].tolist() == [1, 2.5, 3]
+    assert extract_numerics_array(lines).tolist() == extract_numerics(lines)
+
+
+def test_extract_table_real_lines(monkeypatch):
+    # As printed by GEOS, see benchmarker/reference_fortran/logs_florian_machine
+    profiler = [
+        "  profiler: DYN                       |   0.00      21.80       0.00 |"
+        "   0.00      21.81       0.00 |  00003  00000 |      150\n",
+        "  profiler: --SetService              |   0.02       0.02       0.00 |"
+        "   0.02       0.02       0.00 |  00005  00003 |        1\n",
+    ]
+    time_taken = [": time taken =   0.194211006     s\n", ": time taken =   0.3 s\n"]
+    assert line_tokens(profiler[1])[:3] == ["--SetService", "0.02", "0.02"]
+
+    # Real lines never need the per row slow path
+    def _slow_path(strings):
+        raise AssertionError("slow path")
+
+    monkeypatch.setattr(string_trf, "extract_numerics_array", _slow_path)
+    table = extract_table(profiler, columns=4)
+    assert table[:, 1].tolist() == [21.80, 0.02]
+    assert table[:, 3].tolist() == [0.00, 0.02]
+    steps = extract_table(
+        time_taken,
+        columns=1,
+        skip=0,
+        prefix=TIME_TAKEN_PREFIX,
+        suffix=TIME_TAKEN_SUFFIX,
+    )
+    assert steps[:, 0].tolist() == [0.194211006, 0.3]
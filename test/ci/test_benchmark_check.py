@@ -0,0 +1,58 @@
+import os
+
+from tcn.benchmark.history import (
+    BENCHMARK_HISTORY_ENV,
+    BenchmarkHistory,
+    configured_history_path,
+)
+from tcn.ci.pipeline.geos import benchmark_check
+from tcn.validation.geos_status import GEOSStatus
+
+REFERENCE_LOG = os.path.join(
+    os.path.dirname(__file__),
+    "../../benchmarker/reference_fortran/logs_florian_machine",
+    "microphys_driver/rank.0/stdout",
+)
+
+
+def test_benchmark_check(tmp_path):
+    history = str(tmp_path / "history.sqlite")
+    with open(REFERENCE_LOG) as f:
+        log = f.read()
+    (tmp_path / "run.0.out").write_text(log)
+    # Every dycore timestep 10x slower
+    (tmp_path / "slow.0.out").write_text(
+        log.replace("time taken =   0.", "time taken =   9.")
+    )
+
+    for name, expected in [("run", 0), ("run", 0), ("slow", 1)]:
+        artifact = tmp_path / f"{name}_artifact"
+        os.makedirs(artifact, exist_ok=True)
+        regressions = benchmark_check(
+            [str(tmp_path / f"{name}.0.out")],
+            GEOSStatus(),
+            "Test",
+            history,
+            str(artifact),
+        )
+        assert len(regressions) == expected
+        with open(artifact / "report_benchmark.out") as f:
+            assert ("Regression on Test" in f.read()) == (expected > 0)
+
+    with BenchmarkHistory(history) as h:
+        assert len(h.dyncore_timings("Test", "fortran", "C25-L72", "1x1")) == 3
+
+
+def test_benchmark_check_without_history(tmp_path, monkeypatch, capsys):
+    monkeypatch.delenv(BENCHMARK_HISTORY_ENV, raising=False)
+    history = configured_history_path("")
+    assert history is None
+    assert BENCHMARK_HISTORY_ENV in capsys.readouterr().out
+
+    regressions = benchmark_check(
+        [REFERENCE_LOG], GEOSStatus(), "Test", history, str(tmp_path)
+    )
+    assert regressions == []
+    with open(tmp_path / "report_benchmark.out") as f:
+        assert "fortran" in f.read()
+    assert os.listdir(tmp_path) == ["report_benchmark.out"]
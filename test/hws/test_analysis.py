@@ -0,0 +1,112 @@
+import asyncio
+
+import numpy as np
+
+import tcn.hws.scheduler as scheduler_module
+from tcn.hws.analysis import (
+    dataset_energy_calculation,
+    energy_envelop_calculation,
+    region_energy_calculation,
+    time_range,
+)
+from tcn.hws.dataset import markers_dataset
+from tcn.hws.scheduler import DeadlineScheduler
+
+
+def test_energy_uses_timestamps():
+    # 1 kW on CPU & GPU during one hour, irregular sampling
+    timestamps = np.array([0.0, 10.0, 1800.0, 3600.0]) + 1e9
+    power = np.full(4, 1000.0)
+    report = energy_envelop_calculation(
+        power, power, verbose=False, timestamps=timestamps
+    )
+    assert report.duration_s == 3600
+    np.testing.assert_allclose(report.CPU_envelop_kWh, 1.0)
+    np.testing.assert_allclose(report.overall_envelop_kWh, 2.0)
+
+
+def test_time_range_uses_timestamps():
+    # Irregular sampling: the range is selected on the recorded time
+    data = {
+        "cpu_psu": np.ones(6),
+        "timestamps": np.array([0.0, 0.25, 0.5, 2.0, 2.25, 5.0]) + 1e9,
+    }
+    assert time_range(data, 0.5, 2.25) == slice(2, 5)
+    assert time_range(data, 3.0, 4.0) == slice(5, 5)
+    # Older dumps without timestamps: default sample rate
+    assert time_range({"cpu_psu": np.ones(10)}, 0, 1e6) == slice(0, 10)
+
+
+def test_scheduler_skips_missed_deadlines(monkeypatch):
+    clock = {"ns": 0}
+    sleeps = []
+
+    async def _sleep(seconds):
+        sleeps.append(seconds)
+        clock["ns"] += int(seconds * 1e9)
+
+    monkeypatch.setattr(scheduler_module.time, "monotonic_ns", lambda: clock["ns"])
+    monkeypatch.setattr(scheduler_module.asyncio, "sleep", _sleep)
+
+    scheduler = DeadlineScheduler(0.01)
+    clock["ns"] = 35_000_000  # work longer than 3 periods
+    missed = asyncio.run(scheduler.wait())
+    assert missed == 3 and scheduler.missed == 3
+    # Sleeps up to the next deadline on the grid, not a full period
+    np.testing.assert_allclose(sleeps, [0.005])
+    assert clock["ns"] == 4 * scheduler.period_ns
+
+    # On time: no deadline missed
+    assert asyncio.run(scheduler.wait()) == 0
+    assert scheduler.missed == 3 and clock["ns"] == 5 * scheduler.period_ns
+
+
+def test_region_energy_attribution():
+    timestamps = np.arange(0.0, 10.5, 0.5)
+    data = {
+        "timestamps": timestamps,
+        "cpu_psu": np.full(len(timestamps), 100.0),
+        "gpu_psu": np.where(timestamps < 5, 300.0, 100.0),
+        "cpu_exe_utl": np.full(len(timestamps), 50.0),
+        "gpu_exe_utl": np.full(len(timestamps), 80.0),
+        **markers_dataset(
+            [
+                ("begin", "dycore", 1.0),
+                ("tick", "tick", 2.0),
+                ("end", "dycore", 3.0),
+                ("begin", "UW", 6.25),
+                ("end", "UW", 8.25),
+                ("begin", "dycore", 8.5),
+                ("end", "dycore", 9.5),
+            ]
+        ),
+    }
+    reports = region_energy_calculation(data, verbose=False)
+    assert list(reports) == ["dycore", "UW"]
+    dycore, uw = reports["dycore"], reports["UW"]
+    assert dycore.count == 2 and dycore.duration_s == 3
+    np.testing.assert_allclose(dycore.GPU_energy_J, 2 * 300 + 1 * 100)
+    np.testing.assert_allclose(uw.CPU_mean_power_W, 100)
+    np.testing.assert_allclose(uw.GPU_mean_utilization, 80)
+
+
+def test_dataset_energy_per_device_idle_and_simulated_days():
+    # 2 GPUs over 100s: one idles at 50W, one at 50W then 250W past 50s
+    timestamps = np.arange(0.0, 101.0)
+    per_device = np.stack(
+        [np.full(101, 50.0), np.where(timestamps < 50, 50.0, 250.0)], axis=1
+    )
+    data = {
+        "timestamps": timestamps,
+        "cpu_psu": np.full(101, 100.0),
+        "gpu_psu": per_device.sum(axis=1),
+        "gpu_psu_per_device": per_device,
+    }
+    report = dataset_energy_calculation(data, simulated_days=2, verbose=False)
+    np.testing.assert_allclose(report.GPU_device_integrated, [5.0, 15.1])
+    assert report.CPU_idle_W == 100 and report.GPU_idle_W == 100
+    # Only the 200W extra of the second GPU is above idle
+    np.testing.assert_allclose(report.dynamic_kWh * 3.6e6, 200 * 50.5)
+    np.testing.assert_allclose(
+        report.kWh_per_simulated_day, report.overall_envelop_kWh / 2
+    )
@@ -0,0 +1,41 @@
+import numpy as np
+
+from tcn.hws.cpu import ProcStatReader, rapl_reader
+
+PROC_STAT = """cpu  300 0 100 500 0 0 0 0 0 0
+cpu0 {0} 0 50 {1} 0 0 0 0 0 0
+cpu1 100 0 50 100 0 0 0 0 0 0
+intr 1 2 3
+"""
+
+
+def _package(zone, energy_uj: int, max_range_uj: int = 1000_000):
+    zone.mkdir(exist_ok=True)
+    (zone / "name").write_text("package-0\n")
+    (zone / "max_energy_range_uj").write_text(f"{max_range_uj}\n")
+    (zone / "energy_uj").write_text(f"{energy_uj}\n")
+
+
+def test_rapl_counter_wraparound(tmp_path):
+    zone = tmp_path / "intel-rapl:0"
+    _package(zone, 900_000)
+    # Sub-zones (core, uncore, dram) are not packages
+    _package(tmp_path / "intel-rapl:0:0", 0)
+    reader = rapl_reader(str(tmp_path))
+    assert reader.names == ["package-0"]
+
+    _package(zone, 950_000)
+    assert reader.read().tolist() == [0.05]
+    # Counter wrapped: 50_000 to the max then 200_001 from 0
+    _package(zone, 200_000)
+    np.testing.assert_allclose(reader.read(), [0.300001])
+    assert rapl_reader(str(tmp_path / "missing")) is None
+
+
+def test_proc_stat_per_core_utilization(tmp_path):
+    proc_stat = tmp_path / "stat"
+    proc_stat.write_text(PROC_STAT.format(100, 100))
+    reader = ProcStatReader(str(proc_stat))
+    assert reader.cores == 2
+    proc_stat.write_text(PROC_STAT.format(175, 125))
+    assert reader.read().tolist() == [75.0, 0.0]
@@ -0,0 +1,73 @@
+import numpy as np
+
+from tcn.hws.buffer import RingBuffer
+from tcn.hws.constants import HWS_DUMP_NPZ, HWS_DUMP_STREAM
+from tcn.hws.dataset import (
+    dump_stream,
+    load_dataset,
+    merge_datasets,
+    stream_columns,
+)
+from tcn.hws.stream import StreamWriter, read_stream
+
+
+def _node(tmp_path, hostname: str, start: float, samples: int, gpus: int):
+    path = str(tmp_path / f"{hostname}.bin")
+    stream = StreamWriter(
+        path,
+        stream_columns(gpus),
+        chunk_size=4,
+        metadata={"devices": ["A100"] * gpus, "nodes": [hostname]},
+    )
+    for i in range(samples):
+        row = [start + i, 50.0, 100.0, 0, np.nan]
+        for gpu in range(gpus):
+            row.extend((100.0 * (gpu + 1), 10.0, 5.0, 1000.0))
+        stream.append(row)
+    stream.close()
+    return load_dataset(path)
+
+
+def test_ring_buffer_overwrites_oldest():
+    buffer = RingBuffer(["x"], capacity=3)
+    for x in range(5):
+        buffer.append((x,))
+    assert len(buffer) == 3 and buffer.dropped == 2
+    assert buffer.snapshot()["x"].tolist() == [2, 3, 4]
+
+
+def test_stream_is_readable_while_written(tmp_path):
+    path = str(tmp_path / "live.bin")
+    stream = StreamWriter(path, ["timestamps", "x"], chunk_size=4)
+    for i in range(6):
+        stream.append((i, 2 * i))
+    # Only full chunks are on disk
+    _, columns = read_stream(path)
+    assert columns["x"].tolist() == [0, 2, 4, 6]
+    stream.flush()
+    assert read_stream(path)[1]["timestamps"].tolist() == list(range(6))
+    stream.close()
+
+
+def test_merge_nodes_on_common_time_axis(tmp_path):
+    a = _node(tmp_path, "a", start=2.0, samples=8, gpus=4)
+    b = _node(tmp_path, "b", start=2.5, samples=10, gpus=2)
+    assert a["gpu_psu_per_device"].shape == (8, 4)
+    assert a["gpu_psu"][0] == 1000.0
+
+    merged = merge_datasets([a, b])
+    assert merged["timestamps"][0] == 2.5 and merged["timestamps"][-1] == 8.5
+    assert merged["gpu_psu_per_device"].shape == (7, 6)
+    np.testing.assert_allclose(merged["gpu_psu"], 1000.0 + 300.0)
+    np.testing.assert_allclose(merged["cpu_psu"], 200.0)
+    assert merged["nodes"].tolist() == ["a", "b"]
+
+
+def test_dump_formats_round_trip(tmp_path):
+    stream_path = str(tmp_path / "node.bin")
+    _node(tmp_path, "node", start=0.0, samples=5, gpus=2)
+    for data_format in [HWS_DUMP_NPZ, HWS_DUMP_STREAM]:
+        dumped = dump_stream(stream_path, str(tmp_path / "dump"), data_format)
+        data = load_dataset(dumped)
+        assert data["gpu_psu_per_device"].shape == (5, 2)
+        assert data["devices"].tolist() == ["A100", "A100"]
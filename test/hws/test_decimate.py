@@ -0,0 +1,32 @@
+import numpy as np
+
+from tcn.hws.decimate import decimate, lttb_indices, minmax_indices, pyramid
+
+
+def test_minmax_keeps_peaks():
+    y = np.zeros(100_000)
+    y[12_345], y[67_890] = 500.0, -3.0
+    x, decimated = decimate(np.arange(len(y)), y, points=100)
+    assert len(decimated) <= 102
+    assert 500.0 in decimated and -3.0 in decimated
+    assert np.all(np.diff(x) > 0)
+    assert x[0] == 0 and x[-1] == len(y) - 1
+
+
+def test_lttb_picks_one_per_bucket():
+    x = np.linspace(0, 10, 10_000)
+    y = np.sin(x)
+    y[5000] = 10.0
+    indices = lttb_indices(x, y, 50)
+    assert len(indices) == 50 and np.all(np.diff(indices) > 0)
+    assert 5000 in indices
+    # Short series are left alone
+    assert len(minmax_indices(y[:10], 50)) == 10
+
+
+def test_pyramid_levels():
+    y = np.random.default_rng(0).random(50_000)
+    levels = pyramid(np.arange(len(y)), y, points=100, levels=5, factor=10)
+    sizes = [len(x) for x, _ in levels]
+    assert sizes == sorted(sizes) and sizes[-1] == len(y)
+    assert all(level_y.max() == y.max() for _, level_y in levels)
@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+
+import tcn.hws.graph as hws_graph
+from tcn.hws.constants import HWS_DUMP_JSON, HWS_DUMP_NPZ, HWS_DUMP_STREAM
+from tcn.hws.dataset import build_dataset, save_dataset, stream_columns
+
+
+@pytest.mark.parametrize("data_format", [HWS_DUMP_NPZ, HWS_DUMP_JSON, HWS_DUMP_STREAM])
+def test_graph_outputs_next_to_the_dump(tmp_path, monkeypatch, data_format):
+    images = []
+    # Rendering needs a browser: the image path is all that is checked
+    monkeypatch.setattr(
+        go.Figure, "write_image", lambda self, path: images.append(path)
+    )
+    samples = 50
+    columns = {name: np.ones(samples) for name in stream_columns(1)}
+    columns["timestamps"] = np.arange(samples) * 0.1
+    data = build_dataset(columns, ["A100"], ["node"])
+    dump = save_dataset(data, str(tmp_path / "run"), data_format)
+    with open(dump, "rb") as f:
+        dumped = f.read()
+
+    # Format inferred from the extension, the dump is left untouched
+    hws_graph.cli(dump, html=True, seconds_range=(1.0, 2.0))
+    assert images == [str(tmp_path / "run.png")]
+    assert os.path.exists(tmp_path / "run.html")
+    with open(dump, "rb") as f:
+        assert f.read() == dumped
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+import tcn.hws.server as hws_server
+from tcn.hws.client import HWSClient
+from tcn.hws.dataset import load_dataset
+from tcn.hws.sensors import ReplayProvider
+
+
+def test_persistent_clients_multiplexed(tmp_path, monkeypatch):
+    monkeypatch.setattr(hws_server, "HWS_STREAM_FILENAME", str(tmp_path / "s.bin"))
+    socket_filename = str(tmp_path / "hws.sock")
+    dump_name = str(tmp_path / "dump")
+
+    def _clients(sampler):
+        clients = [HWSClient(socket_filename) for _ in range(3)]
+        clients[0].send({"action": "START", "dt": 0.01})
+        for i in range(100):
+            for rank, client in enumerate(clients):
+                assert client.post({"action": "REGION_BEGIN", "name": f"r{rank}"})
+                assert client.post({"action": "REGION_END", "name": f"r{rank}"})
+        for client in clients[1:]:
+            client.close()
+        # No ordering across connections: wait for the server to drain them
+        deadline = time.monotonic() + 10
+        while len(sampler.markers) < 600 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        clients[0].send({"action": "DUMP", "dump_name": dump_name})
+        clients[0].send({"action": "STOP"})
+        clients[0].close()
+
+    async def _run():
+        # Replayed sensors: runs on any machine
+        provider = ReplayProvider(
+            {"cpu_exe_utl": np.arange(10.0), "gpu_psu.0": np.full(10, 100.0)},
+            {"devices": ["gpu"]},
+        )
+        sampler = hws_server.SamplerServer([provider])
+        server = await asyncio.start_unix_server(
+            sampler.handle_client, path=socket_filename
+        )
+        await asyncio.get_running_loop().run_in_executor(None, _clients, sampler)
+        await asyncio.wait_for(sampler.stopped.wait(), timeout=10)
+        server.close()
+        sampler.close()
+
+    asyncio.run(_run())
+    data = load_dataset(f"{dump_name}.npz")
+    assert len(data["marker_kinds"]) == 600
+    assert sorted(set(data["marker_names"].tolist())) == ["r0", "r1", "r2"]
+    assert data["devices"].tolist() == ["gpu"]
+    assert np.all(data["gpu_psu"] == 100.0)
+    assert np.all(np.isnan(data["cpu_psu"]))
+
+
+def test_dump_does_not_block_the_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(hws_server, "HWS_STREAM_FILENAME", str(tmp_path / "s.bin"))
+    socket_filename = str(tmp_path / "hws.sock")
+    released = threading.Event()
+    dumped = []
+
+    def _slow_dump(stream_path, dump_name, markers=None):
+        # Export held until the client saw its next order served
+        assert released.wait(timeout=10)
+        dumped.append((dump_name, len(markers)))
+        return dump_name
+
+    monkeypatch.setattr(hws_server, "dump_stream", _slow_dump)
+
+    def _client(sampler):
+        client = HWSClient(socket_filename)
+        client.send({"action": "START", "dt": 0.01})
+        client.send({"action": "DUMP", "dump_name": "dump"})
+        assert client.post({"action": "TICK", "name": "after_dump"})
+        deadline = time.monotonic() + 10
+        while len(sampler.markers) < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        served = len(sampler.markers) == 1
+        released.set()
+        client.send({"action": "STOP"})
+        client.close()
+        return served
+
+    async def _run():
+        provider = ReplayProvider({"gpu_psu.0": np.full(10, 100.0)}, {"devices": []})
+        sampler = hws_server.SamplerServer([provider])
+        server = await asyncio.start_unix_server(
+            sampler.handle_client, path=socket_filename
+        )
+        served = await asyncio.get_running_loop().run_in_executor(
+            None, _client, sampler
+        )
+        await asyncio.wait_for(sampler.stopped.wait(), timeout=10)
+        server.close()
+        sampler.close()
+        return served
+
+    assert asyncio.run(_run())
+    # STOP waited for the pending dump
+    assert dumped == [("dump", 0)]
@@ -0,0 +1,32 @@
+import numpy as np
+
+from tcn.hws.dataset import build_dataset, save_dataset
+from tcn.hws.sensors import ReplayProvider, select_providers
+
+
+def test_replay_loops_recorded_samples(tmp_path):
+    data = build_dataset(
+        {
+            "timestamps": np.arange(3.0),
+            "cpu_exe_utl": np.array([10.0, 20.0, 30.0]),
+            "gpu_psu.0": np.array([100.0, 200.0, 300.0]),
+        },
+        ["gpu"],
+        ["node"],
+    )
+    provider = ReplayProvider.from_dump(save_dataset(data, str(tmp_path / "d"), "npz"))
+    assert "timestamps" not in provider.columns
+    assert provider.metadata == {"devices": ["gpu"]}
+    reads = [dict(zip(provider.columns, provider.read(t))) for t in range(4)]
+    assert [r["cpu_exe_utl"] for r in reads] == [10.0, 20.0, 30.0, 10.0]
+    assert [r["gpu_psu.0"] for r in reads] == [100.0, 200.0, 300.0, 100.0]
+    assert select_providers(provider) == [provider]
+
+
+def test_host_providers_columns():
+    # Whatever this machine has, the host fields are always sampled
+    providers = select_providers()
+    columns = [column for provider in providers for column in provider.columns]
+    assert {"cpu_exe_utl", "cpu_psu", "cpu_energy"} <= set(columns)
+    for provider in providers:
+        assert len(provider.read(1.0)) == len(provider.columns)
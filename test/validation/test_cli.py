@@ -0,0 +1,87 @@
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+import xarray as xr
+from click.testing import CliRunner
+
+from tcn.validation.cli import validate_all
+
+
+def _datasets(tmp_path):
+    rng = np.random.default_rng(0)
+    t, ps = rng.random((4, 3, 5)), rng.random((4, 5))
+    reference = xr.Dataset(
+        {"t": (("time", "lev", "x"), t), "ps": (("time", "x"), ps)},
+        coords={"time": np.arange(4)},
+    )
+    computed_t, computed_ps = t.copy(), ps.copy()
+    computed_t[2, 1, :] += 1e-2
+    computed_ps[0] += 1.0  # outside of the validated window
+    computed = reference.copy(data={"t": computed_t, "ps": computed_ps})
+    reference.to_netcdf(tmp_path / "reference.nc")
+    computed.to_netcdf(tmp_path / "computed.nc")
+
+
+def test_validate_all(tmp_path, monkeypatch):
+    _datasets(tmp_path)
+    figures = []
+    # Rendering needs a browser: the figure itself is checked
+    monkeypatch.setattr(
+        go.Figure, "write_image", lambda self, path: figures.append((self, path))
+    )
+    result = CliRunner().invoke(
+        validate_all,
+        [
+            str(tmp_path / "reference.nc"),
+            str(tmp_path / "computed.nc"),
+            "--time_begin",
+            "1",
+            "--time_end",
+            "3",
+            "--summary",
+            str(tmp_path / "summary.json"),
+            "--plot",
+            str(tmp_path / "heatmap.png"),
+            "--atol",
+            "1e-3",
+            "--profile",
+            "lev",
+            "--profile",
+            "tile",
+            "--profile_output",
+            str(tmp_path),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "No variable along tile, no profile" in result.output
+
+    # One row for the window then one per time step, of each variable
+    with open(tmp_path / "summary.json") as f:
+        rows = json.load(f)["variables"]
+    assert [(row["name"], row["time"]) for row in rows] == [
+        ("t", None),
+        ("t", 1),
+        ("t", 2),
+        ("ps", None),
+        ("ps", 1),
+        ("ps", 2),
+    ]
+    t, t_1, t_2, ps = rows[:4]
+    assert (t["count"], t["exact"], t["outside_tolerance"]) == (30, 25, 5)
+    assert t_1["max_abs_error"] == 0
+    assert np.isclose(t_2["max_abs_error"], 1e-2)
+    # Error of ps at time 0 is outside of --time_begin/--time_end
+    assert (ps["count"], ps["max_abs_error"]) == (10, 0)
+
+    ((heatmap, path),) = figures
+    assert path == str(tmp_path / "heatmap.png")
+    assert heatmap.data[0].y == ("t", "ps") and heatmap.data[0].x == (1, 2)
+    np.testing.assert_allclose(heatmap.data[0].z, [[np.nan, -2], [np.nan, np.nan]])
+
+    with xr.open_dataset(tmp_path / "profile_lev.nc") as profile:
+        assert "t_max_abs_error" in profile and "ps_max_abs_error" not in profile
+        assert profile["t_compared"].values.tolist() == [10, 10, 10]
+        assert profile["t_outside_tolerance"].values.tolist() == [0, 5, 0]
+        np.testing.assert_allclose(profile["t_max_abs_error"], [0, 1e-2, 0])
+    assert not (tmp_path / "profile_tile.nc").exists()
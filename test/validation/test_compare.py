@@ -0,0 +1,91 @@
+import numpy as np
+import xarray as xr
+
+from tcn.validation.compare import (
+    Tolerance,
+    error_profiles,
+    identical,
+    relative_error,
+    ulp_distance,
+)
+
+
+def test_ulp_distance():
+    one = np.array([1.0, -1.0, 0.0, np.nan])
+    after = np.nextafter(one, np.inf)
+    assert ulp_distance(one, after)[:3].tolist() == [1, 1, 1]
+    assert np.isnan(ulp_distance(one, after)[3])
+    # Across zero: distance to 0 from both sides
+    tiny = np.array([np.nextafter(np.float32(0), np.float32(1))])
+    assert ulp_distance(tiny, -tiny).tolist() == [2]
+    assert ulp_distance(np.array([0.0]), np.array([-0.0])).tolist() == [0]
+
+
+def test_ulp_distance_mixed_precision():
+    # float32 against float64 counts float64 ULPs
+    single = np.array([1.0, 0.1], dtype=np.float32)
+    double = np.array([np.nextafter(1.0, 2.0), 0.1])
+    rounding = abs(
+        np.float64(np.float32(0.1)).view(np.int64) - np.float64(0.1).view(np.int64)
+    )
+    assert ulp_distance(single, double).tolist() == [1, rounding]
+    assert ulp_distance(double, single).tolist() == [1, rounding]
+    # Exactly representable in both: no distance
+    assert ulp_distance(single[:1], np.array([1.0])).tolist() == [0]
+    # float32 only when both are
+    after = np.nextafter(single, np.float32(2))
+    assert ulp_distance(single, after).tolist() == [1, 1]
+
+
+def test_ulp_distance_infinities():
+    for dtype, int_type in [(np.float32, np.int32), (np.float64, np.int64)]:
+        largest = np.finfo(dtype).max
+        inf = np.array([np.inf], dtype=dtype)
+        # Infinity is the float after the largest finite one
+        assert ulp_distance(np.array([largest], dtype=dtype), inf).tolist() == [1]
+        assert ulp_distance(-inf, -inf).tolist() == [0]
+        assert ulp_distance(inf, inf).tolist() == [0]
+        # Opposite infinities: twice the distance from 0 to infinity
+        to_inf = float(inf.view(int_type)[0])
+        assert ulp_distance(inf, -inf).tolist() == [2 * to_inf]
+        assert ulp_distance(np.zeros(1, dtype=dtype), -inf).tolist() == [to_inf]
+    # Mixed precision: float32 infinity is float64 infinity
+    assert ulp_distance(
+        np.array([np.inf, -np.inf], dtype=np.float32), np.array([np.inf, -np.inf])
+    ).tolist() == [0, 0]
+
+
+def test_identical():
+    reference = np.array([0.0, 1.0, np.nan, 1.0], dtype=np.float32)
+    computed = np.array([-0.0, 1.0, np.nan, 1.0 + 1e-7], dtype=np.float32)
+    assert identical(reference, computed).tolist() == [False, True, True, False]
+    # float32 against float64 compares in float64
+    assert identical(reference[1:2], np.array([1.0])).tolist() == [True]
+
+
+def test_relative_error():
+    reference = np.array([0.0, 0.0, 2.0])
+    computed = np.array([0.0, 1e-300, 3.0])
+    error = relative_error(reference, computed)
+    assert error[0] == 0 and np.isfinite(error[1]) and error[2] == 0.5
+
+
+def test_tolerance():
+    reference = np.array([1.0, 1.0, 1.0])
+    computed = np.array([1.0, np.nextafter(1.0, 2.0), 1.1])
+    assert Tolerance().mask(reference, computed).tolist() == [True, False, False]
+    assert Tolerance(ulp=1).mask(reference, computed).tolist() == [True, True, False]
+    assert Tolerance(rtol=0.2).mask(reference, computed).all()
+
+
+def test_error_profiles():
+    rng = np.random.default_rng(0)
+    reference = xr.DataArray(
+        rng.random((2, 6, 4, 5)), dims=("time", "nf", "lev", "x")
+    ).chunk({"time": 1})
+    computed = reference + 1e-6 * (reference.lev == 2)
+    profiles = error_profiles(reference, computed, ["lev", "nf"], Tolerance(atol=1e-9))
+    assert profiles["lev"].compared.values.tolist() == [60] * 4
+    assert profiles["lev"].bit_identical.values.tolist() == [60, 60, 0, 60]
+    assert np.allclose(profiles["lev"].rmse.values, [0, 0, 1e-6, 0])
+    assert profiles["nf"].outside_tolerance.values.tolist() == [10] * 6
@@ -0,0 +1,313 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import xarray as xr
+
+import tcn.validation.serialbox.serialbox_dat_to_netcdf as convert
+from tcn.validation.serialbox.serialbox_dat_to_netcdf import (
+    CHUNKS_LEVEL,
+    CHUNKS_NONE,
+    CHUNKS_RANK,
+    COMPRESSOR_NONE,
+    OUTPUT_NETCDF,
+    OUTPUT_ZARR,
+    PARALLEL_RANK,
+    PARALLEL_VARIABLE,
+    OutputLayout,
+    _bounded_map,
+    _convert_by_rank,
+    _convert_by_variable,
+    _data_array,
+    _rank_shards,
+    get_data,
+)
+
+SAVEPOINT = "Driver-In"
+NAMES = ["dt", "qvapor", "u"]
+
+
+def _fake_read_rank(data_path, savepoint_name, rank, names, do_only_savepoint=-1):
+    # Deterministic content per (rank, savepoint, variable), uneven delays so
+    # that parallel tasks complete out of order
+    time.sleep(0.01 * ((rank * 7) % 3))
+    data = {}
+    for name in names:
+        data[name] = []
+        for savepoint in range(2):
+            seed = 100 * rank + 10 * savepoint + NAMES.index(name)
+            if name == "dt":
+                data[name].append(np.float64(seed))
+            elif name == "qvapor":
+                data[name].append(
+                    np.random.default_rng(seed).random((10, 10, 4), dtype=np.float32)
+                )
+            else:
+                data[name].append(np.random.default_rng(seed).random((6, 6, 4)))
+    return data
+
+
+def _square(x):
+    time.sleep(0.001 * (x % 3))
+    return x * x
+
+
+def test_bounded_map_ordered():
+    tasks = [(i,) for i in range(20)]
+    serial = list(_bounded_map(None, _square, tasks, 4))
+    with ThreadPoolExecutor(4) as executor:
+        parallel = list(_bounded_map(executor, _square, tasks, 4))
+    assert serial == parallel == [i * i for i in range(20)]
+
+
+def test_bounded_map_in_flight():
+    submitted = []
+
+    def _tasks():
+        for i in range(10):
+            submitted.append(i)
+            yield (i,)
+
+    with ThreadPoolExecutor(2) as executor:
+        for i, result in enumerate(_bounded_map(executor, _square, _tasks(), 3)):
+            # Tasks are only pulled as results are consumed
+            assert len(submitted) <= i + 3
+            assert result == i * i
+
+
+def _convert(tmp_path, parallel, workers):
+    output = tmp_path / f"{parallel}_{workers}"
+    output.mkdir(exist_ok=True)
+    ranks = list(range(6))
+    # Same executors as `main`, threads instead of processes
+    shards = _rank_shards(ranks, workers)
+    if workers <= 1:
+        executors = []
+    elif parallel == PARALLEL_RANK:
+        executors = [ThreadPoolExecutor(workers)]
+    else:
+        executors = [ThreadPoolExecutor(1) for _ in shards]
+    args = ("data", str(output), SAVEPOINT)
+    try:
+        if parallel == PARALLEL_RANK:
+            _convert_by_rank(
+                executors[0] if executors else None,
+                workers,
+                *args,
+                ranks,
+                NAMES,
+                -1,
+                OutputLayout(),
+            )
+        else:
+            _convert_by_variable(executors, *args, shards, NAMES, -1, OutputLayout())
+    finally:
+        for executor in executors:
+            executor.shutdown()
+    with xr.open_dataset(output / f"{SAVEPOINT}.nc") as dataset:
+        return dataset.load()
+
+
+@pytest.mark.parametrize("parallel", [PARALLEL_RANK, PARALLEL_VARIABLE])
+def test_parallel_conversion_matches_serial(tmp_path, monkeypatch, parallel):
+    monkeypatch.setattr(convert, "read_rank", _fake_read_rank)
+    serial = _convert(tmp_path, PARALLEL_RANK, 1)
+    xr.testing.assert_identical(_convert(tmp_path, parallel, 1), serial)
+    xr.testing.assert_identical(_convert(tmp_path, parallel, 4), serial)
+    assert serial["qvapor"].shape == (2, 6, 4, 4, 4)  # halo trimmed
+    assert serial["u"].shape == (2, 6, 6, 6, 4)
+    assert serial["dt"].values[1, 2] == 210
+
+
+def test_serializer_cache_bounded(monkeypatch):
+    monkeypatch.setattr(convert, "import_serialbox", lambda: None)
+    monkeypatch.setattr(convert, "get_serializer", lambda *args: object())
+    convert.clear_serializers()
+    first = convert._cached_serializer("data", 0)
+    assert convert._cached_serializer("data", 0) is first
+    with ThreadPoolExecutor(4) as executor:
+        list(
+            executor.map(
+                lambda rank: convert._cached_serializer("data", rank % 24), range(96)
+            )
+        )
+    assert len(convert._serializers) == convert.SERIALIZER_CACHE_SIZE
+    # Least recently used ranks were closed: reopened on the next access
+    assert convert._cached_serializer("data", 0) is not first
+    convert.clear_serializers()
+    assert len(convert._serializers) == 0
+
+
+def test_rank_shards():
+    assert _rank_shards(list(range(6)), 1) == [list(range(6))]
+    assert _rank_shards(list(range(7)), 3) == [[0, 1, 2], [3, 4], [5, 6]]
+    assert _rank_shards([4], 3) == [[4]]
+
+
+def test_variable_shards_read_by_one_worker(tmp_path, monkeypatch):
+    readers = {}
+
+    def _read_rank(data_path, savepoint_name, rank, names, do_only_savepoint=-1):
+        readers.setdefault(rank, set()).add(threading.get_ident())
+        return _fake_read_rank(data_path, savepoint_name, rank, names)
+
+    monkeypatch.setattr(convert, "read_rank", _read_rank)
+    _convert(tmp_path, PARALLEL_VARIABLE, 3)
+    # Each rank is only ever read by the worker of its shard
+    assert sorted(readers) == list(range(6))
+    assert all(len(threads) == 1 for threads in readers.values())
+    assert len(set.union(*readers.values())) == 3
+
+
+class _FakeSerializer:
+    def __init__(self, rank):
+        self.rank = rank
+
+    def savepoint_list(self):
+        return [SimpleNamespace(name=SAVEPOINT, index=i) for i in range(2)]
+
+    def get_savepoint(self, name):
+        return self.savepoint_list()
+
+    def fields_at_savepoint(self, savepoint):
+        return NAMES + ["rank"]
+
+
+@pytest.mark.parametrize("parallel", [PARALLEL_RANK, PARALLEL_VARIABLE])
+def test_main_opens_each_rank_once(tmp_path, monkeypatch, parallel):
+    opened = []
+
+    def _get_serializer(serialbox, data_path, rank):
+        opened.append(rank)
+        return _FakeSerializer(rank)
+
+    def _read(serializer, savepoint, name):
+        return np.full((6, 6, 4), 100.0 * serializer.rank + savepoint.index)
+
+    monkeypatch.setattr(convert, "import_serialbox", lambda: None)
+    monkeypatch.setattr(convert, "get_serializer", _get_serializer)
+    monkeypatch.setattr(convert, "read_serialized_data", _read)
+    monkeypatch.setattr(convert, "SERIALIZER_CACHE_SIZE", 2)
+    convert.clear_serializers()
+    data_path = tmp_path / "data"
+    data_path.mkdir()
+    (data_path / "input.nml").write_text("&fv_core_nml\n layout = 2, 2\n/\n")
+    convert.main(str(data_path), str(tmp_path / "out"), parallel=parallel)
+    # 24 ranks, 3 variables: by variable too, every rank is opened once (plus
+    # rank 0 to list the savepoints)
+    assert sorted(opened) == [0] + list(range(24))
+    with xr.open_dataset(tmp_path / "out" / f"{SAVEPOINT}.nc") as dataset:
+        assert dataset["u"].values[1, 23, 0, 0, 0] == 2301
+
+
+def test_get_data():
+    per_rank = [
+        {"q": [np.full((10, 10, 2), rank + i, dtype=np.float32) for i in range(3)]}
+        for rank in range(2)
+    ]
+    data = get_data([10, 10, 2], 2, 3, per_rank, "q")
+    assert data.dtype == np.float32
+    assert data.dims == ("savepoint", "rank", "dim_q_0", "dim_q_1", "dim_q_2")
+    assert data.shape == (3, 2, 10, 10, 2)
+    assert np.all(data.values[2, 1] == 3)
+
+    scalars = [{"dt": [np.float64(rank), np.float64(rank + 0.5)]} for rank in range(3)]
+    data = get_data([], 3, 2, scalars, "dt")
+    assert data.dtype == np.float64 and data.shape == (2, 3)
+    assert data.values[1].tolist() == [0.5, 1.5, 2.5]
+
+    # Tracers of halo savepoints are trimmed, other variables are not
+    per_rank_q = [rank["q"] for rank in per_rank]
+    trimmed = _data_array("Driver-In", "qvapor", per_rank_q)
+    assert trimmed.shape == (3, 2, 4, 4, 2) and trimmed.dtype == np.float32
+    assert _data_array("Driver-In", "u", per_rank_q).shape == (3, 2, 10, 10, 2)
+    untrimmed = _data_array("Microphysics-In", "qvapor", per_rank_q)
+    assert untrimmed.shape == (3, 2, 10, 10, 2)
+
+
+def _layout_fields():
+    return {
+        "q": xr.DataArray(
+            np.random.default_rng(0).random((2, 6, 4, 4, 3)),
+            dims=["savepoint", "rank", "dim_q_0", "dim_q_1", "dim_q_2"],
+        ),
+        "ps": xr.DataArray(
+            np.ones((2, 6, 4, 4)),
+            dims=["savepoint", "rank", "dim_ps_0", "dim_ps_1"],
+        ),
+        "dt": xr.DataArray(np.ones((2, 6)), dims=["savepoint", "rank"]),
+    }
+
+
+def test_output_layout_encoding():
+    fields = _layout_fields()
+    q, ps, dt = fields["q"], fields["ps"], fields["dt"]
+
+    default = OutputLayout()
+    assert (default.format, default.chunks) == (OUTPUT_NETCDF, CHUNKS_NONE)
+    assert default.encoding(q) == {"zlib": True, "complevel": 1}
+    assert default.encoding(ps) == {} and default.encoding(dt) == {}
+    assert default.path("out", "Driver-In") == os.path.join("out", "Driver-In.nc")
+
+    rank = OutputLayout(chunks=CHUNKS_RANK, compressor="zstd", complevel=3)
+    assert rank.encoding(q) == {
+        "compression": "zstd",
+        "complevel": 3,
+        "chunksizes": (1, 1, 4, 4, 3),
+    }
+    assert rank.encoding(ps) == {"chunksizes": (1, 1, 4, 4)}
+    assert rank.chunk_shape(dt) is None
+
+    level = OutputLayout(chunks=CHUNKS_LEVEL, compressor=COMPRESSOR_NONE)
+    assert level.encoding(q) == {"chunksizes": (1, 1, 4, 4, 1)}
+    assert level.chunk_shape(ps) == (1, 1, 4, 4)
+
+    # Zarr: chunks are set on the data, the default codec compresses
+    zarr = OutputLayout(OUTPUT_ZARR, CHUNKS_LEVEL)
+    assert zarr.encoding(q) == {}
+    assert zarr.chunk_shape(q) == (1, 1, 4, 4, 1)
+    assert zarr.path("out", "Driver-In") == os.path.join("out", "Driver-In.zarr")
+
+    for wrong in [{"format": "hdf5"}, {"chunks": "tile"}, {"compressor": "lzma"}]:
+        with pytest.raises(RuntimeError):
+            OutputLayout(**wrong)
+
+
+@pytest.mark.parametrize(
+    "layout, q_chunks, q_zlib",
+    [
+        (OutputLayout(), (2, 6, 4, 4, 3), True),  # default: unchunked, zlib 1
+        (OutputLayout(chunks=CHUNKS_RANK), (1, 1, 4, 4, 3), True),
+        (
+            OutputLayout(chunks=CHUNKS_LEVEL, compressor=COMPRESSOR_NONE),
+            (1, 1, 4, 4, 1),
+            False,
+        ),
+    ],
+)
+def test_output_layout_netcdf(tmp_path, layout, q_chunks, q_zlib):
+    fields = _layout_fields()
+    path = layout.path(str(tmp_path), "Driver-In")
+    layout.write({"q": fields["q"]}, path, append=False)
+    layout.write({"dt": fields["dt"]}, path, append=True)
+    with xr.open_dataset(path) as saved:
+        xr.testing.assert_identical(saved.load(), xr.Dataset(fields).drop_vars("ps"))
+        assert saved["q"].encoding["chunksizes"] == q_chunks
+        assert saved["q"].encoding["zlib"] == q_zlib
+        assert saved["q"].encoding["complevel"] == (1 if q_zlib else 0)
+        assert saved["dt"].encoding["contiguous"]
+
+
+def test_output_layout_zarr(tmp_path):
+    pytest.importorskip("zarr")
+    fields = _layout_fields()
+    layout = OutputLayout(OUTPUT_ZARR, CHUNKS_RANK)
+    path = layout.path(str(tmp_path), "Driver-In")
+    layout.write(fields, path, append=False)
+    with xr.open_zarr(path) as saved:
+        xr.testing.assert_identical(saved.load(), xr.Dataset(fields))
+        assert saved["q"].encoding["chunks"] == (1, 1, 4, 4, 3)
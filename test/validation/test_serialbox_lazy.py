@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+import dask
+import numpy as np
+import pytest
+import xarray as xr
+
+import tcn.validation.serialbox.lazy as lazy
+import tcn.validation.serialbox.serialbox_dat_to_netcdf as convert
+from tcn.validation.serialbox.lazy import (
+    SERIALBOX_MISSING,
+    SerialboxBackendEntrypoint,
+    open_savepoint,
+)
+
+RANKS = [0, 1, 2]
+SAVEPOINTS = 2
+FIELDS = {
+    # name: (serialized dims, serialbox type)
+    "qvapor": ([10, 10, 2], "Float32"),
+    "u": ([4, 4, 2], "Float64"),
+    "dt": ([1], "Float64"),
+    "rank": ([1], "Int32"),
+}
+
+
+class FakeSerializer:
+    """The subset of `serialbox.Serializer` read by the converter & lazy backend"""
+
+    def __init__(self, rank: int):
+        self.rank = rank
+        self.reads = 0
+
+    def savepoint_list(self):
+        return [
+            SimpleNamespace(name=name, index=i)
+            for name in ["Driver-In", "Microphysics-In"]
+            for i in range(SAVEPOINTS)
+        ]
+
+    def get_savepoint(self, name):
+        return [sp for sp in self.savepoint_list() if sp.name == name]
+
+    def fields_at_savepoint(self, savepoint):
+        return list(FIELDS)
+
+    def get_field_metainfo(self, name):
+        dims, type_name = FIELDS[name]
+        return SimpleNamespace(dims=dims, type=SimpleNamespace(name=type_name))
+
+    def read(self, name, savepoint):
+        self.reads += 1
+        dims, type_name = FIELDS[name]
+        if name == "rank":
+            return np.array([self.rank], dtype=np.int32)
+        seed = 100 * self.rank + 10 * savepoint.index + list(FIELDS).index(name)
+        data = np.random.default_rng(seed).random(dims).astype(type_name.lower())
+        if data.size > 1 and data.dtype == np.float64:
+            data.flat[seed % data.size] = SERIALBOX_MISSING
+        return data
+
+
+@pytest.fixture
+def serializers(monkeypatch):
+    opened = {}
+
+    def _get_serializer(serialbox, data_path, rank):
+        opened[rank] = FakeSerializer(rank)
+        return opened[rank]
+
+    monkeypatch.setattr(convert, "get_serializer", _get_serializer)
+    monkeypatch.setattr(convert, "import_serialbox", lambda: None)
+    monkeypatch.setattr(lazy, "import_serialbox", lambda: None)
+    convert.clear_serializers()
+    yield opened
+    convert.clear_serializers()
+
+
+@pytest.mark.parametrize("savepoint_name", ["Driver-In", "Microphysics-In"])
+def test_open_savepoint_matches_conversion(serializers, savepoint_name):
+    dataset = open_savepoint("data", savepoint_name, RANKS)
+    assert sorted(dataset.data_vars) == ["dt", "qvapor", "u"]
+    # Lazy: only the metadata was read
+    assert sum(serializer.reads for serializer in serializers.values()) == 0
+    for name, lazy_data in dataset.data_vars.items():
+        converted = convert._data_array(
+            savepoint_name,
+            name,
+            convert.read_variable("data", savepoint_name, RANKS, name),
+        )
+        assert lazy_data.dims == converted.dims
+        assert lazy_data.shape == converted.shape
+        assert lazy_data.dtype == converted.dtype
+        np.testing.assert_array_equal(lazy_data.values, converted.values)
+    halo = 6 if savepoint_name == "Driver-In" else 0
+    assert dataset["qvapor"].shape == (SAVEPOINTS, 3, 10 - halo, 10 - halo, 2)
+    assert dataset["qvapor"].dtype == np.float32
+    assert dataset["dt"].shape == (SAVEPOINTS, 3)
+    # One missing value per block, exported as 0
+    assert np.count_nonzero(dataset["u"].values == 0) == SAVEPOINTS * 3
+
+
+def test_open_savepoint_reads_touched_chunks(serializers):
+    dataset = open_savepoint("data", "Microphysics-In", RANKS)
+    assert dataset["u"].data.chunks[:2] == ((1, 1), (1, 1, 1))
+    with dask.config.set(scheduler="threads"):
+        dataset["u"].isel(savepoint=1, rank=2).values
+    # Rank 0 for the metadata, rank 2 for the data
+    assert {rank: s.reads for rank, s in serializers.items()} == {0: 0, 2: 1}
+
+
+def test_backend_entrypoint(serializers):
+    backend = SerialboxBackendEntrypoint()
+    assert isinstance(backend.open_dataset_parameters, tuple)
+    dataset = xr.open_dataset(
+        "data",
+        engine=SerialboxBackendEntrypoint,
+        savepoint_name="Driver-In",
+        ranks=RANKS,
+        drop_variables=["u"],
+    )
+    assert sorted(dataset.data_vars) == ["dt", "qvapor"]
+    xr.testing.assert_identical(
+        dataset.load(),
+        open_savepoint("data", "Driver-In", RANKS, ["u"]).load(),
+    )
+    with pytest.raises(RuntimeError, match="Driver-In"):
+        xr.open_dataset("data", engine=SerialboxBackendEntrypoint)
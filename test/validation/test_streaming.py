@@ -0,0 +1,69 @@
+import numpy as np
+import xarray as xr
+
+from tcn.validation.streaming import (
+    aligned,
+    compute_report,
+    compute_statistics,
+    write_summary,
+)
+
+
+def test_compute_statistics(tmp_path):
+    rng = np.random.default_rng(0)
+    reference = rng.random((3, 4, 10)).astype(np.float32) + 1
+    computed = reference.copy()
+    computed[0, 0, 0] += np.float32(0.5)
+    computed[1, 1, 1] = np.nan
+    computed[2, 3, 9] -= np.float32(0.05)
+    dims = ("time", "lev", "x")
+    ref = xr.Dataset({"a": (dims, reference)}).chunk({"time": 1, "lev": 2})
+    cpu = xr.Dataset({"a": (dims, computed)}).chunk({"time": 1})
+
+    statistics = compute_statistics(ref, cpu)["a"]
+    assert statistics.count == 119
+    assert statistics.nan_mismatch == 1
+    assert statistics.exact == 117
+    assert np.isclose(statistics.max_abs_error, 0.5)
+    assert sum(statistics.histogram) == 2
+    # The sign of the difference is kept
+    bins, counts = statistics.signed_histogram()
+    assert dict((b, c) for b, c in zip(bins, counts) if c) == {
+        "-1e-2": 1,
+        "0": 117,
+        "1e-1": 1,
+    }
+    assert bins[0] == "-1e9" and bins[-1] == "1e9"
+
+    first = compute_statistics(ref, cpu, selection={"time": 1})["a"]
+    assert first.count == 39 and first.exact == 39 and first.max_ulp == 0
+
+    write_summary([statistics], str(tmp_path / "summary.json"))
+    assert (tmp_path / "summary.json").exists()
+
+
+def test_compute_report():
+    rng = np.random.default_rng(0)
+    reference = rng.random((5, 4))
+    computed = reference.copy()
+    computed[3] += 1e-6
+    times = {"time": np.arange(5)}
+    ref = xr.Dataset(
+        {"a": (("time", "x"), reference), "b": (("x",), reference[0])}, coords=times
+    )
+    # Computed run stopped early
+    cpu = xr.Dataset(
+        {"a": (("time", "x"), computed), "b": (("x",), reference[0])}, coords=times
+    ).isel(time=slice(0, 4))
+
+    ref, cpu = aligned(ref, cpu)
+    report = compute_report(ref, cpu, window=slice(1, None))
+    assert [(s.name, s.time) for s in report] == [
+        ("a", None),
+        ("a", 1),
+        ("a", 2),
+        ("a", 3),
+        ("b", None),
+    ]
+    assert report[0].count == 12 and report[0].exact == 8
+    assert report[2].exact == 4 and report[3].exact == 0